@@ -0,0 +1,123 @@
+"""
+ベンチマーク用のローカルGitHub代替サーバー
+
+`/repos/{owner}/{repo}/releases/latest` に偽のリリースJSONを返し、
+`/download/{asset}` でテンプレートzipを配信する（ETag/304・Rangeに対応）
+"""
+
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_template_zip(ai: str, entries: int, payload_bytes: int = 0, seed: int = 0) -> bytes:
+    """
+    テンプレートzipを生成（entries個のMarkdown + 圧縮の効かないpayload_bytesのファイル）
+    """
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    root = f"spec-kit-template-{ai}/"
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(root + "memory/constitution.md", "# Constitution\n")
+        zf.writestr(root + "scripts/common.sh", "#!/bin/bash\n")
+        for i in range(entries):
+            zf.writestr(f"{root}templates/{i // 100:03d}/doc-{i:05d}.md", f"# Document {i}\n\n" + "lorem ipsum " * rng.randint(10, 400))
+        if payload_bytes:
+            zf.writestr(zipfile.ZipInfo(root + "assets/payload.bin"), rng.randbytes(payload_bytes), compress_type=zipfile.ZIP_STORED)
+    return buf.getvalue()
+
+
+class FakeGitHub:
+    """
+    スレッドで動くフェイクGitHubサーバー
+    latency_msで各リクエストに遅延を加えられる
+    """
+
+    def __init__(self, templates: dict[str, bytes], tag: str = "v0.0.0-bench", latency_ms: float = 0):
+        self.templates = templates
+        self.tag = tag
+        self.latency = latency_ms / 1000
+        self.requests = []
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def asset_name(self, ai: str) -> str:
+        return f"spec-kit-template-{ai}-{self.tag}.zip"
+
+    def release_json(self) -> dict:
+        return {
+            "tag_name": self.tag,
+            "assets": [
+                {
+                    "name": self.asset_name(ai),
+                    "size": len(data),
+                    "browser_download_url": f"{self.url}/download/{self.asset_name(ai)}",
+                    "digest": "sha256:" + hashlib.sha256(data).hexdigest(),
+                }
+                for ai, data in self.templates.items()
+            ],
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                fake.requests.append(self.path)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if self.path.endswith("/releases/latest"):
+                    etag = f'"{fake.tag}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._send(304, headers={"ETag": etag})
+                    body = json.dumps(fake.release_json()).encode()
+                    return self._send(200, body, {"ETag": etag, "Content-Type": "application/json"})
+                if self.path.startswith("/download/"):
+                    name = self.path.rsplit("/", 1)[-1]
+                    data = next((d for ai, d in fake.templates.items() if fake.asset_name(ai) == name), None)
+                    if data is None:
+                        return self._send(404)
+                    byte_range = self.headers.get("Range")
+                    if byte_range and byte_range.startswith("bytes="):
+                        start, _, end = byte_range[6:].partition("-")
+                        start = int(start)
+                        end = int(end) if end else len(data) - 1
+                        return self._send(206, data[start:end + 1], {
+                            "Accept-Ranges": "bytes",
+                            "Content-Range": f"bytes {start}-{end}/{len(data)}",
+                        })
+                    return self._send(200, data, {"Accept-Ranges": "bytes"})
+                self._send(404)
+
+            do_HEAD = do_GET
+
+        return Handler
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+specify_cli のimport時間を `python -X importtime` で計測し、予算と比較する
+
+【使い方】
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --budget-ms 60
+
+複数回計測した最小値（累積時間）が予算を超える、または遅延importすべき
+重いモジュールがimport時点で読み込まれていれば終了コード1を返す
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+# コマンド実行時まで読み込まないはずのモジュール
+DEFERRED_MODULES = [
+    "httpx",
+    "rich.console",
+    "rich.progress",
+    "rich.live",
+    "readchar",
+    "platformdirs",
+]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure_once(python: str) -> tuple[int, set[str]]:
+    """
+    1回分の計測。戻り値: (specify_cliの累積時間[us], 読み込まれたモジュール名)
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", "import specify_cli"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    cumulative = None
+    modules = set()
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        modules.add(match.group(4))
+        if match.group(4) == "specify_cli":
+            cumulative = int(match.group(2))
+    if cumulative is None:
+        raise RuntimeError("specify_cli not found in -X importtime output")
+    return cumulative, modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure specify_cli import time")
+    parser.add_argument("--runs", type=int, default=5, help="Number of measurements (the minimum is reported)")
+    parser.add_argument("--budget-ms", type=float, default=80.0, help="Fail when the minimum import time exceeds this")
+    parser.add_argument("--python", default=sys.executable, help="Python interpreter to measure")
+    args = parser.parse_args()
+
+    # 1回目はバイトコード生成を含むため計測から除外
+    measure_once(args.python)
+    samples = []
+    loaded = set()
+    for _ in range(args.runs):
+        cumulative, modules = measure_once(args.python)
+        samples.append(cumulative)
+        loaded |= modules
+
+    best_ms = min(samples) / 1000
+    print(f"import specify_cli: min {best_ms:.1f} ms / max {max(samples) / 1000:.1f} ms ({args.runs} runs, budget {args.budget_ms:.0f} ms)")
+
+    ok = True
+    eager = [name for name in DEFERRED_MODULES if name in loaded]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        ok = False
+    if best_ms > args.budget_ms:
+        print(f"FAIL: over budget by {best_ms - args.budget_ms:.1f} ms")
+        ok = False
+    if ok:
+        print("OK")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+initパイプラインのベンチマーク（ローカルのフェイクGitHubを使用）
+
+【使い方】
+    python benchmarks/init_pipeline.py
+    python benchmarks/init_pipeline.py --scenario small:20:0 --scenario large:2000:32 --repeat 5
+    python benchmarks/init_pipeline.py --latency-ms 50 --json results.json
+
+シナリオは name:エントリ数:追加ペイロード(MiB)。各シナリオについて
+fetch / download / verify / extract / git の段階別時間（コールド・キャッシュ済み）、
+download_and_extract_template と `specify init` の通し時間、ピークRSSを表示する
+計測はシナリオ・反復ごとに別プロセスで行い、キャッシュディレクトリも毎回新しく作る
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from fake_github import FakeGitHub, make_template_zip
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+STAGES = ["fetch", "download", "verify", "extract", "git"]
+DEFAULT_SCENARIOS = ["small:20:0", "medium:500:4", "large:2000:32"]
+
+
+def peak_rss_bytes() -> int:
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # LinuxはKiB、macOSはバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_stages(ai: str, work_dir: Path) -> dict:
+    """
+    各段階を個別に呼び出して時間を計測（ワーカープロセス内で実行）
+    """
+    from time import perf_counter
+
+    import specify_cli as sc
+
+    timings = {}
+    start = perf_counter()
+    sc.fetch_release_metadata(sc.TEMPLATE_REPO_OWNER, sc.TEMPLATE_REPO_NAME, verbose=False)
+    timings["fetch"] = perf_counter() - start
+
+    start = perf_counter()
+    source, meta = sc.download_template_from_github(ai, work_dir, verbose=False, show_progress=False)
+    timings["download"] = perf_counter() - start
+
+    start = perf_counter()
+    sc.validate_template_archive(source)
+    timings["verify"] = perf_counter() - start
+
+    project = Path(tempfile.mkdtemp(prefix="project-", dir=work_dir))
+    start = perf_counter()
+    stats = sc.install_template(source, project)
+    timings["extract"] = perf_counter() - start
+    if hasattr(source, "seek"):
+        source.seek(0)
+    sc._discard_template_source(source, meta)
+
+    if shutil.which("git"):
+        start = perf_counter()
+        sc.init_git_repo(project, quiet=True)
+        timings["git"] = perf_counter() - start
+    return {"timings": timings, "files": stats["files"], "bytes": stats["bytes"], "cache_hit": meta["cache_hit"]}
+
+
+def worker(args) -> None:
+    """
+    1回分の計測を行い、結果をJSONで標準出力へ書く
+    """
+    from time import perf_counter
+
+    work_dir = Path(args.work_dir)
+    os.chdir(work_dir)
+    result = {}
+    if args.worker == "stages":
+        result["cold"] = run_stages(args.ai, work_dir)
+        result["warm"] = run_stages(args.ai, work_dir)
+    elif args.worker == "download-and-extract":
+        import specify_cli as sc
+
+        start = perf_counter()
+        sc.download_and_extract_template(work_dir / "project", args.ai, verbose=False)
+        result["seconds"] = perf_counter() - start
+    elif args.worker == "init":
+        from typer.testing import CliRunner
+
+        import specify_cli as sc
+
+        start = perf_counter()
+        outcome = CliRunner().invoke(sc.app, ["init", "project", "--ai", args.ai, "--ignore-agent-tools"])
+        result["seconds"] = perf_counter() - start
+        result["exit_code"] = outcome.exit_code
+    result["peak_rss"] = peak_rss_bytes()
+    print(json.dumps(result))
+
+
+def spawn_worker(kind: str, ai: str, api_url: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="specify-bench-") as tmp:
+        env = dict(
+            os.environ,
+            PYTHONPATH=os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")])),
+            SPECIFY_GITHUB_API_URL=api_url,
+            SPECIFY_CACHE_DIR=str(Path(tmp) / "cache"),
+            GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+            GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com",
+        )
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", kind, "--ai", ai, "--work-dir", tmp],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{kind} worker failed:\n{proc.stderr}")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def parse_scenario(spec: str) -> dict:
+    name, entries, payload_mib = spec.split(":")
+    return {"name": name, "entries": int(entries), "payload_bytes": int(float(payload_mib) * 1024 * 1024)}
+
+
+def ms(seconds: float | None) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:9.1f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the specify init pipeline against a local fake GitHub")
+    parser.add_argument("--scenario", action="append", help="name:entries:payload_mib (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario (the median is reported)")
+    parser.add_argument("--ai", default="claude", help="AI assistant template to use")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Artificial latency added to every request")
+    parser.add_argument("--json", type=Path, help="Write raw results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return 0
+
+    results = []
+    for spec in args.scenario or DEFAULT_SCENARIOS:
+        scenario = parse_scenario(spec)
+        archive = make_template_zip(args.ai, scenario["entries"], scenario["payload_bytes"])
+        with FakeGitHub({args.ai: archive}, latency_ms=args.latency_ms) as server:
+            runs = {
+                kind: [spawn_worker(kind, args.ai, server.url) for _ in range(args.repeat)]
+                for kind in ("stages", "download-and-extract", "init")
+            }
+        results.append({**scenario, "archive_bytes": len(archive), "runs": runs})
+
+        print(f"\n== {scenario['name']}: {scenario['entries']} entries, archive {len(archive) / 1024 / 1024:.1f} MiB (median of {args.repeat})")
+        print(f"{'stage':<22}{'cold ms':>10}{'warm ms':>10}")
+        for stage in STAGES:
+            cold = [run["cold"]["timings"][stage] for run in runs["stages"] if stage in run["cold"]["timings"]]
+            warm = [run["warm"]["timings"][stage] for run in runs["stages"] if stage in run["warm"]["timings"]]
+            print(f"{stage:<22}{ms(statistics.median(cold) if cold else None):>10}{ms(statistics.median(warm) if warm else None):>10}")
+        for kind in ("download-and-extract", "init"):
+            seconds = statistics.median(run["seconds"] for run in runs[kind])
+            print(f"{kind:<22}{ms(seconds):>10}")
+        print(f"{'peak RSS (MiB)':<22}", end="")
+        for kind in ("stages", "download-and-extract", "init"):
+            peak = max(run["peak_rss"] for run in runs[kind])
+            print(f"  {kind} {peak / 1024 / 1024:.1f}", end="")
+        print()
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
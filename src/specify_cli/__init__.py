@@ -23,29 +23,27 @@ Specify CLI - Specifyプロジェクトのセットアップツール
 """
 
 import os
+import io
+import atexit
 import subprocess
 import sys
-import zipfile
-import tempfile
 import shutil
 import json
-from pathlib import Path
-from typing import Optional
+import hashlib
+import re
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Iterable, Optional
 
 import typer
-import httpx
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.text import Text
-from rich.live import Live
-from rich.align import Align
-from rich.table import Table
-from rich.tree import Tree
 from typer.core import TyperGroup
 
-# For cross-platform keyboard input
-import readchar
+# httpx・rich・readchar・zipfile等の重いモジュールは使う関数内でimportする
+# （`specify --version` や `specify check` の起動時間を短くするため）
+if TYPE_CHECKING:
+    import httpx
 
 # Constants
 AI_CHOICES = {
@@ -65,93 +63,262 @@ BANNER = """
 """
 
 TAGLINE = "Spec-Driven Development Toolkit"
+
+# テンプレートの配布元リポジトリ
+TEMPLATE_REPO_OWNER = "github"
+TEMPLATE_REPO_NAME = "spec-kit"
+# GitHub APIのベースURL（GitHub Enterpriseやベンチマーク用のローカルサーバーでは上書き）
+GITHUB_API_URL = os.environ.get("SPECIFY_GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+# テンプレートキャッシュのインデックス更新を直列化するロック（--batchの並列処理用）
+# 別プロセスとの間はindex.lockのファイルロックで直列化する（_cache_index_lock）
+_cache_lock = threading.Lock()
+
+# 展開済みテンプレートストア（unpacked/<sha256>）の作成を直列化するロック
+# 別プロセスとの間はunpacked/<sha256>.lockのファイルロックで保護する（unpacked_template）
+_unpack_lock = threading.Lock()
+_unpack_locks = {}
+
+# 展開済みストアからプロジェクトへの配置方法（SPECIFY_MATERIALIZEで上書き可）
+# auto: reflinkが使えればストアから配置、使えなければzipから直接展開
+# hardlink: reflink → ハードリンク → コピーの順でストアから配置 / copy: 常にzipから直接展開
+# ハードリンクしたファイルはストアや他のプロジェクトと実体を共有するため、その場で書き換えると全てに波及する
+# そのためユーザーが編集する前提のディレクトリはハードリンクせず、rootで実行中（0444を無視して書けてしまう）は使わない
+DEFAULT_MATERIALIZE = "auto"
+MATERIALIZE_EDITABLE_DIRS = ("memory", "templates")
+# ファイルシステムの組（キャッシュ, 展開先）ごとのreflink対応可否
+_reflink_support = {}
+# Linuxのioctl FICLONE（btrfs・XFS等でのreflink）
+FICLONE = 0x40049409
+
+# テンプレートキャッシュの上限サイズ（SPECIFY_CACHE_MAX_BYTESで上書き可）
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# キャッシュのblob・展開済みストアの名前（SHA-256）
+CACHE_BLOB_NAME = re.compile(r"[0-9a-f]{64}")
+# 中断したダウンロードの残骸（.part・.part.json・.part.lock）を残す期間（SPECIFY_PARTIAL_TTLで上書き可）
+DEFAULT_PARTIAL_TTL = 7 * 24 * 60 * 60
+
+# キャッシュを使わない場合、このサイズ以下のアーカイブはメモリ上で扱う
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+# 5xx・タイムアウト時の再試行回数（SPECIFY_HTTP_RETRIESで上書き可）
+DEFAULT_HTTP_RETRIES = 3
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# 全GitHub通信で共有するhttpxクライアント（get_http_clientで遅延生成）
+_http_client = None
+_http_client_lock = threading.Lock()
+
+# このサイズ以上のアセットはRangeリクエストで分割して並列ダウンロード
+PARALLEL_DOWNLOAD_MIN_BYTES = 8 * 1024 * 1024
+DOWNLOAD_SEGMENT_MIN_BYTES = 4 * 1024 * 1024
+MAX_DOWNLOAD_SEGMENTS = 4
+
+# テンプレートzipの展開上限（zip bomb対策。SPECIFY_TEMPLATE_MAX_ENTRIES / _MAX_BYTES / _MAX_RATIOで上書き可）
+DEFAULT_TEMPLATE_MAX_ENTRIES = 20_000
+DEFAULT_TEMPLATE_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_TEMPLATE_MAX_RATIO = 200
+# 圧縮率の上限はこのサイズ以上のエントリにだけ適用（小さなテキストは圧縮率が高くなりやすい）
+TEMPLATE_RATIO_MIN_BYTES = 1024 * 1024
+# 展開時にエントリごとにコピーするバッファのサイズ
+EXTRACT_BUFFER_BYTES = 1024 * 1024
+# --here のマージで差分ファイルを書き込むスレッド数
+MERGE_COPY_WORKERS = 8
+
+# リリース情報を再確認せずに使う秒数（SPECIFY_METADATA_TTLで上書き可）
+DEFAULT_METADATA_TTL = 10 * 60
+
+# ツールのバージョン検出結果を再利用する秒数（SPECIFY_TOOL_CACHE_TTLで上書き可）
+DEFAULT_TOOL_CACHE_TTL = 60 * 60
+
+TOOL_INSTALL_HINTS = {
+    "git": "https://git-scm.com/downloads",
+    "claude": "https://docs.anthropic.com/en/docs/claude-code/setup からインストール",
+    "gemini": "https://github.com/google-gemini/gemini-cli からインストール",
+}
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    return f"{seconds:.1f}s"
+
+
 class StepTracker:
     """
     ステップの進捗を階層的に管理・表示するクラス（絵文字なし、Claude Code風ツリー出力）。
-    コールバックによるライブ自動リフレッシュ対応。
+    Liveに直接渡すと、Live側のrefresh_per_secondごとに最新状態が描画される。
     """
     def __init__(self, title: str):
         self.title = title
-        self.steps = []  # list of dicts: {key, label, status, detail}
+        self.steps = []  # list of dicts: {key, label, status, detail, started, ended, tid, metrics}
         self.status_order = {"pending": 0, "running": 1, "done": 2, "error": 3, "skipped": 4}
-        self._refresh_cb = None  # callable to trigger UI refresh
-
-    def attach_refresh(self, cb):
-        self._refresh_cb = cb  # UIリフレッシュ用コールバックを登録
+        self._lock = threading.RLock()  # --batchのワーカースレッドから更新されるため
+        self._index = {}  # key -> step
+        self._tree = None  # 描画済みのTree（変更されたステップのノードだけ差し替える）
+        self._nodes = {}  # key -> TreeNode
+        self._dirty = set()  # 再描画が必要なステップのkey
+        self.created = time.monotonic()  # トレースの時刻原点
+        self.created_wall = time.time()
 
     def add(self, key: str, label: str):
-        if key not in [s["key"] for s in self.steps]:
-            self.steps.append({"key": key, "label": label, "status": "pending", "detail": ""})
-            self._maybe_refresh()  # ステップ追加時にリフレッシュ
-
-    def start(self, key: str, detail: str = ""):
-        self._update(key, status="running", detail=detail)
-
-    def complete(self, key: str, detail: str = ""):
-        self._update(key, status="done", detail=detail)
-
-    def error(self, key: str, detail: str = ""):
-        self._update(key, status="error", detail=detail)
-
-    def skip(self, key: str, detail: str = ""):
-        self._update(key, status="skipped", detail=detail)
-
-    def _update(self, key: str, status: str, detail: str):
-        for s in self.steps:
-            if s["key"] == key:
-                s["status"] = status
-                if detail:
-                    s["detail"] = detail
-                self._maybe_refresh()
-                return
-        # If not present, add it
-        self.steps.append({"key": key, "label": key, "status": status, "detail": detail})
-        self._maybe_refresh()
-
-    def _maybe_refresh(self):
-        if self._refresh_cb:
-            try:
-                self._refresh_cb()
-            except Exception:
-                pass
+        with self._lock:
+            if key not in self._index:
+                self._append(self._new_step(key, label, "pending", ""))
+
+    def start(self, key: str, detail: str = "", **metrics):
+        self._update(key, status="running", detail=detail, metrics=metrics)
+
+    def complete(self, key: str, detail: str = "", **metrics):
+        self._update(key, status="done", detail=detail, metrics=metrics)
+
+    def error(self, key: str, detail: str = "", **metrics):
+        self._update(key, status="error", detail=detail, metrics=metrics)
+
+    def skip(self, key: str, detail: str = "", **metrics):
+        self._update(key, status="skipped", detail=detail, metrics=metrics)
+
+    @staticmethod
+    def _new_step(key: str, label: str, status: str, detail: str) -> dict:
+        return {"key": key, "label": label, "status": status, "detail": detail,
+                "started": None, "ended": None, "tid": None, "metrics": {}}
+
+    def _append(self, step: dict):
+        self.steps.append(step)
+        self._index[step["key"]] = step
+
+    def _update(self, key: str, status: str, detail: str, metrics: dict | None = None):
+        now = time.monotonic()
+        with self._lock:
+            step = self._index.get(key)
+            if step is None:
+                # If not present, add it
+                step = self._new_step(key, key, status, "")
+                self._append(step)
+            step["status"] = status
+            if detail:
+                step["detail"] = detail
+            if metrics:
+                step["metrics"].update(metrics)
+            # 最初のstartからdone/error/skippedまでを所要時間とする
+            if status == "running":
+                if step["started"] is None:
+                    step["started"] = now
+                    step["tid"] = threading.get_native_id()
+                step["ended"] = None
+            else:
+                step["ended"] = now
+            self._dirty.add(key)
+
+    def duration(self, key: str) -> float | None:
+        """
+        ステップの所要時間（秒）。開始・終了の両方が記録されていなければNone
+        """
+        step = self._index.get(key)
+        if step is None or step["started"] is None or step["ended"] is None:
+            return None
+        return step["ended"] - step["started"]
+
+    def trace_events(self) -> list[dict]:
+        """
+        Chrome trace形式（完了イベント "ph": "X"）のイベント一覧
+        tsとdurはトラッカー生成時からのマイクロ秒
+        """
+        events = []
+        with self._lock:
+            for step in self.steps:
+                if step["started"] is None or step["ended"] is None:
+                    continue
+                events.append({
+                    "name": step["label"],
+                    "cat": step["key"],
+                    "ph": "X",
+                    "ts": round((step["started"] - self.created) * 1e6),
+                    "dur": round((step["ended"] - step["started"]) * 1e6),
+                    "pid": os.getpid(),
+                    "tid": step["tid"] or 0,
+                    "args": {"status": step["status"], "detail": step["detail"], **step["metrics"]},
+                })
+        return events
+
+    def write_trace(self, path: Path) -> None:
+        """
+        トレースを書き出す
+        .jsonl / .ndjson は1ステップ1行で追記（多数の実行を1ファイルに集計する用途）、
+        それ以外はchrome://tracing や Perfetto で開けるJSON
+        """
+        events = self.trace_events()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in (".jsonl", ".ndjson"):
+            run = {"title": self.title, "started_at": self.created_wall}
+            with open(path, "a", encoding="utf-8") as f:
+                for event in events:
+                    f.write(json.dumps({**run, **event}, ensure_ascii=False) + "\n")
+        else:
+            _write_json_atomic(path, {
+                "traceEvents": events,
+                "displayTimeUnit": "ms",
+                "otherData": {"title": self.title, "started_at": self.created_wall},
+            })
 
+    def __rich__(self):
+        # Liveに直接渡すと、Live側のrefresh_per_secondごとに最新状態を描画する
+        return self.render()
 
     def render(self):
-        tree = Tree(f"[bold cyan]{self.title}[/bold cyan]", guide_style="grey50")
-        for step in self.steps:
-            label = step["label"]
-            detail_text = step["detail"].strip() if step["detail"] else ""
-
-            # ステータスごとに記号を色分け
-            status = step["status"]
-            if status == "done":
-                symbol = "[green]●[/green]"
-            elif status == "pending":
-                symbol = "[green dim]○[/green dim]"
-            elif status == "running":
-                symbol = "[cyan]○[/cyan]"
-            elif status == "error":
-                symbol = "[red]●[/red]"
-            elif status == "skipped":
-                symbol = "[yellow]○[/yellow]"
-            else:
-                symbol = " "
+        """
+        ツリーを返す。前回のツリーを使い回し、追加・変更されたステップのノードだけ作り直す
+        """
+        from rich.tree import Tree
+
+        with self._lock:
+            if self._tree is None:
+                self._tree = Tree(f"[bold cyan]{self.title}[/bold cyan]", guide_style="grey50")
+            for key in self._dirty:
+                if key in self._nodes:
+                    self._nodes[key].label = self._render_step(self._index[key])
+            self._dirty.clear()
+            for step in self.steps[len(self._nodes):]:
+                self._nodes[step["key"]] = self._tree.add(self._render_step(step))
+            return self._tree
+
+    def _render_step(self, step: dict):
+        label = step["label"]
+        detail_text = step["detail"].strip() if step["detail"] else ""
+        elapsed = self.duration(step["key"])
+        if elapsed is not None and elapsed >= 0.001:
+            # 所要時間を詳細の後ろに付ける
+            elapsed_text = _format_duration(elapsed)
+            detail_text = f"{detail_text}, {elapsed_text}" if detail_text else elapsed_text
+
+        # ステータスごとに記号を色分け
+        status = step["status"]
+        if status == "done":
+            symbol = "[green]●[/green]"
+        elif status == "pending":
+            symbol = "[green dim]○[/green dim]"
+        elif status == "running":
+            symbol = "[cyan]○[/cyan]"
+        elif status == "error":
+            symbol = "[red]●[/red]"
+        elif status == "skipped":
+            symbol = "[yellow]○[/yellow]"
+        else:
+            symbol = " "
 
-            if status == "pending":
-                # pendingは全体を薄いグレーで表示
-                if detail_text:
-                    line = f"{symbol} [bright_black]{label} ({detail_text})[/bright_black]"
-                else:
-                    line = f"{symbol} [bright_black]{label}[/bright_black]"
+        if status == "pending":
+            # pendingは全体を薄いグレーで表示
+            if detail_text:
+                line = f"{symbol} [bright_black]{label} ({detail_text})[/bright_black]"
             else:
-                # 完了・実行中などはラベル白、詳細は薄グレー
-                if detail_text:
-                    line = f"{symbol} [white]{label}[/white] [bright_black]({detail_text})[/bright_black]"
-                else:
-                    line = f"{symbol} [white]{label}[/white]"
-
-            tree.add(line)
-        return tree
+                line = f"{symbol} [bright_black]{label}[/bright_black]"
+        else:
+            # 完了・実行中などはラベル白、詳細は薄グレー
+            if detail_text:
+                line = f"{symbol} [white]{label}[/white] [bright_black]({detail_text})[/bright_black]"
+            else:
+                line = f"{symbol} [white]{label}[/white]"
+        # 文字列をTree.addに渡した場合と同じ変換（markup・ハイライト）を1回だけ行う
+        return get_console().render_str(line)
 
 
 
@@ -165,6 +332,8 @@ def get_key():
     """
     readcharを使ってクロスプラットフォームで1キー入力を取得
     """
+    import readchar
+
     key = readchar.readkey()
 
     # Arrow keys
@@ -201,6 +370,10 @@ def select_with_arrows(options: dict, prompt_text: str = "オプションを選
     Returns:
         選択されたkey
     """
+    from rich.live import Live
+    from rich.panel import Panel
+    from rich.table import Table
+
     option_keys = list(options.keys())
     if default_key and default_key in option_keys:
         selected_index = option_keys.index(default_key)
@@ -235,7 +408,7 @@ def select_with_arrows(options: dict, prompt_text: str = "オプションを選
 
     def run_selection_loop():
         nonlocal selected_key, selected_index
-        with Live(create_selection_panel(), console=console, transient=True, auto_refresh=False) as live:
+        with Live(create_selection_panel(), console=get_console(), transient=True, auto_refresh=False) as live:
             while True:
                 try:
                     key = get_key()
@@ -268,7 +441,31 @@ def select_with_arrows(options: dict, prompt_text: str = "オプションを選
 
 
 
-console = Console()
+_console = None
+
+
+def get_console():
+    """
+    共有のrich.console.Consoleを返す（初回呼び出し時に生成）
+    """
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+class _LazyConsole:
+    """
+    属性アクセスをget_console()に委譲するプロキシ（rich.consoleのimportを遅らせる）
+    rich側にConsoleを渡す場合はget_console()の戻り値を使うこと
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_console(), name)
+
+
+console = _LazyConsole()
 
 
 
@@ -278,8 +475,9 @@ class BannerGroup(TyperGroup):
     """
 
     def format_help(self, ctx, formatter):
-        # Show banner before help
-        show_banner()
+        # Show banner before help (端末以外への出力ではスキップ)
+        if console.is_terminal:
+            show_banner()
         super().format_help(ctx, formatter)
 
 
@@ -296,6 +494,9 @@ def show_banner():
     """
     ASCIIアートバナーを表示
     """
+    from rich.align import Align
+    from rich.text import Text
+
     banner_lines = BANNER.strip().split('\n')
     colors = ["bright_blue", "blue", "cyan", "bright_cyan", "white", "bright_white"]
 
@@ -309,12 +510,35 @@ def show_banner():
     console.print()
 
 
+def get_version() -> str:
+    """
+    インストール済みのspecify-cliのバージョンを返す
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("specify-cli")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _version_callback(value: bool):
+    if value:
+        print(f"specify {get_version()}")
+        raise typer.Exit()
+
+
 @app.callback()
-def callback(ctx: typer.Context):
+def callback(
+    ctx: typer.Context,
+    version: bool = typer.Option(False, "--version", help="Show the version and exit", is_eager=True, callback=_version_callback),
+):
     """Show banner when no subcommand is provided."""
     # Show banner only when no subcommand and no help flag
     # (help is handled by BannerGroup)
     if ctx.invoked_subcommand is None and "--help" not in sys.argv and "-h" not in sys.argv:
+        from rich.align import Align
+
         show_banner()
         console.print(Align.center("[dim]'specify --help' で使い方を表示[/dim]"))
         console.print()
@@ -341,11 +565,12 @@ def run_command(cmd: list[str], check_return: bool = True, capture: bool = False
         return None
 
 
-def check_tool(tool: str, install_hint: str) -> bool:
+def check_tool(tool: str, install_hint: str, info: dict | None = None) -> bool:
     """
     ツールがインストールされているか確認
+    info: detect_toolsの結果（省略時はPATHを検索）
     """
-    if shutil.which(tool):
+    if info["found"] if info is not None else shutil.which(tool):
         return True
     else:
         console.print(f"[yellow]⚠️  {tool} not found[/yellow]")
@@ -353,9 +578,82 @@ def check_tool(tool: str, install_hint: str) -> bool:
         return False
 
 
+def _tool_cache_ttl() -> float:
+    try:
+        return float(os.environ.get("SPECIFY_TOOL_CACHE_TTL", DEFAULT_TOOL_CACHE_TTL))
+    except ValueError:
+        return DEFAULT_TOOL_CACHE_TTL
+
+
+def _tool_version(path: str) -> str | None:
+    """
+    `<tool> --version` の出力1行目（取得できなければNone）
+    """
+    try:
+        result = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = (result.stdout or result.stderr).strip().splitlines()
+    return lines[0].strip() if result.returncode == 0 and lines else None
+
+
+def detect_tools(tools: list[str], *, with_version: bool = False) -> dict[str, dict]:
+    """
+    複数ツールを並列に検出
+    バージョンは実行ファイルのパスとmtimeが同じならユーザーキャッシュの値を再利用（TTL内）
+    戻り値: {tool: {"found", "path", "mtime", "version"}}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache_path = get_cache_dir() / "tools.json"
+    cache = {}
+    if with_version:
+        try:
+            cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cache = {}
+    now = time.time()
+    ttl = _tool_cache_ttl()
+
+    def detect(tool: str) -> dict:
+        path = shutil.which(tool)
+        info = {"found": path is not None, "path": path, "mtime": None, "version": None}
+        if path is None:
+            return info
+        try:
+            info["mtime"] = os.stat(path).st_mtime
+        except OSError:
+            pass
+        if with_version:
+            cached = cache.get(tool)
+            if (cached and cached.get("path") == path and cached.get("mtime") == info["mtime"]
+                    and now - cached.get("checked_at", 0) < ttl):
+                info["version"] = cached.get("version")
+            else:
+                info["version"] = _tool_version(path)
+        return info
+
+    with ThreadPoolExecutor(max_workers=max(1, len(tools))) as pool:
+        results = dict(zip(tools, pool.map(detect, tools)))
+
+    if with_version:
+        for tool, info in results.items():
+            if info["found"]:
+                cached = cache.get(tool)
+                if not (cached and cached.get("path") == info["path"] and cached.get("mtime") == info["mtime"]
+                        and cached.get("version") == info["version"] and now - cached.get("checked_at", 0) < ttl):
+                    cache[tool] = {"path": info["path"], "mtime": info["mtime"], "version": info["version"], "checked_at": now}
+        try:
+            _write_json_atomic(cache_path, cache)
+        except OSError:
+            pass  # キャッシュに書けなくても検出結果はそのまま使う
+    return results
+
+
 def is_git_repo(path: Path = None) -> bool:
     """
     指定パスがgitリポジトリ内か判定
+    親ディレクトリをたどって .git を探す（サブプロセスを起動しない）
     """
     if path is None:
         path = Path.cwd()
@@ -363,32 +661,51 @@ def is_git_repo(path: Path = None) -> bool:
     if not path.is_dir():
         return False
 
-    try:
-        # Use git command to check if inside a work tree
-        subprocess.run(
-            ["git", "rev-parse", "--is-inside-work-tree"],
-            check=True,
-            capture_output=True,
-            cwd=path,
-        )
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    if os.environ.get("GIT_DIR"):
+        # GIT_DIR指定時の解決規則はgitに任せる
+        try:
+            subprocess.run(["git", "rev-parse", "--is-inside-work-tree"], check=True, capture_output=True, cwd=path)
+            return True
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return False
+
+    return find_git_root(path) is not None
+
+
+def find_git_root(path: Path | None = None) -> tuple[Path, Path] | None:
+    """
+    親ディレクトリをたどってgitの作業ツリーを探す（`git rev-parse --show-toplevel` 相当）
+    戻り値: (作業ツリーのルート, gitディレクトリ)。見つからなければNone
+    """
+    path = (path or Path.cwd()).resolve()
+    for parent in (path, *path.parents):
+        dot_git = parent / ".git"
+        # .git はディレクトリ（通常）またはファイル（worktree・submodule）
+        if dot_git.is_dir():
+            return parent, dot_git
+        if dot_git.is_file():
+            content = dot_git.read_text(encoding="utf-8", errors="replace").strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                return parent, (git_dir if git_dir.is_absolute() else (parent / git_dir).resolve())
+    return None
+
+
+INITIAL_COMMIT_MESSAGE = "Initial commit from Specify template"
 
 
 def init_git_repo(project_path: Path, quiet: bool = False) -> bool:
     """
     指定パスでgitリポジトリを初期化
     quiet=Trueで出力抑制（trackerで管理）
+    オブジェクト・インデックスの書き込みはgitに任せる（除外ルール・属性・フック・署名などの設定がそのまま効く）
     """
     try:
-        original_cwd = Path.cwd()
-        os.chdir(project_path)
         if not quiet:
             console.print("[cyan]Initializing git repository...[/cyan]")
-        subprocess.run(["git", "init"], check=True, capture_output=True)
-        subprocess.run(["git", "add", "."], check=True, capture_output=True)
-        subprocess.run(["git", "commit", "-m", "Initial commit from Specify template"], check=True, capture_output=True)
+        # cwdを渡してos.chdirを避ける（並列実行時も安全）
+        for cmd in (["git", "init"], ["git", "add", "."], ["git", "commit", "-m", INITIAL_COMMIT_MESSAGE]):
+            subprocess.run(cmd, check=True, capture_output=True, cwd=project_path)
         if not quiet:
             console.print("[green]✓[/green] Git repository initialized")
         return True
@@ -397,500 +714,4009 @@ def init_git_repo(project_path: Path, quiet: bool = False) -> bool:
         if not quiet:
             console.print(f"[red]Error initializing git repository:[/red] {e}")
         return False
-    finally:
-        os.chdir(original_cwd)
 
 
-def download_template_from_github(ai_assistant: str, download_dir: Path, *, verbose: bool = True, show_progress: bool = True):
+def get_cache_dir() -> Path:
     """
-    GitHubから最新テンプレートリリースをダウンロード
-    戻り値: (zip_path, metadata_dict)
+    Specify CLIのユーザーキャッシュディレクトリを返す
+    SPECIFY_CACHE_DIR環境変数で上書き可能
     """
-    repo_owner = "github"
-    repo_name = "spec-kit"
+    from platformdirs import user_cache_dir
 
-    if verbose:
-        console.print("[cyan]Fetching latest release information...[/cyan]")
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
+    override = os.environ.get("SPECIFY_CACHE_DIR")
+    if override:
+        return Path(override).expanduser()
+    return Path(user_cache_dir("specify-cli", appauthor=False))
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    """
+    一時ファイル経由でJSONをアトミックに書き込む
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
+
+@contextmanager
+def _file_lock(path: Path, *, blocking: bool = True, shared: bool = False):
+    """
+    プロセス間の排他ロック（POSIXはflock、Windowsはmsvcrt.locking）。ロックファイルは残したままにする
+    shared=Trueで共有ロック（POSIXのみ。Windowsでは排他ロックになる）
+    yieldする値: ロックを取得できたか（blocking=Trueなら常にTrue）
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    acquired = False
     try:
-        response = httpx.get(api_url, timeout=30, follow_redirects=True)
-        response.raise_for_status()
-        release_data = response.json()
-    except httpx.RequestError as e:
-        if verbose:
-            console.print(f"[red]Error fetching release information:[/red] {e}")
-        raise typer.Exit(1)
+        if os.name == "nt":
+            import msvcrt
 
-    # Find the template asset for the specified AI assistant
-    pattern = f"spec-kit-template-{ai_assistant}"
-    matching_assets = [
-        asset for asset in release_data.get("assets", [])
-        if pattern in asset["name"] and asset["name"].endswith(".zip")
-    ]
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    acquired = True
+                    break
+                except OSError:
+                    if not blocking:
+                        break
+                    time.sleep(0.05)
+        else:
+            import fcntl
 
-    if not matching_assets:
-        if verbose:
-            console.print(f"[red]Error:[/red] No template found for AI assistant '{ai_assistant}'")
-            console.print(f"[yellow]Available assets:[/yellow]")
-            for asset in release_data.get("assets", []):
-                console.print(f"  - {asset['name']}")
-        raise typer.Exit(1)
+            try:
+                fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB))
+                acquired = True
+            except BlockingIOError:
+                pass
+        yield acquired
+    finally:
+        if acquired and os.name == "nt":
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        # POSIXのflockはfdを閉じると解放される
+        os.close(fd)
 
-    # Use the first matching asset
-    asset = matching_assets[0]
-    download_url = asset["browser_download_url"]
-    filename = asset["name"]
-    file_size = asset["size"]
 
-    if verbose:
-        console.print(f"[cyan]Found template:[/cyan] {filename}")
-        console.print(f"[cyan]Size:[/cyan] {file_size:,} bytes")
-        console.print(f"[cyan]Release:[/cyan] {release_data['tag_name']}")
+def _write_text_atomic(path: Path, text: str) -> None:
+    """
+    一時ファイル経由でテキストをアトミックに書き込む
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-    # Download the file
-    zip_path = download_dir / filename
-    if verbose:
-        console.print(f"[cyan]Downloading template...[/cyan]")
 
-    try:
-        with httpx.stream("GET", download_url, timeout=30, follow_redirects=True) as response:
-            response.raise_for_status()
-            total_size = int(response.headers.get('content-length', 0))
+def _template_cache_root() -> Path:
+    return get_cache_dir() / "templates"
 
-            with open(zip_path, 'wb') as f:
-                if total_size == 0:
-                    # No content-length header, download without progress
-                    for chunk in response.iter_bytes(chunk_size=8192):
-                        f.write(chunk)
-                else:
-                    if show_progress:
-                        # Show progress bar
-                        with Progress(
-                            SpinnerColumn(),
-                            TextColumn("[progress.description]{task.description}"),
-                            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                            console=console,
-                        ) as progress:
-                            task = progress.add_task("Downloading...", total=total_size)
-                            downloaded = 0
-                            for chunk in response.iter_bytes(chunk_size=8192):
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                progress.update(task, completed=downloaded)
-                    else:
-                        # Silent download loop
-                        for chunk in response.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
 
-    except httpx.RequestError as e:
-        if verbose:
-            console.print(f"[red]Error downloading template:[/red] {e}")
-        if zip_path.exists():
-            zip_path.unlink()
-        raise typer.Exit(1)
-    if verbose:
-        console.print(f"Downloaded: {filename}")
-    metadata = {
-        "filename": filename,
-        "size": file_size,
-        "release": release_data["tag_name"],
-        "asset_url": download_url
-    }
-    return zip_path, metadata
+@contextmanager
+def _cache_index_lock(root: Path):
+    """
+    index.jsonの読み込み〜書き戻しを、同じプロセスのスレッド間・別プロセス間の両方で直列化する
+    """
+    with _cache_lock, _file_lock(root / "index.lock"):
+        yield
 
 
-def download_and_extract_template(project_path: Path, ai_assistant: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None) -> Path:
+def _load_cache_index(root: Path) -> dict:
     """
-    最新リリースをダウンロードし展開して新規プロジェクト作成
-    tracker指定時は進捗を記録
-    戻り値: project_path
+    テンプレートキャッシュのインデックスを読み込む（破損時は空）
     """
-    current_dir = Path.cwd()
+    try:
+        with open(root / "index.json", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {"entries": {}}
+    if not isinstance(index, dict) or not isinstance(index.get("entries"), dict):
+        return {"entries": {}}
+    return index
 
-    # Step: fetch + download combined
-    if tracker:
-        tracker.start("fetch", "contacting GitHub API")
+
+def _partial_ttl() -> float:
     try:
-        zip_path, meta = download_template_from_github(
-            ai_assistant,
-            current_dir,
-            verbose=verbose and tracker is None,
-            show_progress=(tracker is None)
-        )
-        if tracker:
-            tracker.complete("fetch", f"release {meta['release']} ({meta['size']:,} bytes)")
-            tracker.add("download", "Download template")
-            tracker.complete("download", meta['filename'])  # already downloaded inside helper
-    except Exception as e:
-        if tracker:
-            tracker.error("fetch", str(e))
-        else:
-            if verbose:
-                console.print(f"[red]Error downloading template:[/red] {e}")
-        raise
+        return float(os.environ.get("SPECIFY_PARTIAL_TTL", DEFAULT_PARTIAL_TTL))
+    except ValueError:
+        return DEFAULT_PARTIAL_TTL
 
-    if tracker:
-        tracker.add("extract", "Extract template")
-        tracker.start("extract")
-    elif verbose:
-        console.print("Extracting template...")
 
+def _current_releases(release: str) -> set[str]:
+    """
+    中断したダウンロードを再開する見込みのあるリリース
+    （登録中のエントリのリリースと、保存済みリリース情報の最新タグ）
+    """
+    releases = {release}
+    for store_path in (get_cache_dir() / "metadata").glob("*-latest.json"):
+        stored = _load_release_store(store_path)
+        if stored and isinstance(stored["release"], dict) and "tag_name" in stored["release"]:
+            releases.add(stored["release"]["tag_name"])
+    return releases
+
+
+def _evict_partial_downloads(blobs_dir: Path, release: str) -> int:
+    """
+    中断したダウンロードの残骸（.part・.part.json・.part.lock）を整理
+    最新でないリリースのもの、TTLより古いものは削除する（ダウンロード中でロックされているものは残す）
+    戻り値: 残した残骸の合計サイズ
+    """
+    groups = {}
+    for path in blobs_dir.glob(".*.part*"):
+        name = path.name.removesuffix(".json").removesuffix(".lock")
+        if name.endswith(".part"):
+            groups.setdefault(name, []).append(path)
+
+    prefixes = tuple(f".{current.replace('/', '_')}-" for current in _current_releases(release))
+    expires = time.time() - _partial_ttl()
+    kept_bytes = 0
+    for name, paths in groups.items():
+        stats = {}
+        for path in paths:
+            try:
+                stats[path] = path.stat()
+            except OSError:
+                pass
+        size = sum(st.st_size for st in stats.values())
+        if name.startswith(prefixes) and any(st.st_mtime >= expires for st in stats.values()):
+            kept_bytes += size
+            continue
+        lock_path = blobs_dir / f"{name}.lock"
+        with _file_lock(lock_path, blocking=False) as owned:
+            if not owned:
+                kept_bytes += size
+                continue
+            (blobs_dir / name).unlink(missing_ok=True)
+            (blobs_dir / f"{name}.json").unlink(missing_ok=True)
+            # ロックを保持したまま消す（待っていたプロセスは削除済みのファイルをロックするが、
+            # ダウンロード後のサイズ・SHA-256検証で不整合は検出される）
+            lock_path.unlink(missing_ok=True)
+    return kept_bytes
+
+
+def _evict_template_cache(root: Path, index: dict, keep: str) -> None:
+    """
+    合計サイズが上限を超えた分を最終使用時刻の古い順（LRU）に削除
+    同一SHA-256のblobは複数キーから参照されても1回だけ数える
+    どのエントリからも参照されないblob・展開済みストア、古い中断ダウンロードも削除する（_cache_index_lock内で呼ぶこと）
+    """
     try:
-        # Create project directory only if not using current directory
-        if not is_current_dir:
-            project_path.mkdir(parents=True)
+        max_bytes = int(os.environ.get("SPECIFY_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+    except ValueError:
+        max_bytes = DEFAULT_CACHE_MAX_BYTES
+
+    entries = index["entries"]
+    blob_sizes = {e["sha256"]: e["size"] for e in entries.values()}
+    # 残した中断ダウンロードは削除できないが、上限の計算には含める
+    total = sum(blob_sizes.values()) + _evict_partial_downloads(root / "blobs", entries[keep]["release"])
+    for key in sorted(entries, key=lambda k: entries[k].get("last_used", 0)):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        sha256 = entries.pop(key)["sha256"]
+        if not any(e["sha256"] == sha256 for e in entries.values()):
+            total -= blob_sizes[sha256]
+            (root / "blobs" / f"{sha256}.zip").unlink(missing_ok=True)
+            _remove_unpacked_template(sha256)
+
+    # インデックスの更新が失われた等で参照されなくなったもの（上限の計算に入らず残り続けるため）
+    referenced = {e["sha256"] for e in entries.values()}
+    for path in [*(root / "blobs").glob("*.zip"), *_unpacked_root().glob("*.json")]:
+        sha256 = path.stem
+        if CACHE_BLOB_NAME.fullmatch(sha256) and sha256 not in referenced:
+            if path.suffix == ".zip":
+                path.unlink(missing_ok=True)
+            _remove_unpacked_template(sha256)
+
+
+def cache_lookup(release: str, asset_name: str) -> tuple[Path, str] | None:
+    """
+    リリースタグ+アセット名でキャッシュを検索
+    blobのサイズとmtimeが登録時と同じならそのまま使い、異なる場合だけSHA-256をインデックスと照合する
+    （ハッシュ計算はインデックスのロック外で行う）
+    ヒット時は (blobパス, sha256) を返して最終使用時刻を更新
+    """
+    root = _template_cache_root()
+    key = f"{release}/{asset_name}"
+    with _cache_index_lock(root):
+        index = _load_cache_index(root)
+        entry = index["entries"].get(key)
+        if not entry:
+            return None
+        sha256 = entry["sha256"]
+        blob_path = root / "blobs" / f"{sha256}.zip"
+        try:
+            st = blob_path.stat()
+        except OSError:
+            st = None
+        if st is not None and st.st_size == entry["size"] and st.st_mtime_ns == entry.get("mtime_ns"):
+            entry["last_used"] = time.time()
+            _write_json_atomic(root / "index.json", index)
+            return blob_path, sha256
 
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # List all files in the ZIP for debugging
-            zip_contents = zip_ref.namelist()
-            if tracker:
-                tracker.start("zip-list")
-                tracker.complete("zip-list", f"{len(zip_contents)} entries")
-            elif verbose:
-                console.print(f"[cyan]ZIP contains {len(zip_contents)} items[/cyan]")
+    try:
+        valid = st is not None and st.st_size == entry["size"] and _file_sha256(blob_path) == sha256
+    except OSError:
+        valid = False
 
-            # For current directory, extract to a temp location first
-            if is_current_dir:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    zip_ref.extractall(temp_path)
-
-                    # Check what was extracted
-                    extracted_items = list(temp_path.iterdir())
-                    if tracker:
-                        tracker.start("extracted-summary")
-                        tracker.complete("extracted-summary", f"temp {len(extracted_items)} items")
-                    elif verbose:
-                        console.print(f"[cyan]Extracted {len(extracted_items)} items to temp location[/cyan]")
-
-                    # Handle GitHub-style ZIP with a single root directory
-                    source_dir = temp_path
-                    if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                        source_dir = extracted_items[0]
-                        if tracker:
-                            tracker.add("flatten", "Flatten nested directory")
-                            tracker.complete("flatten")
-                        elif verbose:
-                            console.print(f"[cyan]Found nested directory structure[/cyan]")
-
-                    # Copy contents to current directory
-                    for item in source_dir.iterdir():
-                        dest_path = project_path / item.name
-                        if item.is_dir():
-                            if dest_path.exists():
-                                if verbose and not tracker:
-                                    console.print(f"[yellow]Merging directory:[/yellow] {item.name}")
-                                # Recursively copy directory contents
-                                for sub_item in item.rglob('*'):
-                                    if sub_item.is_file():
-                                        rel_path = sub_item.relative_to(item)
-                                        dest_file = dest_path / rel_path
-                                        dest_file.parent.mkdir(parents=True, exist_ok=True)
-                                        shutil.copy2(sub_item, dest_file)
-                            else:
-                                shutil.copytree(item, dest_path)
-                        else:
-                            if dest_path.exists() and verbose and not tracker:
-                                console.print(f"[yellow]Overwriting file:[/yellow] {item.name}")
-                            shutil.copy2(item, dest_path)
-                    if verbose and not tracker:
-                        console.print(f"[cyan]Template files merged into current directory[/cyan]")
-            else:
-                # Extract directly to project directory (original behavior)
-                zip_ref.extractall(project_path)
-
-                # Check what was extracted
-                extracted_items = list(project_path.iterdir())
-                if tracker:
-                    tracker.start("extracted-summary")
-                    tracker.complete("extracted-summary", f"{len(extracted_items)} top-level items")
-                elif verbose:
-                    console.print(f"[cyan]Extracted {len(extracted_items)} items to {project_path}:[/cyan]")
-                    for item in extracted_items:
-                        console.print(f"  - {item.name} ({'dir' if item.is_dir() else 'file'})")
-
-                # Handle GitHub-style ZIP with a single root directory
-                if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                    # Move contents up one level
-                    nested_dir = extracted_items[0]
-                    temp_move_dir = project_path.parent / f"{project_path.name}_temp"
-                    # Move the nested directory contents to temp location
-                    shutil.move(str(nested_dir), str(temp_move_dir))
-                    # Remove the now-empty project directory
-                    project_path.rmdir()
-                    # Rename temp directory to project directory
-                    shutil.move(str(temp_move_dir), str(project_path))
-                    if tracker:
-                        tracker.add("flatten", "Flatten nested directory")
-                        tracker.complete("flatten")
-                    elif verbose:
-                        console.print(f"[cyan]Flattened nested directory structure[/cyan]")
+    with _cache_index_lock(root):
+        index = _load_cache_index(root)
+        entry = index["entries"].get(key)
+        try:
+            current = blob_path.stat()
+        except OSError:
+            current = None
+        if not entry or entry["sha256"] != sha256 or (st and current and current.st_mtime_ns != st.st_mtime_ns):
+            # 照合中に別プロセスがエントリやblobを更新した（その結果は信用せずミスとして扱う）
+            return None
+        if not valid:
+            # blobが消えている・壊れている場合はエントリごと破棄
+            blob_path.unlink(missing_ok=True)
+            del index["entries"][key]
+            _write_json_atomic(root / "index.json", index)
+            return None
 
-    except Exception as e:
-        if tracker:
-            tracker.error("extract", str(e))
-        else:
-            if verbose:
-                console.print(f"[red]Error extracting template:[/red] {e}")
-        # Clean up project directory if created and not current directory
-        if not is_current_dir and project_path.exists():
-            shutil.rmtree(project_path)
-        raise typer.Exit(1)
-    else:
-        if tracker:
-            tracker.complete("extract")
-    finally:
-        if tracker:
-            tracker.add("cleanup", "Remove temporary archive")
-        # Clean up downloaded ZIP file
-        if zip_path.exists():
-            zip_path.unlink()
-            if tracker:
-                tracker.complete("cleanup")
-            elif verbose:
-                console.print(f"Cleaned up: {zip_path.name}")
+        # 照合済みのmtimeを記録し、次回からはハッシュ計算を省く
+        entry["mtime_ns"] = current.st_mtime_ns
+        entry["last_used"] = time.time()
+        _write_json_atomic(root / "index.json", index)
+        return blob_path, sha256
 
-    return project_path
+
+def cache_lookup_latest(asset_prefix: str, release: str | None = None) -> tuple[Path, dict] | None:
+    """
+    ネットワークを使わずにアセット名の接頭辞が一致するキャッシュを探す
+    release指定時はそのタグを優先し、なければ最終使用時刻が最も新しいものを返す
+    戻り値: (blobパス, インデックスのエントリ)
+    """
+    root = _template_cache_root()
+    entries = [
+        e for e in _load_cache_index(root)["entries"].values()
+        if e["asset"].startswith(asset_prefix) and e["asset"].endswith(".zip")
+    ]
+    entries.sort(key=lambda e: (e["release"] == release, e.get("last_used", 0)), reverse=True)
+    for entry in entries:
+        hit = cache_lookup(entry["release"], entry["asset"])
+        if hit:
+            return hit[0], entry
+    return None
 
 
-@app.command()
-def init(
-    project_name: str = typer.Argument(None, help="Name for your new project directory (optional if using --here)"),
-    ai_assistant: str = typer.Option(None, "--ai", help="AI assistant to use: claude, gemini, or copilot"),
-    ignore_agent_tools: bool = typer.Option(False, "--ignore-agent-tools", help="Skip checks for AI agent tools like Claude Code"),
-    no_git: bool = typer.Option(False, "--no-git", help="Skip git repository initialization"),
-    here: bool = typer.Option(False, "--here", help="Initialize project in the current directory instead of creating a new one"),
-):
+def cache_store(src: Path, release: str, asset_name: str, sha256: str) -> Path:
     """
-    最新テンプレートから新しいSpecifyプロジェクトを初期化します。
+    ダウンロード済みアーカイブをSHA-256名のblobとしてキャッシュに登録
+    戻り値: キャッシュ内のblobパス
+    """
+    root = _template_cache_root()
+    blob_path = root / "blobs" / f"{sha256}.zip"
+    blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+    key = f"{release}/{asset_name}"
+    # blobの配置と登録を同じロック内で行う（別プロセスの削除で未登録のblobとして消されないように）
+    with _cache_index_lock(root):
+        index = _load_cache_index(root)
+        placed = not blob_path.exists()
+        if placed:
+            shutil.move(str(src), str(blob_path))
+        else:
+            src.unlink()
+        blob_st = blob_path.stat()
+        entry = {
+            "release": release,
+            "asset": asset_name,
+            "sha256": sha256,
+            "size": blob_st.st_size,
+            "last_used": time.time(),
+        }
+        # 照合済みと見なせるblobだけmtimeを記録する（既存のblobは他のエントリで照合済みでなければ次回の検索で照合）
+        if placed or any(
+            e["sha256"] == sha256 and e["size"] == blob_st.st_size and e.get("mtime_ns") == blob_st.st_mtime_ns
+            for e in index["entries"].values()
+        ):
+            entry["mtime_ns"] = blob_st.st_mtime_ns
+        index["entries"][key] = entry
+        _evict_template_cache(root, index, keep=key)
+        _write_json_atomic(root / "index.json", index)
+    return blob_path
+
+
+def _http_retries() -> int:
+    try:
+        return max(0, int(os.environ.get("SPECIFY_HTTP_RETRIES", DEFAULT_HTTP_RETRIES)))
+    except ValueError:
+        return DEFAULT_HTTP_RETRIES
 
-    このコマンドは以下を行います:
-    1. 必要なツールのインストール確認（gitは任意）
-    2. AIアシスタント（Claude Code, Gemini CLI, GitHub Copilot）を選択
-    3. GitHubから該当テンプレートをダウンロード
-    4. 新規ディレクトリまたはカレントディレクトリに展開
-    5. gitリポジトリ初期化（--no-git指定や既存リポジトリ時はスキップ）
-    6. 必要に応じAIアシスタントコマンドのセットアップ
 
-    【例】
-        specify init my-project
-        specify init my-project --ai claude
-        specify init my-project --ai gemini
-        specify init my-project --ai copilot --no-git
-        specify init --ignore-agent-tools my-project
-        specify init --here --ai claude
-        specify init --here
+def get_http_client() -> "httpx.Client":
     """
+    GitHub通信用の共有httpxクライアントを返す（keep-aliveで接続を再利用）
+    h2パッケージがあればHTTP/2を使う（SPECIFY_HTTP2=0で無効化）
+    """
+    import httpx
 
-    # まずバナー表示
-    show_banner()
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            http2 = os.environ.get("SPECIFY_HTTP2", "1").lower() not in ("0", "false", "no")
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    http2 = False
+            _http_client = httpx.Client(
+                http2=http2,
+                timeout=httpx.Timeout(30, connect=10),
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+                follow_redirects=True,
+            )
+            atexit.register(_http_client.close)
+        return _http_client
 
 
-    # 引数バリデーション
-    if here and project_name:
-        console.print("[red]エラー:[/red] --hereとプロジェクト名は同時指定できません")
-        raise typer.Exit(1)
+def _retry_delay(attempt: int) -> float:
+    return min(0.5 * 2 ** attempt, 8.0)
 
-    if not here and not project_name:
-        console.print("[red]エラー:[/red] プロジェクト名指定か--hereフラグが必要です")
-        raise typer.Exit(1)
 
+def http_get(url: str, **kwargs) -> "httpx.Response":
+    """
+    共有クライアントでGET
+    5xx・タイムアウト・ネットワークエラーは指数バックオフで再試行
+    """
+    import httpx
 
-    # プロジェクトディレクトリ決定
-    if here:
-        project_name = Path.cwd().name
-        project_path = Path.cwd()
+    client = get_http_client()
+    retries = _http_retries()
+    for attempt in range(retries + 1):
+        try:
+            response = client.get(url, **kwargs)
+        except (httpx.TimeoutException, httpx.NetworkError):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return response
+        time.sleep(_retry_delay(attempt))
 
-        # カレントディレクトリに既存ファイルがあるか確認
-        existing_items = list(project_path.iterdir())
-        if existing_items:
-            console.print(f"[yellow]警告:[/yellow] カレントディレクトリが空ではありません（{len(existing_items)}件）")
-            console.print("[yellow]テンプレートファイルは既存内容とマージされ、上書きされる場合があります[/yellow]")
-
-            # 続行確認
-            response = typer.confirm("続行しますか？")
-            if not response:
-                console.print("[yellow]操作をキャンセルしました[/yellow]")
-                raise typer.Exit(0)
+
+@contextmanager
+def http_stream(method: str, url: str, **kwargs):
+    """
+    共有クライアントでストリーミングリクエスト（接続確立までを再試行）
+    """
+    import httpx
+
+    client = get_http_client()
+    retries = _http_retries()
+    for attempt in range(retries + 1):
+        try:
+            response = client.send(client.build_request(method, url, **kwargs), stream=True)
+        except (httpx.TimeoutException, httpx.NetworkError):
+            if attempt == retries:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                break
+            response.close()
+        time.sleep(_retry_delay(attempt))
+    try:
+        yield response
+    finally:
+        response.close()
+
+
+def _metadata_ttl() -> float:
+    try:
+        return float(os.environ.get("SPECIFY_METADATA_TTL", DEFAULT_METADATA_TTL))
+    except ValueError:
+        return DEFAULT_METADATA_TTL
+
+
+def _release_store_path(repo_owner: str, repo_name: str, source: str | None = None) -> Path:
+    # ミラーごとに別ファイル（browser_download_urlが配布元ごとに異なるため）
+    suffix = f"-{hashlib.sha256(source.encode()).hexdigest()[:12]}" if source else ""
+    return get_cache_dir() / "metadata" / f"{repo_owner}-{repo_name}{suffix}-latest.json"
+
+
+def _load_release_store(store_path: Path) -> dict | None:
+    """
+    保存済みのリリース情報を読み込む（存在しない・破損時はNone）
+    """
+    try:
+        with open(store_path, encoding="utf-8") as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(stored, dict) or "release" not in stored:
+        return None
+    return stored
+
+
+def fetch_release_metadata(repo_owner: str, repo_name: str, *, refresh: bool = False, verbose: bool = True, source: str | None = None) -> dict:
+    """
+    最新リリース情報を取得（ETag/Last-Modified付きでディスクに保存）
+    TTL内は保存済みの情報をそのまま使い、TTL切れ後は条件付きリクエストで304なら再利用
+    refresh=Trueで保存済み情報を無視して取得し直す
+    source指定時はGitHub APIの代わりにそのURL（specify mirror serve等）へ問い合わせる
+    """
+    import httpx
+
+    store_path = _release_store_path(repo_owner, repo_name, source)
+    stored = _load_release_store(store_path)
+
+    if stored and not refresh and time.time() - stored.get("fetched_at", 0) < _metadata_ttl():
+        return stored["release"]
+
+    headers = {"Accept": "application/vnd.github+json"}
+    if stored and not refresh:
+        if stored.get("etag"):
+            headers["If-None-Match"] = stored["etag"]
+        if stored.get("last_modified"):
+            headers["If-Modified-Since"] = stored["last_modified"]
+
+    api_url = f"{(source or GITHUB_API_URL).rstrip('/')}/repos/{repo_owner}/{repo_name}/releases/latest"
+    try:
+        response = http_get(api_url, headers=headers)
+        if response.status_code == 304 and stored:
+            stored["fetched_at"] = time.time()
+            _write_json_atomic(store_path, stored)
+            return stored["release"]
+        response.raise_for_status()
+        release_data = response.json()
+    except httpx.HTTPError as e:
+        if stored:
+            # レート制限や一時的な障害時は保存済み（期限切れ）の情報で続行
+            if verbose:
+                console.print(f"[yellow]Using stored release information:[/yellow] {e}")
+            return stored["release"]
+        if verbose:
+            console.print(f"[red]Error fetching release information:[/red] {e}")
+        raise typer.Exit(1)
+
+    # 以降の処理で使うフィールドだけ保存する
+    release = {
+        "tag_name": release_data["tag_name"],
+        "assets": [
+            {key: asset[key] for key in ("name", "size", "browser_download_url", "digest") if key in asset}
+            for asset in release_data.get("assets", [])
+        ],
+    }
+    _write_json_atomic(store_path, {
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "fetched_at": time.time(),
+        "release": release,
+    })
+    return release
+
+
+def _file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _chunk_size_for(total: int) -> int:
+    """
+    ファイルサイズに応じた読み込みチャンクサイズ（64KiB〜1MiB）
+    """
+    return max(64 * 1024, min(1024 * 1024, total // 64))
+
+
+@contextmanager
+def _download_progress(total: int, show: bool):
+    """
+    ダウンロード進捗バーを表示し、受信バイト数を加算するコールバックを返す
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
+    if not show or not total:
+        yield lambda n: None
+        return
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+        console=get_console(),
+    ) as progress:
+        task = progress.add_task("Downloading...", total=total)
+        yield lambda n: progress.advance(task, n)
+
+
+class DownloadCancelled(Exception):
+    """
+    cancelイベントによってダウンロードが中断された（.partと区間情報は残り、次回続きから再開できる）
+    """
+
+
+def _check_cancel(cancel: threading.Event | None) -> None:
+    """
+    cancelがセットされていればDownloadCancelledを送出（チャンクごとに呼ぶ）
+    """
+    if cancel is not None and cancel.is_set():
+        raise DownloadCancelled()
+
+
+def _download_segments(url: str, part_path: Path, size: int, advance, cancel: threading.Event | None = None) -> bool:
+    """
+    Rangeリクエストで分割して並列ダウンロード（サーバーが非対応ならFalse）
+    各区間の進捗を part_path + ".json" に保存し、再実行時は未取得の範囲だけ取得する
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    state_path = part_path.with_name(part_path.name + ".json")
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = None
+    if not state or state.get("url") != url or state.get("size") != size or not part_path.exists():
+        count = min(MAX_DOWNLOAD_SEGMENTS, -(-size // DOWNLOAD_SEGMENT_MIN_BYTES))
+        step = -(-size // count)
+        state = {
+            "url": url,
+            "size": size,
+            # [start, end, 取得済みバイト数]
+            "segments": [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)],
+        }
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+    else:
+        advance(sum(segment[2] for segment in state["segments"]))
+
+    state_lock = threading.Lock()
+    chunk_size = _chunk_size_for(size)
+
+    def save_state():
+        with state_lock:
+            _write_json_atomic(state_path, state)
+
+    def fetch(segment):
+        start, end, done = segment
+        if start + done > end:
+            return True
+        with http_stream("GET", url, headers={"Range": f"bytes={start + done}-{end}"}) as response:
+            if response.status_code != 206:
+                return False
+            with open(part_path, "r+b") as f:
+                f.seek(start + done)
+                unsaved = 0
+                for chunk in response.iter_bytes(chunk_size=chunk_size):
+                    _check_cancel(cancel)
+                    f.write(chunk)
+                    segment[2] += len(chunk)
+                    unsaved += len(chunk)
+                    advance(len(chunk))
+                    if unsaved >= DOWNLOAD_SEGMENT_MIN_BYTES:
+                        f.flush()
+                        save_state()
+                        unsaved = 0
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(state["segments"])) as pool:
+            supported = all(pool.map(fetch, state["segments"]))
+    finally:
+        save_state()
+    if not supported:
+        part_path.unlink(missing_ok=True)
+    state_path.unlink(missing_ok=True)
+    return supported
+
+
+def _download_sequential(url: str, part_path: Path, size: int, advance, cancel: threading.Event | None = None) -> str:
+    """
+    1本の接続でダウンロード（既存の.partがあればRangeで続きから再開）
+    戻り値: sha256
+    """
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if 0 < offset < size else {}
+    hasher = hashlib.sha256()
+    with http_stream("GET", url, headers=headers) as response:
+        response.raise_for_status()
+        if response.status_code == 206:
+            # Resume: fold the bytes already on disk into the hash first
+            with open(part_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+            advance(offset)
+            mode = "ab"
+        else:
+            mode = "wb"
+        with open(part_path, mode) as f:
+            for chunk in response.iter_bytes(chunk_size=_chunk_size_for(size)):
+                _check_cancel(cancel)
+                f.write(chunk)
+                hasher.update(chunk)
+                advance(len(chunk))
+    return hasher.hexdigest()
+
+
+def download_asset(url: str, part_path: Path, size: int, *, advance=lambda n: None, cancel: threading.Event | None = None) -> str:
+    """
+    アセットをpart_pathへダウンロードしてSHA-256を返す
+    大きいアセットはRangeリクエストで分割して並列取得し、中断した.partファイルは続きから再開する
+    cancel: セットされると次のチャンクでDownloadCancelledを送出して中断する
+    """
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+    if size >= PARALLEL_DOWNLOAD_MIN_BYTES and _download_segments(url, part_path, size, advance, cancel):
+        return _file_sha256(part_path)
+    return _download_sequential(url, part_path, size, advance, cancel)
+
+
+def _expected_sha256(asset: dict, release_data: dict) -> str | None:
+    """
+    リリースが公開しているアセットのSHA-256を返す（不明ならNone）
+    GitHubのdigestフィールド、または同名の .sha256 アセットを参照する
+    """
+    import httpx
+
+    digest = asset.get("digest") or ""
+    if digest.startswith("sha256:"):
+        return digest.split(":", 1)[1].lower()
+    for other in release_data.get("assets", []):
+        if other["name"] == f"{asset['name']}.sha256":
+            try:
+                response = http_get(other["browser_download_url"])
+                response.raise_for_status()
+            except httpx.HTTPError:
+                return None
+            fields = response.text.split()
+            return fields[0].lower() if fields else None
+    return None
+
+
+def _template_limits() -> dict:
+    """
+    テンプレートzipの展開上限（環境変数で上書き可、不正な値は既定値）
+    """
+    limits = {}
+    for key, env, default in (
+        ("entries", "SPECIFY_TEMPLATE_MAX_ENTRIES", DEFAULT_TEMPLATE_MAX_ENTRIES),
+        ("bytes", "SPECIFY_TEMPLATE_MAX_BYTES", DEFAULT_TEMPLATE_MAX_BYTES),
+        ("ratio", "SPECIFY_TEMPLATE_MAX_RATIO", DEFAULT_TEMPLATE_MAX_RATIO),
+    ):
+        try:
+            limits[key] = int(os.environ.get(env, default))
+        except ValueError:
+            limits[key] = default
+    return limits
+
+
+def _check_member_limits(member, count: int, total: int, limits: dict) -> None:
+    """
+    エントリ数・展開後の合計サイズ・圧縮率が上限を超えていれば例外
+    count/total: このエントリまでの累計
+    """
+    if count > limits["entries"]:
+        raise ValueError(f"Template archive has too many entries (limit {limits['entries']:,})")
+    if total > limits["bytes"]:
+        raise ValueError(f"Template archive expands beyond {limits['bytes']:,} bytes")
+    if member.file_size >= TEMPLATE_RATIO_MIN_BYTES and member.file_size > max(member.compress_size, 1) * limits["ratio"]:
+        raise ValueError(f"Suspicious compression ratio in template archive: {member.filename}")
+
+
+def validate_template_archive(template_source) -> int:
+    """
+    ファイルシステムを変更する前にzipのセントラルディレクトリを検証
+    破損・切り詰め・空のアーカイブや危険なパスを含む場合、展開上限（_template_limits）を超える場合は例外
+    戻り値: エントリ数
+    """
+    import zipfile
+
+    if isinstance(template_source, Path) and template_source.is_dir():
+        return sum(1 for _ in template_source.rglob('*'))
+    with (open(template_source, "rb") if isinstance(template_source, Path) else nullcontext(template_source)) as f:
+        try:
+            with zipfile.ZipFile(f) as zip_ref:
+                members = zip_ref.infolist()
+            if not members:
+                raise ValueError("Template archive is empty")
+            archive_size = f.seek(0, os.SEEK_END)
+            limits = _template_limits()
+            total = 0
+            # Each entry must point at a local file header inside the archive
+            for count, member in enumerate(members, 1):
+                total += member.file_size
+                _check_member_limits(member, count, total, limits)
+                f.seek(member.header_offset)
+                if f.read(4) != b"PK\x03\x04" or member.header_offset + member.compress_size > archive_size:
+                    raise ValueError(f"Corrupt entry in template archive: {member.filename}")
+        finally:
+            f.seek(0)
+    prefix = _archive_root_prefix(m.filename for m in members)
+    for member in members:
+        name = member.filename[len(prefix):]
+        if name:
+            _member_parts(name)
+    return len(members)
+
+
+def download_template_from_github(ai_assistant: str, download_dir: Path, *, verbose: bool = True, show_progress: bool = True, use_cache: bool = True, refresh: bool = False, release_data: dict | None = None, source: str | None = None, cancel: threading.Event | None = None):
+    """
+    GitHubから最新テンプレートリリースをダウンロード
+    use_cache=Trueならユーザーキャッシュを参照し、同じリリースのアセットは再ダウンロードしない
+    refresh=Trueで保存済みのリリース情報を使わず問い合わせ直す
+    キャッシュを使わない小さなアーカイブはディスクに書かずメモリ上（spooled）で返す
+    受信しながら計算したSHA-256とサイズをリリースの値と照合し、不一致なら終了
+    release_data指定時は取得済みのリリース情報を使う（問い合わせを省略）
+    source指定時はGitHubの代わりにテンプレートミラーから取得する
+    cancel: セットされるとダウンロードを中断してDownloadCancelledを送出する（先読みの取り消し用）
+    戻り値: (zip_pathまたはファイルオブジェクト, metadata_dict)
+    """
+    if release_data is None:
+        if verbose:
+            console.print("[cyan]Fetching latest release information...[/cyan]")
+        release_data = fetch_release_metadata(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=refresh, verbose=verbose, source=source)
+
+    # Find the template asset for the specified AI assistant
+    pattern = f"spec-kit-template-{ai_assistant}"
+    matching_assets = [
+        asset for asset in release_data.get("assets", [])
+        if pattern in asset["name"] and asset["name"].endswith(".zip")
+    ]
+
+    if not matching_assets:
+        if verbose:
+            console.print(f"[red]Error:[/red] No template found for AI assistant '{ai_assistant}'")
+            console.print(f"[yellow]Available assets:[/yellow]")
+            for asset in release_data.get("assets", []):
+                console.print(f"  - {asset['name']}")
+        raise typer.Exit(1)
+
+    # Use the first matching asset
+    asset = matching_assets[0]
+    download_url = asset["browser_download_url"]
+    filename = asset["name"]
+    file_size = asset["size"]
+    release = release_data["tag_name"]
+
+    if verbose:
+        console.print(f"[cyan]Found template:[/cyan] {filename}")
+        console.print(f"[cyan]Size:[/cyan] {file_size:,} bytes")
+        console.print(f"[cyan]Release:[/cyan] {release}")
+
+    metadata = {
+        "filename": filename,
+        "size": file_size,
+        "release": release,
+        "asset_url": download_url,
+        "cached": False,
+        "cache_hit": False,
+        "local": False,
+        "verified": False,
+    }
+
+    if use_cache:
+        hit = cache_lookup(release, filename)
+        if hit:
+            if verbose:
+                console.print(f"[cyan]Using cached template:[/cyan] {hit[0]}")
+            metadata.update(sha256=hit[1], cached=True, cache_hit=True, verified=True)
+            return hit[0], metadata
+        # キャッシュ領域に直接ダウンロードし、完了後にblobへ昇格させる
+        download_dir = _template_cache_root() / "blobs"
+        download_dir.mkdir(parents=True, exist_ok=True)
+        # 中断時に次回続きから再開できるよう、リリースとアセット名から決まる名前にする
+        zip_path = download_dir / f".{release.replace('/', '_')}-{filename}.part"
+    elif file_size <= SPOOL_MAX_BYTES:
+        zip_path = None
+    else:
+        zip_path = download_dir / f"{filename}.part"
+
+    # .partは複数プロセスで共有される名前なので、ダウンロードから登録まで排他ロックを保持する
+    with (_download_lock(zip_path) if zip_path is not None else nullcontext(False)) as waited:
+        if waited and use_cache:
+            # 待っている間に別プロセスが同じアセットをキャッシュに登録していればそれを使う
+            hit = cache_lookup(release, filename)
+            if hit:
+                if verbose:
+                    console.print(f"[cyan]Using cached template:[/cyan] {hit[0]}")
+                metadata.update(sha256=hit[1], cached=True, cache_hit=True, verified=True)
+                return hit[0], metadata
+        return _download_template_asset(
+            asset, release_data, zip_path, download_dir, metadata, verbose=verbose, show_progress=show_progress, use_cache=use_cache, cancel=cancel
+        )
+
+
+@contextmanager
+def _download_lock(part_path: Path):
+    """
+    part_path（とその区間情報 .part.json）の排他ロック
+    別プロセスが保持していれば解放まで待つ。yieldする値: 待ったかどうか
+    """
+    lock_path = part_path.with_name(part_path.name + ".lock")
+    with _file_lock(lock_path, blocking=False) as owned:
+        if owned:
+            yield False
+            return
+    with _file_lock(lock_path):
+        yield True
+
+
+def _download_template_asset(asset: dict, release_data: dict, zip_path: Path | None, download_dir: Path, metadata: dict, *, verbose: bool, show_progress: bool, use_cache: bool, cancel: threading.Event | None = None):
+    """
+    download_template_from_githubのダウンロード・検証部分（zip_pathがNoneならメモリ上に受信）
+    zip_pathを使う場合は呼び出し側で_download_lockを保持していること
+    """
+    import tempfile
+    import httpx
+
+    download_url = asset["browser_download_url"]
+    filename = asset["name"]
+    file_size = asset["size"]
+    release = release_data["tag_name"]
+
+    # Download the file
+    if verbose:
+        console.print(f"[cyan]Downloading template...[/cyan]")
+
+    # 小さいアーカイブはディスクに書かずメモリ上で扱う
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) if zip_path is None else None
+    try:
+        with _download_progress(file_size, show_progress) as advance:
+            if buffer is not None:
+                hasher = hashlib.sha256()
+                with http_stream("GET", download_url) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(chunk_size=_chunk_size_for(file_size)):
+                        _check_cancel(cancel)
+                        buffer.write(chunk)
+                        hasher.update(chunk)
+                        advance(len(chunk))
+                sha256 = hasher.hexdigest()
+            else:
+                sha256 = download_asset(download_url, zip_path, file_size, advance=advance, cancel=cancel)
+
+    except DownloadCancelled:
+        if buffer is not None:
+            buffer.close()
+        raise
+    except httpx.HTTPError as e:
+        if verbose:
+            console.print(f"[red]Error downloading template:[/red] {e}")
+        # Partial .part files are kept so the next run can resume
+        if buffer is not None:
+            buffer.close()
+        raise typer.Exit(1)
+    if verbose:
+        console.print(f"Downloaded: {filename}")
+
+    # 展開前に整合性を確認（切り詰め・改ざんをここで検出する）
+    downloaded_size = buffer.tell() if buffer is not None else zip_path.stat().st_size
+    expected = _expected_sha256(asset, release_data)
+    problem = None
+    if downloaded_size != file_size:
+        problem = f"size mismatch for {filename}: expected {file_size:,} bytes, got {downloaded_size:,}"
+    elif expected and expected != sha256:
+        problem = f"SHA-256 mismatch for {filename}: expected {expected}, got {sha256}"
+    if problem:
+        if verbose:
+            console.print(f"[red]Error:[/red] {problem}")
+        if buffer is not None:
+            buffer.close()
+        else:
+            # A corrupt partial file cannot be resumed
+            zip_path.unlink(missing_ok=True)
+        raise typer.Exit(1)
+
+    metadata["sha256"] = sha256
+    metadata["verified"] = expected is not None
+    if buffer is not None:
+        buffer.seek(0)
+        return buffer, metadata
+    if use_cache:
+        zip_path = cache_store(zip_path, release, filename, sha256)
+        metadata["cached"] = True
+    else:
+        zip_path = zip_path.replace(download_dir / filename)
+    return zip_path, metadata
+
+
+def _archive_root_prefix(names: Iterable[str]) -> str:
+    """
+    全エントリが単一のルートディレクトリ配下にある場合、その接頭辞（"root/"）を返す
+    names はイテレータでもよい（1回だけ走査する）
+    """
+    root = None
+    for name in names:
+        head, sep, _ = name.partition("/")
+        if not sep or (root is not None and head != root):
+            return ""
+        root = head
+    if root in (None, "", ".", ".."):
+        return ""
+    return f"{root}/"
+
+
+def _member_parts(name: str) -> tuple[str, ...]:
+    """
+    エントリ名をパス要素に分解（絶対パスや..を含む名前は拒否）
+    Windowsで作られたzipの "\\" 区切りも "/" とみなす（どのOSでも同じ判定にする）
+    """
+    normalized = name.replace("\\", "/")
+    parts = PurePosixPath(normalized).parts
+    if normalized.startswith("/") or ".." in parts or (parts and ":" in parts[0]):
+        raise ValueError(f"Unsafe path in template archive: {name}")
+    return parts
+
+
+def _member_target(dest: Path, name: str, resolved: dict | None = None) -> Path:
+    """
+    エントリ名から展開先パスを求める（_member_partsの検査に加え、既存のシンボリックリンク経由で
+    destの外を指す名前も拒否）
+    resolved: ディレクトリの実パスのメモ（同じ操作の中で複数回呼ぶ場合に渡すとrealpathの回数が減る）
+    """
+    target = dest.joinpath(*_member_parts(name))
+    memo = {} if resolved is None else resolved
+    root = memo.get(dest)
+    if root is None:
+        root = memo[dest] = os.path.realpath(dest)
+    real_parent = memo.get(target.parent)
+    if real_parent is None:
+        real_parent = memo[target.parent] = os.path.realpath(target.parent)
+    real = os.path.realpath(target) if os.path.islink(target) else os.path.join(real_parent, target.name)
+    if real != root and not real.startswith(os.path.join(root, "")):
+        raise ValueError(f"Unsafe path in template archive: {name}")
+    return target
+
+
+def extract_template_archive(archive, dest: Path) -> dict:
+    """
+    zipの各エントリを最終パスへ直接書き出す（GitHub形式の単一ルートは展開時に取り除く）
+    archive: zipファイルのパスまたはシーク可能なファイルオブジェクト
+    戻り値: {"entries", "files", "bytes", "overwritten", "flattened"} の統計
+    """
+    import zipfile
+
+    stats = {"entries": 0, "files": 0, "bytes": 0, "overwritten": 0, "flattened": False}
+    limits = _template_limits()
+    created_dirs = set()
+    resolved = {}
+    with zipfile.ZipFile(archive) as zip_ref:
+        members = zip_ref.infolist()
+        prefix = _archive_root_prefix(m.filename for m in members)
+        stats["flattened"] = bool(prefix)
+
+        for member in members:
+            stats["entries"] += 1
+            _check_member_limits(member, stats["entries"], stats["bytes"] + member.file_size, limits)
+            name = member.filename[len(prefix):]
+            if not name:
+                continue
+            target = _member_target(dest, name, resolved)
+            if member.is_dir():
+                target.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(target)
+                continue
+            if target.parent not in created_dirs:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(target.parent)
+            if _detach_target(target):
+                stats["overwritten"] += 1
+            written = _extract_member(zip_ref, member, target, limits["bytes"] - stats["bytes"])
+            stats["files"] += 1
+            stats["bytes"] += written
+    return stats
+
+
+def _detach_target(target) -> bool:
+    """
+    書き込み先がハードリンクで他のパスと実体を共有していれば先に削除する
+    （ストアからハードリンクで配置したファイルへの書き込みが、ストアや他のプロジェクトへ波及しないように）
+    戻り値: 書き込み前にtargetが存在したか
+    """
+    import stat
+
+    try:
+        st = os.lstat(target)
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+    if st.st_nlink > 1 and stat.S_ISREG(st.st_mode):
+        os.unlink(target)
+    return True
+
+
+def _extract_member(zip_ref, member, target: Path, budget: int) -> int:
+    """
+    1エントリを固定長のバッファでtargetへ書き出す
+    宣言されたサイズではなく実際に書いたバイト数で上限（宣言サイズ・残りの展開上限budget）を確認する
+    戻り値: 書き込んだバイト数
+    """
+    written = 0
+    with zip_ref.open(member) as src, open(target, "wb") as dst:
+        while chunk := src.read(EXTRACT_BUFFER_BYTES):
+            written += len(chunk)
+            if written > member.file_size or written > budget:
+                raise ValueError(f"Template archive entry expands beyond its declared size: {member.filename}")
+            dst.write(chunk)
+    return written
+
+
+def _file_crc32(path: Path) -> int:
+    import zlib
+
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(EXTRACT_BUFFER_BYTES):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def plan_template_merge(template_source, dest: Path) -> dict:
+    """
+    既存ディレクトリへのマージ計画を立てる（ファイルシステムは変更しない）
+    テンプレートの各ファイルを new（未作成）/ changed（内容が異なる）/ identical（同一）/
+    conflicts（既存のディレクトリと同じパス、または親パスが既存のファイル）に分類する
+    zipはサイズとセントラルディレクトリのCRC32、展開済みディレクトリはサイズと内容で比較する
+    戻り値: {"new", "changed", "identical", "conflicts"}（相対パスのリスト）, "entries", "flattened", "bytes"（書き込み予定）
+    """
+    import filecmp
+    import stat
+
+    plan = {"new": [], "changed": [], "identical": [], "conflicts": [], "entries": 0, "flattened": False, "bytes": 0}
+    resolved = {}
+
+    def classify(rel: str, size: int, same) -> None:
+        target = _member_target(dest, rel, resolved)
+        try:
+            st = target.stat()
+        except FileNotFoundError:
+            plan["new"].append(rel)
+            plan["bytes"] += size
+            return
+        except NotADirectoryError:
+            plan["conflicts"].append(rel)
+            return
+        if stat.S_ISDIR(st.st_mode):
+            plan["conflicts"].append(rel)
+        elif stat.S_ISREG(st.st_mode) and st.st_size == size and same(target):
+            plan["identical"].append(rel)
+        else:
+            plan["changed"].append(rel)
+            plan["bytes"] += size
+
+    if isinstance(template_source, Path) and template_source.is_dir():
+        source_dir = _template_root_dir(template_source)
+        plan["flattened"] = source_dir != template_source
+        for item in sorted(source_dir.rglob('*')):
+            plan["entries"] += 1
+            if item.is_file():
+                classify(item.relative_to(source_dir).as_posix(), item.stat().st_size, lambda t, item=item: filecmp.cmp(item, t, shallow=False))
+        return plan
+
+    import zipfile
+
+    with zipfile.ZipFile(template_source) as zip_ref:
+        members = zip_ref.infolist()
+        prefix = _archive_root_prefix(m.filename for m in members)
+        plan["flattened"] = bool(prefix)
+        for member in members:
+            plan["entries"] += 1
+            name = member.filename[len(prefix):]
+            if name and not member.is_dir():
+                classify(name, member.file_size, lambda t, crc=member.CRC: _file_crc32(t) == crc)
+    return plan
+
+
+def apply_template_merge(template_source, dest: Path, plan: dict, *, jobs: int = MERGE_COPY_WORKERS) -> dict:
+    """
+    マージ計画のうち new / changed のファイルだけをスレッドプールで書き込む（identicalは触らない）
+    conflictsがあれば何も書き込まずにValueErrorを送出する
+    戻り値: extract_template_archiveと同じ統計 + "new" / "changed" / "identical" の件数
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    if plan.get("conflicts"):
+        raise ValueError(f"Template files clash with existing files or directories: {', '.join(plan['conflicts'])}")
+    writes = plan["new"] + plan["changed"]
+    stats = {
+        "entries": plan["entries"],
+        "files": 0,
+        "bytes": 0,
+        "overwritten": len(plan["changed"]),
+        "flattened": plan["flattened"],
+        "new": len(plan["new"]),
+        "changed": len(plan["changed"]),
+        "identical": len(plan["identical"]),
+    }
+    # ディレクトリは先にまとめて作る（作成後にリンク検査のメモを作り直す）
+    for parent in sorted({_member_target(dest, rel).parent for rel in writes}):
+        parent.mkdir(parents=True, exist_ok=True)
+    resolved = {}
+
+    if isinstance(template_source, Path) and template_source.is_dir():
+        source_dir = _template_root_dir(template_source)
+
+        def write(rel):
+            target = _member_target(dest, rel, resolved)
+            _detach_target(target)
+            shutil.copy2(source_dir / rel, target)
+            return target.stat().st_size
+
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            sizes = list(pool.map(write, writes))
+    else:
+        import zipfile
+
+        with zipfile.ZipFile(template_source) as zip_ref:
+            prefix = _archive_root_prefix(m.filename for m in zip_ref.infolist())
+            limits = _template_limits()
+
+            # ZipFileは共有ファイルへの読み込みをロックで保護しているため、複数スレッドから開ける
+            def write(rel):
+                target = _member_target(dest, rel, resolved)
+                _detach_target(target)
+                return _extract_member(zip_ref, zip_ref.getinfo(prefix + rel), target, limits["bytes"])
+
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                sizes = list(pool.map(write, writes))
+    stats["files"] = len(sizes)
+    stats["bytes"] = sum(sizes)
+    return stats
+
+
+def print_merge_plan(plan: dict, dest: Path, *, limit: int = 20) -> None:
+    """
+    マージ計画の要約（件数と、上書き・新規作成されるファイル）を表示
+    """
+    console.print(f"[cyan]マージ計画:[/cyan] {dest}")
+    console.print(f"  [green]+ 新規[/green] {len(plan['new'])}件  [yellow]~ 変更（上書き）[/yellow] {len(plan['changed'])}件  [dim]= 同一（スキップ） {len(plan['identical'])}件[/dim]")
+    if plan["conflicts"]:
+        console.print(f"  [red]! 衝突[/red] {len(plan['conflicts'])}件（ファイルとディレクトリが同じパスにあります）")
+    for marker, style, key in (("!", "red", "conflicts"), ("~", "yellow", "changed"), ("+", "green", "new")):
+        for rel in plan[key][:limit]:
+            console.print(f"  [{style}]{marker}[/{style}] {rel}", highlight=False)
+        if len(plan[key]) > limit:
+            console.print(f"  [dim]... 他{len(plan[key]) - limit}件[/dim]")
+
+
+TEMPLATE_LOCK_VERSION = 1
+TEMPLATE_LOCK_FILE = PurePosixPath(".specify/lock.json")
+
+
+def worktree_entries(root: Path, rels: Iterable[str], *, jobs: int = MERGE_COPY_WORKERS) -> dict:
+    """
+    root配下の各ファイルの {相対パス: {"crc32", "size"}} をスレッドプールで求める（存在しないファイルはNone）
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    resolved = {}
+
+    def entry(rel):
+        target = _member_target(root, rel, resolved)
+        try:
+            return {"crc32": _file_crc32(target), "size": target.stat().st_size}
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            return None
+
+    rels = list(rels)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return dict(zip(rels, pool.map(entry, rels)))
+
+
+def template_entries(template_source) -> dict:
+    """
+    テンプレートの各ファイルの {相対パス: {"crc32", "size"}}（GitHub形式の単一ルートは除く）
+    zipはセントラルディレクトリだけを読み、展開済みディレクトリは各ファイルを読んで求める
+    """
+    if isinstance(template_source, Path) and template_source.is_dir():
+        source_dir = _template_root_dir(template_source)
+        return worktree_entries(source_dir, (item.relative_to(source_dir).as_posix() for item in source_dir.rglob('*') if item.is_file()))
+
+    import zipfile
+
+    with zipfile.ZipFile(template_source) as zip_ref:
+        members = zip_ref.infolist()
+    prefix = _archive_root_prefix(m.filename for m in members)
+    return {
+        m.filename[len(prefix):]: {"crc32": m.CRC, "size": m.file_size}
+        for m in members
+        if not m.is_dir() and m.filename[len(prefix):]
+    }
+
+
+def load_template_lock(project_path: Path) -> dict | None:
+    """
+    .specify/lock.jsonを読み込む（存在しない・壊れている・バージョン違いの場合はNone）
+    """
+    try:
+        lock = json.loads((project_path / TEMPLATE_LOCK_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(lock, dict) or lock.get("version") != TEMPLATE_LOCK_VERSION or not isinstance(lock.get("files"), dict):
+        return None
+    return lock
+
+
+def write_template_lock(project_path: Path, ai_assistant: str, meta: dict, files: dict, *, source: str | None = None, conflicts: Iterable[str] = ()) -> None:
+    """
+    テンプレートのリリースとファイルごとのサイズ・CRC32を.specify/lock.jsonへ書き込む（specify upgradeの基準）
+    conflicts: 前回のupgradeで未解決のまま残ったファイル
+    """
+    lock = {
+        "version": TEMPLATE_LOCK_VERSION,
+        "ai": ai_assistant,
+        "release": meta["release"],
+        "asset": meta["filename"],
+        "sha256": meta.get("sha256"),
+        "source": source,
+        "files": dict(sorted(files.items())),
+        "conflicts": sorted(conflicts),
+    }
+    _write_json_atomic(project_path / TEMPLATE_LOCK_FILE, lock)
+
+
+def lock_installed_template(template_source, project_path: Path, ai_assistant: str, meta: dict, *, source: str | None = None) -> int:
+    """
+    展開直後のプロジェクトについてlock.jsonを作成
+    展開時にCRC32は検証済みなので、配置したファイルは読み直さずテンプレート側の値を記録する
+    戻り値: 記録したファイル数
+    """
+    files = template_entries(template_source)
+    write_template_lock(project_path, ai_assistant, meta, files, source=source)
+    return len(files)
+
+
+def _same_content(a: dict, b: dict) -> bool:
+    return a["size"] == b["size"] and a["crc32"] == b["crc32"]
+
+
+def plan_template_upgrade(template_source, project_path: Path, lock: dict) -> dict:
+    """
+    旧テンプレート（lock.json）・新テンプレート・作業ツリーの三者比較でアップグレード計画を立てる（何も書き込まない）
+    比較はサイズとCRC32で行い、作業ツリーは上流で変わったファイルだけを読む
+    戻り値: "add" / "update" / "delete" / "current"（既に新しい内容）/ "unchanged"（上流で変更なし）/
+    "kept"（上流で削除されたがローカルで変更あり）の相対パスのリスト、"conflicts"（{"path", "reason"}のリスト）、
+    "template"（新テンプレートのtemplate_entries）
+    """
+    base = lock["files"]
+    new = template_entries(template_source)
+    plan = {"add": [], "update": [], "delete": [], "current": [], "unchanged": [], "kept": [], "conflicts": [], "template": new}
+    changed = [rel for rel, entry in new.items() if rel not in base or not _same_content(entry, base[rel])]
+    removed = [rel for rel in base if rel not in new]
+    work = worktree_entries(project_path, changed + removed)
+
+    for rel, entry in sorted(new.items()):
+        if rel not in work:
+            plan["unchanged"].append(rel)
+            continue
+        old, mine = base.get(rel), work[rel]
+        if mine is not None and _same_content(mine, entry):
+            plan["current"].append(rel)
+        elif old is None:
+            if mine is None:
+                plan["add"].append(rel)
+            else:
+                plan["conflicts"].append({"path": rel, "reason": "added upstream, exists locally"})
+        elif mine is None:
+            plan["conflicts"].append({"path": rel, "reason": "deleted locally, changed upstream"})
+        elif _same_content(mine, old):
+            plan["update"].append(rel)
+        else:
+            plan["conflicts"].append({"path": rel, "reason": "modified locally and upstream"})
+    for rel in sorted(removed):
+        mine = work[rel]
+        if mine is None:
+            continue
+        if _same_content(mine, base[rel]):
+            plan["delete"].append(rel)
+        else:
+            plan["kept"].append(rel)
+    return plan
+
+
+def print_upgrade_plan(plan: dict, *, limit: int = 20) -> None:
+    """
+    アップグレード計画の要約（件数と、書き込み・削除されるファイル、競合）を表示
+    """
+    from rich.markup import escape
+
+    console.print(
+        f"  [green]+ 追加[/green] {len(plan['add'])}件  [yellow]~ 更新[/yellow] {len(plan['update'])}件  "
+        f"[red]- 削除[/red] {len(plan['delete'])}件  [magenta]! 競合[/magenta] {len(plan['conflicts'])}件  "
+        f"[dim]= 変更なし {len(plan['unchanged']) + len(plan['current'])}件[/dim]"
+    )
+    for marker, style, key in (("~", "yellow", "update"), ("+", "green", "add"), ("-", "red", "delete")):
+        for rel in plan[key][:limit]:
+            console.print(f"  [{style}]{marker}[/{style}] {escape(rel)}", highlight=False)
+        if len(plan[key]) > limit:
+            console.print(f"  [dim]... 他{len(plan[key]) - limit}件[/dim]")
+    for rel in plan["kept"]:
+        console.print(f"  [dim]* {escape(rel)} (removed upstream, modified locally: kept)[/dim]", highlight=False)
+    for conflict in plan["conflicts"]:
+        console.print(f"  [magenta]![/magenta] {escape(conflict['path'])} [dim]({conflict['reason']})[/dim]", highlight=False)
+
+
+def _template_root_dir(path: Path) -> Path:
+    """
+    GitHub形式（単一ルートディレクトリ）のテンプレートならその中を返す
+    """
+    items = list(path.iterdir())
+    if len(items) == 1 and items[0].is_dir():
+        return items[0]
+    return path
+
+
+def _copy_template_dir(source: Path, dest: Path) -> dict:
+    """
+    展開済みテンプレートディレクトリをdestへコピー（既存ファイルは上書き）
+    戻り値: extract_template_archiveと同じ形式の統計
+    """
+    source_dir = _template_root_dir(source)
+    stats = {"entries": 0, "files": 0, "bytes": 0, "overwritten": 0, "flattened": source_dir != source}
+    for item in source_dir.rglob('*'):
+        stats["entries"] += 1
+        target = dest / item.relative_to(source_dir)
+        if item.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if _detach_target(target):
+            stats["overwritten"] += 1
+        shutil.copy2(item, target)
+        stats["files"] += 1
+        stats["bytes"] += item.stat().st_size
+    return stats
+
+
+def _unpacked_root() -> Path:
+    return _template_cache_root() / "unpacked"
+
+
+def _remove_unpacked_template(sha256: str) -> bool:
+    """
+    展開済みストアを削除（配置中・作成中でロックを取れない場合は削除せず、次回のキャッシュ整理に任せる）
+    戻り値: 削除したか
+    """
+    root = _unpacked_root()
+    with _file_lock(root / f"{sha256}.lock", blocking=False) as owned:
+        if not owned:
+            return False
+        (root / f"{sha256}.json").unlink(missing_ok=True)
+        shutil.rmtree(root / sha256, ignore_errors=True)
+    return True
+
+
+def _load_unpacked_marker(store: Path) -> dict | None:
+    """
+    ストアの完成マーカー（unpacked/<sha256>.json、展開時の統計）を読む（未完成・破損ならNone）
+    """
+    try:
+        with open(store.with_name(f"{store.name}.json"), encoding="utf-8") as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return stats if store.is_dir() else None
+
+
+@contextmanager
+def unpacked_template(archive: Path, sha256: str):
+    """
+    キャッシュ済みアーカイブの展開済みストア（unpacked/<sha256>）を用意（なければ1回だけ展開）し、
+    withブロックの間は共有ロックを保持する（別プロセスの再作成やキャッシュ整理で消されないように）
+    作成はunpacked/<sha256>.lockの排他ロック内で行い、取得後にマーカーを確認し直す（完成済みのストアは削除しない）
+    ストアのファイルは読み取り専用（specify自身の書き込みは_detach_targetでリンクを切ってから行う）
+    yieldする値: (ストアのパス, 展開時の統計, 既に存在したか)
+    """
+    root = _unpacked_root()
+    store = root / sha256
+    lock_path = root / f"{sha256}.lock"
+    created = False
+    while True:
+        with _file_lock(lock_path, shared=True):
+            stats = _load_unpacked_marker(store)
+            if stats is not None:
+                yield store, stats, not created
+                return
+        with _unpack_lock:
+            lock = _unpack_locks.setdefault(sha256, threading.Lock())
+        with lock, _file_lock(lock_path):
+            if _load_unpacked_marker(store) is not None:
+                continue
+            tmp = root / f".{sha256}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            tmp.mkdir(parents=True)
+            try:
+                stats = extract_template_archive(archive, tmp)
+                if os.name != "nt":
+                    for dirpath, _, filenames in os.walk(tmp):
+                        for name in filenames:
+                            os.chmod(os.path.join(dirpath, name), 0o444)
+                # マーカーがないストアは中断された作成の残りなので置き換えてよい
+                shutil.rmtree(store, ignore_errors=True)
+                os.rename(tmp, store)
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+            # マーカーは最後に書く（マーカーがあればストアは完全）
+            _write_json_atomic(store.with_name(f"{sha256}.json"), stats)
+            created = True
+
+
+def _reflink(src: str, dst: str) -> None:
+    import fcntl
+
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+
+
+def reflink_supported(dest: Path) -> bool:
+    """
+    テンプレートキャッシュからdestへreflinkできるか（小さなファイルで1回だけ試し、結果を覚えておく）
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    root = _unpacked_root()
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        key = (root.stat().st_dev, dest.stat().st_dev)
+    except OSError:
+        return False
+    if key not in _reflink_support:
+        probe = root / ".reflink-probe"
+        target = dest / f".specify-reflink-probe.{os.getpid()}.{threading.get_ident()}"
+        try:
+            if not probe.exists():
+                probe.write_bytes(b"specify")
+            _reflink(str(probe), str(target))
+            _reflink_support[key] = True
+        except OSError:
+            _reflink_support[key] = False
+        finally:
+            target.unlink(missing_ok=True)
+    return _reflink_support[key]
+
+
+def materialize_template(store: Path, dest: Path, *, mode: str | None = None) -> dict:
+    """
+    展開済みストアからdestへファイルを配置
+    reflink（FICLONE、対応ファイルシステムのみ）→ ハードリンク（mode="hardlink"時のみ）→ コピーの順に試し、
+    使えなかった方法は以降のファイルでは試さない
+    ハードリンクはMATERIALIZE_EDITABLE_DIRS配下のファイルとrootでの実行時には使わない
+    戻り値: extract_template_archiveと同じ統計 + "methods"（方法ごとのファイル数）
+    """
+    import errno
+
+    mode = mode or os.environ.get("SPECIFY_MATERIALIZE", DEFAULT_MATERIALIZE)
+    use_reflink = mode != "copy" and sys.platform.startswith("linux")
+    use_link = mode == "hardlink" and not (hasattr(os, "geteuid") and os.geteuid() == 0)
+    unsupported = {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EPERM, errno.EBADF}
+    stats = {"entries": 0, "files": 0, "bytes": 0, "overwritten": 0, "flattened": False, "methods": {}}
+
+    for dirpath, dirnames, filenames in os.walk(store):
+        rel_dir = os.path.relpath(dirpath, store)
+        target_dir = dest / rel_dir if dirpath != str(store) else dest
+        target_dir.mkdir(parents=True, exist_ok=True)
+        editable = rel_dir.split(os.sep, 1)[0] in MATERIALIZE_EDITABLE_DIRS
+        stats["entries"] += len(dirnames) + len(filenames)
+        for name in filenames:
+            src = os.path.join(dirpath, name)
+            target = target_dir / name
+            if _detach_target(target):
+                stats["overwritten"] += 1
+            method = None
+            if use_reflink:
+                try:
+                    _reflink(src, target)
+                    method = "reflink"
+                except OSError as e:
+                    if e.errno not in unsupported:
+                        raise
+                    use_reflink = False
+            if method is None and use_link and not editable:
+                try:
+                    target.unlink(missing_ok=True)
+                    os.link(src, target)
+                    method = "hardlink"
+                except OSError:
+                    use_link = False
+            if method is None:
+                shutil.copyfile(src, target)
+                method = "copy"
+            stats["methods"][method] = stats["methods"].get(method, 0) + 1
+            stats["files"] += 1
+            stats["bytes"] += os.path.getsize(src)
+    return stats
+
+
+def install_template(template_source, project_path: Path, *, sha256: str | None = None) -> dict:
+    """
+    テンプレート（zipのパス/ファイルオブジェクト、または展開済みディレクトリ）をproject_pathへ配置
+    sha256指定時（キャッシュ済みのzip）でreflinkが使える（またはSPECIFY_MATERIALIZE=hardlink）場合は
+    展開済みストアを経由して配置する（ファイルの中身をコピーせずメタデータだけで済む）
+    戻り値: {"entries", "files", "bytes", "overwritten", "flattened"} の統計
+    （ストア経由の場合は "methods" と "store_hit" も含む）
+    """
+    if isinstance(template_source, Path) and template_source.is_dir():
+        return _copy_template_dir(template_source, project_path)
+    mode = os.environ.get("SPECIFY_MATERIALIZE", DEFAULT_MATERIALIZE)
+    use_store = mode == "hardlink" or (mode == "auto" and reflink_supported(project_path))
+    if sha256 and isinstance(template_source, Path) and use_store:
+        with unpacked_template(template_source, sha256) as (store, unpacked, store_hit):
+            stats = materialize_template(store, project_path)
+        stats.update(entries=unpacked["entries"], flattened=unpacked["flattened"], store_hit=store_hit)
+        return stats
+    return extract_template_archive(template_source, project_path)
+
+
+def _materialize_summary(stats: dict) -> str:
+    """
+    配置方法の内訳（例: "reflink 120 files"）。ストアを使わなかった場合は空文字
+    """
+    if "methods" not in stats:
+        return ""
+    methods = ", ".join(f"{method} {count:,} files" for method, count in stats["methods"].items())
+    return f"{methods}{' (store hit)' if stats['store_hit'] else ''}"
+
+
+def _mirror_template_asset(source: str | None, asset_prefix: str) -> tuple[Path, dict, str] | None:
+    """
+    sourceがローカルのミラーディレクトリ（specify mirror sync --dir）なら、同期済みのテンプレートを探す
+    戻り値: (アセットのパス, ミラーのアセット情報, リリースタグ)。URL・該当なしの場合はNone
+    """
+    if not source or re.match(r"https?://", source):
+        return None
+    mirror_dir = _mirror_dir(Path(source))
+    release = _load_mirror_release(mirror_dir)
+    if release is None:
+        return None
+    for asset in release.get("assets", []):
+        if asset["name"].startswith(asset_prefix) and asset["name"].endswith(".zip"):
+            path = mirror_dir / "assets" / release["tag_name"] / asset["name"]
+            if path.is_file():
+                return path, asset, release["tag_name"]
+    return None
+
+
+def resolve_offline_template(ai_assistant: str, template_path: Path | None = None, *, verbose: bool = True, source: str | None = None):
+    """
+    ネットワークを使わずにテンプレートを解決
+    template_path指定時はローカルのzipまたはディレクトリ、未指定時はユーザーキャッシュから探す
+    sourceがローカルのミラーディレクトリなら、そのリリースを優先し、キャッシュになければミラーのアセットを使う
+    戻り値: (path, metadata_dict)
+    """
+    import zipfile
+
+    if template_path is not None:
+        path = template_path.expanduser().resolve()
+        if path.is_dir():
+            size = sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+        elif path.is_file() and zipfile.is_zipfile(path):
+            size = path.stat().st_size
+        else:
+            if verbose:
+                console.print(f"[red]Error:[/red] Template must be a zip file or a directory: {path}")
+            raise typer.Exit(1)
+        if verbose:
+            console.print(f"[cyan]Using local template:[/cyan] {path}")
+        return path, {
+            "filename": path.name,
+            "size": size,
+            "release": "local",
+            "asset_url": str(path),
+            "cached": False,
+            "cache_hit": False,
+            "local": True,
+            "verified": False,
+        }
+
+    pattern = f"spec-kit-template-{ai_assistant}"
+    mirrored = _mirror_template_asset(source, pattern)
+    if mirrored:
+        preferred = mirrored[2]
+    else:
+        stored = _load_release_store(_release_store_path(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, source))
+        preferred = stored["release"]["tag_name"] if stored else None
+    hit = cache_lookup_latest(pattern, preferred)
+    if mirrored and (not hit or hit[1]["release"] != preferred):
+        path, asset, tag = mirrored
+        sha256 = _file_sha256(path)
+        if sha256 != asset["sha256"]:
+            if verbose:
+                console.print(f"[red]Error:[/red] SHA-256 of {path} does not match the mirror's release.json")
+            raise typer.Exit(1)
+        if verbose:
+            console.print(f"[cyan]Using mirrored template:[/cyan] {asset['name']} ({tag})")
+        return path, {
+            "filename": asset["name"],
+            "size": path.stat().st_size,
+            "release": tag,
+            "asset_url": str(path),
+            "sha256": sha256,
+            "cached": False,
+            "cache_hit": False,
+            "local": True,
+            "verified": True,
+        }
+    if not hit:
+        if verbose:
+            console.print(f"[red]Error:[/red] No cached template found for AI assistant '{ai_assistant}'")
+            console.print("[yellow]Run init once with network access, pass --template-zip, or pass --source <mirror dir>[/yellow]")
+        raise typer.Exit(1)
+
+    blob_path, entry = hit
+    if verbose:
+        console.print(f"[cyan]Using cached template:[/cyan] {entry['asset']} ({entry['release']})")
+    return blob_path, {
+        "filename": entry["asset"],
+        "size": entry["size"],
+        "release": entry["release"],
+        "asset_url": str(blob_path),
+        "sha256": entry["sha256"],
+        "cached": True,
+        "cache_hit": True,
+        "local": False,
+        "verified": True,
+    }
+
+
+def _discard_template_source(template_source, meta: dict) -> None:
+    """
+    一時的に取得したテンプレートを破棄（キャッシュ・ローカル指定のものは残す）
+    """
+    if meta["cached"] or meta["local"]:
+        return
+    if isinstance(template_source, Path):
+        template_source.unlink(missing_ok=True)
+    else:
+        template_source.close()
+
+
+def download_and_extract_template(project_path: Path, ai_assistant: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, use_cache: bool = True, refresh: bool = False, offline: bool = False, template_path: Path | None = None, source: str | None = None, template: tuple | None = None) -> Path:
+    """
+    最新リリースをダウンロードし展開して新規プロジェクト作成
+    tracker指定時は進捗を記録、use_cache=Falseでキャッシュを使わない
+    refresh=Trueでリリース情報を問い合わせ直す
+    offline=Trueまたはtemplate_path指定時はHTTP通信を一切行わない
+    template: resolve_templateで取得済みの (template_source, metadata_dict)（指定時は取得を省略）
+    戻り値: project_path
+    """
+    import zipfile
+
+    current_dir = Path.cwd()
+    offline = offline or template_path is not None
+
+    # Step: fetch (release metadata) then download, timed separately
+    failed_step = "download" if offline else "fetch"
+    try:
+        if template is not None:
+            if tracker:
+                tracker.skip("fetch", "確認時に取得済み")
+                tracker.add("download", "Download template")
+                tracker.start("download")
+            template_source, meta = template
+        elif offline:
+            if tracker:
+                tracker.skip("fetch", "offline")
+                tracker.add("download", "Download template")
+                tracker.start("download")
+            template_source, meta = resolve_offline_template(
+                ai_assistant,
+                template_path,
+                verbose=verbose and tracker is None,
+                source=source,
+            )
+        else:
+            if tracker:
+                tracker.start("fetch", f"contacting {source}" if source else "contacting GitHub API")
+            elif verbose:
+                console.print("[cyan]Fetching latest release information...[/cyan]")
+            release_data = fetch_release_metadata(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=refresh, verbose=verbose and tracker is None, source=source)
+            failed_step = "download"
+            if tracker:
+                tracker.complete("fetch", f"release {release_data['tag_name']}")
+                tracker.add("download", "Download template")
+                tracker.start("download")
+            template_source, meta = download_template_from_github(
+                ai_assistant,
+                current_dir,
+                verbose=verbose and tracker is None,
+                show_progress=(tracker is None),
+                use_cache=use_cache,
+                refresh=refresh,
+                release_data=release_data,
+            )
+        if tracker:
+            if meta["local"]:
+                tracker.complete("download", f"{meta['filename']} (local)", bytes=meta["size"])
+            elif meta["cache_hit"]:
+                tracker.complete("download", f"{meta['filename']} (cache hit)", bytes=meta["size"])
+            else:
+                tracker.complete("download", f"{meta['filename']} ({meta['size']:,} bytes)", bytes=meta["size"])
+    except Exception as e:
+        if tracker:
+            tracker.error(failed_step, str(e))
+        else:
+            if verbose:
+                console.print(f"[red]Error downloading template:[/red] {e}")
+        raise
+
+    # Validate the archive before touching the filesystem so a bad download fails fast
+    if tracker:
+        tracker.add("verify", "Verify template")
+        tracker.start("verify")
+    try:
+        entry_count = validate_template_archive(template_source)
+    except (zipfile.BadZipFile, ValueError, OSError) as e:
+        if tracker:
+            tracker.error("verify", str(e))
+        elif verbose:
+            console.print(f"[red]Invalid template archive:[/red] {e}")
+        _discard_template_source(template_source, meta)
+        if meta["cached"]:
+            # Drop the bad blob; the cache index entry is discarded on the next lookup
+            template_source.unlink(missing_ok=True)
+        raise typer.Exit(1)
+    if tracker:
+        checks = [f"{entry_count} entries"]
+        if meta.get("sha256"):
+            checks.append(f"sha256 {meta['sha256'][:12]}{' matched' if meta['verified'] else ''}")
+        tracker.complete("verify", ", ".join(checks), entries=entry_count)
+
+    if tracker:
+        tracker.add("extract", "Extract template")
+        tracker.start("extract")
+    elif verbose:
+        console.print("Extracting template...")
+
+    try:
+        # Create project directory only if not using current directory
+        if not is_current_dir:
+            project_path.mkdir(parents=True)
+
+        if is_current_dir:
+            # 既存ディレクトリには差分（新規・変更）のファイルだけを書き込む
+            stats = apply_template_merge(template_source, project_path, plan_template_merge(template_source, project_path))
+        else:
+            # Stream each member straight to its final path (GitHub root prefix stripped),
+            # or materialize it from the unpacked store when the archive is cached
+            stats = install_template(template_source, project_path, sha256=meta.get("sha256") if meta["cached"] else None)
+        # specify upgradeが三者比較に使うリリースとファイルごとのハッシュを記録
+        locked = lock_installed_template(template_source, project_path, ai_assistant, meta, source=source)
+        if tracker:
+            tracker.start("zip-list")
+            tracker.complete("zip-list", f"{stats['entries']} entries")
+            if stats["flattened"]:
+                tracker.add("flatten", "Flatten nested directory")
+                tracker.complete("flatten")
+            tracker.start("extracted-summary")
+            tracker.complete("extracted-summary", f"{stats['files']} files, {stats['bytes']:,} bytes")
+            tracker.add("lock", "ロックファイル作成")
+            tracker.complete("lock", f"{TEMPLATE_LOCK_FILE} ({locked} files)")
+        elif verbose:
+            console.print(f"[cyan]Template contains {stats['entries']} items[/cyan]")
+            if stats["flattened"]:
+                console.print(f"[cyan]Flattened nested directory structure[/cyan]")
+            console.print(f"[cyan]Extracted {stats['files']} files to {project_path}[/cyan]")
+            if "methods" in stats:
+                console.print(f"[cyan]Materialized from unpacked template store:[/cyan] {_materialize_summary(stats)}")
+            if is_current_dir:
+                console.print(f"[cyan]Merged:[/cyan] {stats['new']} new, {stats['changed']} changed, {stats['identical']} identical (skipped)")
+            console.print(f"[cyan]Wrote {TEMPLATE_LOCK_FILE}[/cyan] ({locked} files)")
+
+    except Exception as e:
+        if tracker:
+            tracker.error("extract", str(e))
+        else:
+            if verbose:
+                console.print(f"[red]Error extracting template:[/red] {e}")
+        # Clean up project directory if created and not current directory
+        if not is_current_dir and project_path.exists():
+            shutil.rmtree(project_path)
+        raise typer.Exit(1)
+    else:
+        if tracker:
+            if is_current_dir:
+                detail = f"new {stats['new']}, changed {stats['changed']}, identical {stats['identical']} (skipped)"
+            else:
+                detail = _materialize_summary(stats)
+            tracker.complete("extract", detail, entries=stats["entries"], files=stats["files"], bytes=stats["bytes"])
+    finally:
+        if tracker:
+            tracker.add("cleanup", "Remove temporary archive")
+        # Clean up downloaded ZIP file (cached and local templates are kept)
+        if meta["cached"] or meta["local"]:
+            if tracker:
+                tracker.skip("cleanup", "cached" if meta["cached"] else "local")
+        else:
+            _discard_template_source(template_source, meta)
+            if tracker:
+                tracker.complete("cleanup", "" if isinstance(template_source, Path) else "in-memory")
+            elif verbose and isinstance(template_source, Path):
+                console.print(f"Cleaned up: {template_source.name}")
+
+    return project_path
+
+
+def resolve_template(ai_assistant: str, *, use_cache: bool = True, refresh: bool = False, offline: bool = False, template_path: Path | None = None, source: str | None = None) -> tuple:
+    """
+    テンプレートを取得して検証（展開はしない。--dry-runや--hereの確認で計画を立てる前に使う）
+    戻り値: (template_source, metadata_dict)。不要になったら_discard_template_sourceで破棄する
+    """
+    import zipfile
+
+    if offline or template_path is not None:
+        template_source, meta = resolve_offline_template(ai_assistant, template_path, source=source)
+    else:
+        template_source, meta = download_template_from_github(
+            ai_assistant, Path.cwd(), use_cache=use_cache, refresh=refresh, source=source
+        )
+    try:
+        validate_template_archive(template_source)
+    except (zipfile.BadZipFile, ValueError, OSError) as e:
+        console.print(f"[red]Invalid template archive:[/red] {e}")
+        _discard_template_source(template_source, meta)
+        if meta["cached"]:
+            template_source.unlink(missing_ok=True)
+        raise typer.Exit(1)
+    return template_source, meta
+
+
+def preview_template_merge(targets: list[tuple[Path, str]], *, use_cache: bool = True, refresh: bool = False, offline: bool = False, template_path: Path | None = None, source: str | None = None) -> None:
+    """
+    各 (プロジェクトのパス, AIアシスタント) へのマージ計画だけを表示（--dry-run。何も書き込まない）
+    テンプレートはAIアシスタントごとに1回だけ取得する
+    """
+    for ai in dict.fromkeys(ai for _, ai in targets):
+        template_source, meta = resolve_template(
+            ai, use_cache=use_cache, refresh=refresh, offline=offline, template_path=template_path, source=source
+        )
+        try:
+            plans = [(path, plan_template_merge(template_source, path)) for path, target_ai in targets if target_ai == ai]
+        except (ValueError, OSError) as e:
+            console.print(f"[red]Invalid template archive:[/red] {e}")
+            raise typer.Exit(1)
+        finally:
+            _discard_template_source(template_source, meta)
+        for path, plan in plans:
+            console.print()
+            print_merge_plan(plan, path)
+    console.print("[dim]--dry-run: ファイルは書き込まれていません[/dim]")
+
+
+def report_step_timings(tracker: StepTracker, *, trace: Path | None = None, profile: bool = False) -> None:
+    """
+    ステップごとの所要時間を出力
+    trace指定時はトレースファイルへ書き出し、profile=Trueで所要時間の内訳表を表示
+    """
+    if trace:
+        try:
+            tracker.write_trace(trace)
+        except OSError as e:
+            console.print(f"[yellow]警告:[/yellow] トレースを書き出せませんでした: {e}")
+        else:
+            console.print(f"[dim]トレースを書き出しました: {trace}[/dim]")
+    if not profile:
+        return
+
+    from rich.table import Table
+
+    timed = [(step, tracker.duration(step["key"])) for step in tracker.steps]
+    timed = [(step, elapsed) for step, elapsed in timed if elapsed is not None]
+    total = time.monotonic() - tracker.created
+    table = Table(title="ステップ別所要時間", title_justify="left", box=None, padding=(0, 2))
+    table.add_column("ステップ")
+    table.add_column("時間", justify="right")
+    table.add_column("割合", justify="right")
+    table.add_column("件数/バイト", style="bright_black")
+    for step, elapsed in sorted(timed, key=lambda item: item[1], reverse=True):
+        metrics = ", ".join(f"{name}={value:,}" for name, value in step["metrics"].items())
+        table.add_row(step["label"], _format_duration(elapsed), f"{elapsed / total:.0%}" if total else "-", metrics)
+    table.add_row("[bold]合計[/bold]", f"[bold]{_format_duration(total)}[/bold]", "", "")
+    console.print()
+    console.print(table)
+
+
+def require_agent_tools(ai_choices) -> None:
+    """
+    選択したAIアシスタントのCLIがインストールされているか確認し、なければ終了
+    """
+    agent_tool_missing = False
+    # Copilotは通常IDEに同梱のためチェック不要
+    tools = [ai for ai in ai_choices if ai in ("claude", "gemini")]
+    detected = detect_tools(tools)
+    for selected_ai in tools:
+        if not check_tool(selected_ai, TOOL_INSTALL_HINTS[selected_ai], detected[selected_ai]):
+            console.print(f"[red]エラー:[/red] {'Claude' if selected_ai == 'claude' else 'Gemini'} CLIが必要です")
+            agent_tool_missing = True
+
+    if agent_tool_missing:
+        console.print("\n[red]必要なAIツールが見つかりません！[/red]")
+        console.print("[yellow]ヒント:[/yellow] --ignore-agent-tools でこのチェックをスキップできます")
+        raise typer.Exit(1)
+
+
+def load_batch_manifest(manifest_path: Path, default_ai: str | None = None) -> list[dict]:
+    """
+    --batch用マニフェストを読み込む
+    形式: [{"name": "svc-a", "ai": "claude"}, ...] または {"projects": [...]}
+    aiを省略したエントリは default_ai（未指定ならcopilot）を使う
+    """
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]エラー:[/red] マニフェストを読み込めません: {e}")
+        raise typer.Exit(1)
+
+    if isinstance(data, dict):
+        data = data.get("projects")
+    if not isinstance(data, list) or not data:
+        console.print("[red]エラー:[/red] マニフェストにはプロジェクトのリストが必要です")
+        raise typer.Exit(1)
+
+    projects = []
+    seen = set()
+    for entry in data:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        name = entry.get("name") if isinstance(entry, dict) else None
+        if not name:
+            console.print(f"[red]エラー:[/red] nameのないエントリがあります: {entry}")
+            raise typer.Exit(1)
+        ai = entry.get("ai") or default_ai or "copilot"
+        if ai not in AI_CHOICES:
+            console.print(f"[red]エラー:[/red] 無効なAIアシスタント '{ai}'（{name}）。選択肢: {', '.join(AI_CHOICES.keys())}")
+            raise typer.Exit(1)
+        path = Path(name).resolve()
+        if path in seen or path.exists():
+            console.print(f"[red]エラー:[/red] ディレクトリ '{name}' は既に存在するか重複しています")
+            raise typer.Exit(1)
+        seen.add(path)
+        projects.append({"name": name, "ai": ai, "path": path})
+    return projects
+
+
+class TemplatePrefetcher:
+    """
+    AIアシスタント選択中にリリース情報とテンプレートを裏で先読みし、ユーザーキャッシュへ入れておく
+    選ばれなかったテンプレートの取得はfinishでcancelイベントをセットして次のチャンクで止める
+    スレッドはデーモンなので、使われずに終了しても待たない（途中の.partは次回続きから再開される）
+    """
+
+    def __init__(self, ai_list: list[str], *, refresh: bool = False, source: str | None = None, download: bool = True):
+        from concurrent.futures import Future
+
+        self._source = source
+        self._release = Future()
+        self._downloads = {ai: Future() for ai in (ai_list if download else [])}
+        self._cancel = {ai: threading.Event() for ai in self._downloads}
+        self._spawn(self._release, fetch_release_metadata, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=refresh, verbose=False, source=source)
+        for ai, future in self._downloads.items():
+            self._spawn(future, self._download, ai)
+
+    @staticmethod
+    def _spawn(future, fn, *args, **kwargs) -> None:
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="specify-prefetch", daemon=True).start()
+
+    def _download(self, ai: str) -> dict | None:
+        release_data = self._release.result()
+        # 選択が済んでいれば、選ばれなかったテンプレートは取得しない
+        if self._cancel[ai].is_set():
+            return None
+        _, meta = download_template_from_github(
+            ai, Path.cwd(), verbose=False, show_progress=False, use_cache=True, release_data=release_data, source=self._source, cancel=self._cancel[ai]
+        )
+        return meta
+
+    def finish(self, ai: str) -> bool:
+        """
+        選択されたテンプレートの先読みの完了を待つ（他のテンプレートの取得は転送中のものも中断する）
+        失敗は無視する（本処理で改めて取得し、エラーを表示する）
+        戻り値: リリース情報を取得できたか
+        """
+        for other, event in self._cancel.items():
+            if other != ai:
+                event.set()
+        try:
+            if ai in self._downloads:
+                self._downloads[ai].result()
+            self._release.result()
+        except BaseException:
+            return self._release.done() and self._release.exception() is None
+        return True
+
+
+def run_batch_init(projects: list[dict], *, jobs: int, no_git: bool, git_available: bool, use_cache: bool = True, refresh: bool = False, offline: bool = False, template_path: Path | None = None, trace: Path | None = None, profile: bool = False, source: str | None = None) -> bool:
+    """
+    複数プロジェクトを一括作成
+    AIごとのテンプレートは1回だけ取得し、展開とgit初期化はスレッドプールで並列実行
+    trace/profileはreport_step_timingsを参照
+    戻り値: 全プロジェクトが成功したか
+    """
+    import zipfile
+    from concurrent.futures import ThreadPoolExecutor
+    from rich.live import Live
+
+    offline = offline or template_path is not None
+    ai_list = sorted({p["ai"] for p in projects})
+    tracker = StepTracker("Initialize Specify Projects")
+    for ai in ai_list:
+        tracker.add(f"template:{ai}", f"テンプレート取得 ({ai})")
+    for project in projects:
+        tracker.add(f"project:{project['name']}", project["name"])
+
+    templates = {}
+
+    def acquire(ai):
+        key = f"template:{ai}"
+        tracker.start(key)
+        try:
+            if offline:
+                archive, meta = resolve_offline_template(ai, template_path, verbose=False, source=source)
+            else:
+                archive, meta = download_template_from_github(
+                    ai, Path.cwd(), verbose=False, show_progress=False, use_cache=use_cache, refresh=refresh, source=source
+                )
+        except Exception as e:
+            tracker.error(key, str(e) or "取得失敗")
+            return
+        try:
+            validate_template_archive(archive)
+        except (zipfile.BadZipFile, ValueError, OSError) as e:
+            tracker.error(key, str(e))
+            _discard_template_source(archive, meta)
+            return
+        if not isinstance(archive, Path):
+            # In-memory archives are shared by several workers: each gets its own BytesIO
+            data = archive.read()
+            archive.close()
+            archive = lambda: io.BytesIO(data)
+        templates[ai] = (archive, meta)
+        detail = "local" if meta["local"] else f"release {meta['release']}"
+        tracker.complete(key, f"{detail}{' (cache hit)' if meta['cache_hit'] else ''}", bytes=meta["size"])
+
+    def build(project):
+        key = f"project:{project['name']}"
+        if project["ai"] not in templates:
+            tracker.skip(key, "テンプレートなし")
+            return False
+        archive, meta = templates[project["ai"]]
+        project_path = project["path"]
+        tracker.start(key, "展開中")
+        try:
+            project_path.mkdir(parents=True)
+            stats = install_template(
+                archive() if callable(archive) else archive, project_path, sha256=meta.get("sha256") if meta["cached"] else None
+            )
+            lock_installed_template(archive() if callable(archive) else archive, project_path, project["ai"], meta, source=source)
+            detail = f"{project['ai']}, {stats['files']} files"
+            if "methods" in stats:
+                detail += f" ({', '.join(stats['methods'])})"
+            if not no_git:
+                if is_git_repo(project_path):
+                    detail += ", 既存リポジトリ"
+                elif git_available:
+                    tracker.start(key, "git初期化中")
+                    detail += ", git" if init_git_repo(project_path, quiet=True) else ", git初期化失敗"
+            tracker.complete(key, detail, files=stats["files"], bytes=stats["bytes"])
+            return True
+        except Exception as e:
+            tracker.error(key, str(e))
+            if project_path.exists():
+                shutil.rmtree(project_path)
+            return False
+
+    # Liveはrefresh_per_secondの頻度でtrackerを描画する（更新ごとには描画しない）
+    with Live(tracker, console=get_console(), refresh_per_second=8, transient=True):
+        if not offline:
+            # 並列取得の前にリリース情報を1回だけ問い合わせておく
+            # （失敗した場合は各テンプレートの取得でエラーを表示する）
+            try:
+                fetch_release_metadata(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=refresh, verbose=False, source=source)
+            except typer.Exit:
+                pass
+            else:
+                refresh = False
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(acquire, ai_list))
+            results = list(pool.map(build, projects))
+
+    console.print(tracker.render())
+    report_step_timings(tracker, trace=trace, profile=profile)
+    for archive, meta in templates.values():
+        if not (meta["cached"] or meta["local"] or callable(archive)) and archive.exists():
+            archive.unlink()
+    return all(results)
+
+
+@app.command()
+def init(
+    project_name: str = typer.Argument(None, help="Name for your new project directory (optional if using --here)"),
+    ai_assistant: str = typer.Option(None, "--ai", help="AI assistant to use: claude, gemini, or copilot"),
+    ignore_agent_tools: bool = typer.Option(False, "--ignore-agent-tools", help="Skip checks for AI agent tools like Claude Code"),
+    no_git: bool = typer.Option(False, "--no-git", help="Skip git repository initialization"),
+    here: bool = typer.Option(False, "--here", help="Initialize project in the current directory instead of creating a new one"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always download the template and do not keep it in the user cache"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore stored release information and query GitHub again"),
+    offline: bool = typer.Option(False, "--offline", help="Do not access the network; use the cached template (or --template-zip, or a mirror directory given as --source)"),
+    template_zip: Path = typer.Option(None, "--template-zip", help="Use a local template zip file or directory instead of downloading (implies --offline)"),
+    source: str = typer.Option(None, "--source", envvar="SPECIFY_TEMPLATE_SOURCE", help="Template mirror URL to use instead of GitHub (see 'specify mirror serve'); with --offline, a 'specify mirror sync' directory"),
+    batch: Path = typer.Option(None, "--batch", help="Create several projects from a JSON manifest of names and AI assistants"),
+    jobs: int = typer.Option(min(8, os.cpu_count() or 1), "--jobs", min=1, help="Number of projects to set up in parallel with --batch"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show which files would be created, overwritten or left unchanged, without writing anything"),
+    trace: Path = typer.Option(None, "--trace", help="Write per-step timings to a Chrome trace JSON file (.jsonl/.ndjson: append JSON lines)"),
+    profile: bool = typer.Option(False, "--profile", help="Show a per-step timing breakdown after setup"),
+):
+    """
+    最新テンプレートから新しいSpecifyプロジェクトを初期化します。
+
+    このコマンドは以下を行います:
+    1. 必要なツールのインストール確認（gitは任意）
+    2. AIアシスタント（Claude Code, Gemini CLI, GitHub Copilot）を選択
+    3. GitHubから該当テンプレートをダウンロード（ユーザーキャッシュにあれば再利用）
+    4. 新規ディレクトリまたはカレントディレクトリに展開
+    5. gitリポジトリ初期化（--no-git指定や既存リポジトリ時はスキップ）
+    6. 必要に応じAIアシスタントコマンドのセットアップ
+
+    【例】
+        specify init my-project
+        specify init my-project --ai claude
+        specify init my-project --ai gemini
+        specify init my-project --ai copilot --no-git
+        specify init --ignore-agent-tools my-project
+        specify init --here --ai claude
+        specify init --here
+        specify init --here --dry-run
+        specify init my-project --no-cache
+        specify init my-project --refresh
+        specify init my-project --ai claude --offline
+        specify init my-project --ai claude --template-zip ./spec-kit-template-claude.zip
+        specify init my-project --ai claude --source http://mirror.internal:8765
+        specify init --batch projects.json --jobs 4
+        specify init my-project --profile
+        specify init my-project --trace init-trace.json
+    """
+    from rich.live import Live
+    from rich.panel import Panel
+
+    # まずバナー表示
+    show_banner()
+
+
+    # 引数バリデーション
+    if batch:
+        if here or project_name:
+            console.print("[red]エラー:[/red] --batchはプロジェクト名や--hereと同時指定できません")
+            raise typer.Exit(1)
+        if ai_assistant and ai_assistant not in AI_CHOICES:
+            console.print(f"[red]エラー:[/red] 無効なAIアシスタント '{ai_assistant}'。選択肢: {', '.join(AI_CHOICES.keys())}")
+            raise typer.Exit(1)
+        projects = load_batch_manifest(batch, ai_assistant)
+        git_available = no_git or check_tool("git", TOOL_INSTALL_HINTS["git"])
+        if dry_run:
+            preview_template_merge(
+                [(p["path"], p["ai"]) for p in projects],
+                use_cache=not no_cache, refresh=refresh, offline=offline, template_path=template_zip, source=source,
+            )
+            return
+        if not ignore_agent_tools:
+            require_agent_tools(sorted({p["ai"] for p in projects}))
+        ok = run_batch_init(
+            projects,
+            jobs=jobs,
+            no_git=no_git,
+            git_available=git_available,
+            use_cache=not no_cache,
+            refresh=refresh,
+            offline=offline,
+            template_path=template_zip,
+            trace=trace,
+            profile=profile,
+            source=source,
+        )
+        if not ok:
+            console.print("\n[red]一部のプロジェクトの作成に失敗しました[/red]")
+            raise typer.Exit(1)
+        console.print(f"\n[bold green]{len(projects)}件のプロジェクトの準備ができました[/bold green]")
+        return
+
+    if here and project_name:
+        console.print("[red]エラー:[/red] --hereとプロジェクト名は同時指定できません")
+        raise typer.Exit(1)
+
+    if not here and not project_name:
+        console.print("[red]エラー:[/red] プロジェクト名指定か--hereフラグが必要です")
+        raise typer.Exit(1)
+
+    # 確認プロンプトやAI選択を待つ間に、リリース情報とテンプレートの取得を始めておく
+    default_ai = "copilot"
+    prefetch = None
+    if not (offline or template_zip):
+        if ai_assistant in AI_CHOICES:
+            prefetch_ais = [ai_assistant]
+        else:
+            prefetch_ais = [default_ai] + [ai for ai in AI_CHOICES if ai != default_ai]
+        prefetch = TemplatePrefetcher(prefetch_ais, refresh=refresh, source=source, download=not no_cache)
+
+    # プロジェクトディレクトリ決定
+    if here:
+        project_name = Path.cwd().name
+        project_path = Path.cwd()
+
+        # カレントディレクトリに既存ファイルがあれば、AI選択後にマージ計画を表示して確認する
+        existing_items = list(project_path.iterdir())
+    else:
+        project_path = Path(project_name).resolve()
+        # 既存ディレクトリがある場合はエラー
+        if project_path.exists():
+            console.print(f"[red]エラー:[/red] ディレクトリ '{project_name}' は既に存在します")
+            raise typer.Exit(1)
+
+    console.print(Panel.fit(
+        "[bold cyan]Specifyプロジェクトセットアップ[/bold cyan]\n"
+        f"{'カレントディレクトリで初期化:' if here else '新規プロジェクト作成:'} [green]{project_path.name}[/green]"
+        + (f"\n[dim]パス: {project_path}[/dim]" if here else ""),
+        border_style="cyan"
+    ))
+
+
+    # gitが必要な場合のみチェック
+    git_available = True
+    if not no_git:
+        git_available = check_tool("git", TOOL_INSTALL_HINTS["git"])
+        if not git_available:
+            console.print("[yellow]gitが見つかりません - リポジトリ初期化をスキップします[/yellow]")
+
+
+    # AIアシスタント選択
+    if ai_assistant:
+        if ai_assistant not in AI_CHOICES:
+            console.print(f"[red]エラー:[/red] 無効なAIアシスタント '{ai_assistant}'。選択肢: {', '.join(AI_CHOICES.keys())}")
+            raise typer.Exit(1)
+        selected_ai = ai_assistant
+    else:
+        # 矢印キー選択UI
+        selected_ai = select_with_arrows(
+            AI_CHOICES,
+            "AIアシスタントを選択:",
+            default_ai
+        )
+
+
+    # AIエージェントツールの有無を確認（--ignore-agent-toolsでスキップ可）
+    if not ignore_agent_tools:
+        require_agent_tools([selected_ai])
+
+    # 先読みが済んでいればリリース情報・テンプレートはキャッシュから使われる
+    if prefetch is not None and prefetch.finish(selected_ai):
+        refresh = False
+
+    if dry_run:
+        preview_template_merge(
+            [(project_path, selected_ai)], use_cache=not no_cache, refresh=refresh, offline=offline, template_path=template_zip, source=source
+        )
+        return
+
+    # 確認に使ったテンプレートはそのまま展開に使う（再取得しない）
+    template = None
+    if here and existing_items:
+        template = resolve_template(
+            selected_ai, use_cache=not no_cache, refresh=refresh, offline=offline, template_path=template_zip, source=source
+        )
+        try:
+            plan = plan_template_merge(template[0], project_path)
+        except (ValueError, OSError) as e:
+            _discard_template_source(*template)
+            console.print(f"[red]Invalid template archive:[/red] {e}")
+            raise typer.Exit(1)
+        console.print(f"[yellow]警告:[/yellow] カレントディレクトリが空ではありません（{len(existing_items)}件）")
+        console.print("[yellow]テンプレートファイルは既存内容とマージされ、内容が異なるファイルは上書きされます[/yellow]")
+        print_merge_plan(plan, project_path)
+        if plan["conflicts"]:
+            _discard_template_source(*template)
+            console.print("[red]エラー:[/red] 衝突するファイル・ディレクトリを移動または削除してから再実行してください")
+            raise typer.Exit(1)
+
+        # 続行確認
+        response = typer.confirm("続行しますか？")
+        if not response:
+            _discard_template_source(*template)
+            console.print("[yellow]操作をキャンセルしました[/yellow]")
+            raise typer.Exit(0)
+
+    # Download and set up project
+    # New tree-based progress (no emojis); include earlier substeps
+    tracker = StepTracker("Initialize Specify Project")
+    # Flag to allow suppressing legacy headings
+    sys._specify_tracker_active = True
+    # Pre steps recorded as completed before live rendering
+    tracker.add("precheck", "Check required tools")
+    tracker.complete("precheck", "ok")
+    tracker.add("ai-select", "AIアシスタント選択")
+    tracker.complete("ai-select", f"{selected_ai}")
+    for key, label in [
+        ("fetch", "リリース情報取得"),
+        ("download", "テンプレートDL"),
+        ("verify", "整合性検証"),
+        ("extract", "テンプレート展開"),
+        ("zip-list", "アーカイブ内容"),
+        ("extracted-summary", "展開サマリ"),
+        ("cleanup", "一時ファイル削除"),
+        ("git", "git初期化"),
+        ("final", "完了")
+    ]:
+        tracker.add(key, label)
+
+
+    # Liveツリーはtransientで最後に静的ツリーへ置換
+    # Liveはrefresh_per_secondの頻度でtrackerを描画する（更新ごとには描画しない）
+    with Live(tracker, console=get_console(), refresh_per_second=8, transient=True):
+        try:
+            download_and_extract_template(project_path, selected_ai, here, verbose=False, tracker=tracker, use_cache=not no_cache, refresh=refresh, offline=offline, template_path=template_zip, source=source, template=template)
+
+            # gitステップ
+            if not no_git:
+                tracker.start("git")
+                if is_git_repo(project_path):
+                    tracker.complete("git", "既存リポジトリ検出")
+                elif git_available:
+                    if init_git_repo(project_path, quiet=True):
+                        tracker.complete("git", "初期化完了")
+                    else:
+                        tracker.error("git", "初期化失敗")
+                else:
+                    tracker.skip("git", "git未インストール")
+            else:
+                tracker.skip("git", "--no-git指定")
+
+            tracker.complete("final", "プロジェクト準備完了")
+            failed = False
+        except Exception as e:
+            tracker.error("final", "失敗" if isinstance(e, typer.Exit) else str(e))
+            if not here and project_path.exists():
+                shutil.rmtree(project_path)
+            failed = True
+
+    # 静的ツリー表示（失敗時もどのステップで止まったか分かるように表示）
+    console.print(tracker.render())
+    report_step_timings(tracker, trace=trace, profile=profile)
+    if failed:
+        raise typer.Exit(1)
+    console.print("\n[bold green]プロジェクトの準備ができました[/bold green]")
+
+    # 次のステップ案内
+    steps_lines = []
+    if not here:
+        steps_lines.append(f"1. [bold green]cd {project_name}[/bold green]")
+        step_num = 2
+    else:
+        steps_lines.append("1. 既にプロジェクトディレクトリ内です！")
+        step_num = 2
+
+    if selected_ai == "claude":
+        steps_lines.append(f"{step_num}. Open in Visual Studio Code and start using / commands with Claude Code")
+        steps_lines.append("   - Type / in any file to see available commands")
+        steps_lines.append("   - Use /specify to create specifications")
+        steps_lines.append("   - Use /plan to create implementation plans")
+        steps_lines.append("   - Use /tasks to generate tasks")
+    elif selected_ai == "gemini":
+        steps_lines.append(f"{step_num}. Gemini CLIで / コマンドを使う")
+        steps_lines.append("   - gemini /specify で仕様作成")
+        steps_lines.append("   - gemini /plan で計画作成")
+        steps_lines.append("   - 詳細は GEMINI.md を参照")
+    elif selected_ai == "copilot":
+        steps_lines.append(f"{step_num}. VS Codeで [bold cyan]/specify[/], [bold cyan]/plan[/], [bold cyan]/tasks[/] コマンドをGitHub Copilotで使う")
+
+    step_num += 1
+    steps_lines.append(f"{step_num}. [bold magenta]CONSTITUTION.md[/bold magenta] にプロジェクトの原則を記載")
+
+    steps_panel = Panel("\n".join(steps_lines), title="次のステップ", border_style="cyan", padding=(1,2))
+    console.print()
+    console.print(steps_panel)
+
+    # Removed farewell line per user request
+
+
+@app.command()
+def check(
+    json_output: bool = typer.Option(False, "--json", help="Print a machine-readable JSON report instead of the formatted output"),
+):
+    """
+    必要なツールが全て揃っているかチェック
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import httpx
+
+    if not json_output:
+        show_banner()
+        console.print("[bold]Specify要件をチェック中...[/bold]\n")
+
+    def probe(url):
+        start = time.monotonic()
+        try:
+            get_http_client().head(url, timeout=5)
+            ok = True
+        except httpx.RequestError:
+            ok = False
+        return {"url": url, "reachable": ok, "elapsed_ms": round((time.monotonic() - start) * 1000)}
+
+    # 接続確認（GitHub APIとテンプレート配布元）とツール検出をすべて並列に実行
+    # 所要時間は各プローブの合計ではなく最大値になる
+    probe_urls = [GITHUB_API_URL, "https://github.com"]
+    tools = ["git", "claude", "gemini"]
+    with ThreadPoolExecutor(max_workers=len(probe_urls) + 1) as pool:
+        probe_futures = [pool.submit(probe, url) for url in probe_urls]
+        detected = pool.submit(detect_tools, tools, with_version=True).result()
+        probes = [future.result() for future in probe_futures]
+
+    if json_output:
+        report = {
+            "network": probes,
+            "tools": {tool: {**info, "install_hint": TOOL_INSTALL_HINTS[tool]} for tool, info in detected.items()},
+        }
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    console.print("[cyan]インターネット接続を確認中...[/cyan]")
+    reachable = {p["url"]: p["reachable"] for p in probes}
+    if all(reachable.values()):
+        console.print("[green]✓[/green] インターネット接続OK")
+    elif any(reachable.values()):
+        unreachable = ", ".join(url for url, ok in reachable.items() if not ok)
+        console.print(f"[yellow]⚠️[/yellow]  一部に接続できません: {unreachable}")
+    else:
+        console.print("[red]✗[/red] インターネット未接続 - テンプレートDLに必須")
+        console.print("[yellow]ネットワーク設定を確認してください[/yellow]")
+
+    def report_tool(tool):
+        info = detected[tool]
+        if info["found"]:
+            version = f" [bright_black]({info['version']})[/bright_black]" if info["version"] else ""
+            console.print(f"[green]✓[/green] {tool}{version}")
+        return check_tool(tool, TOOL_INSTALL_HINTS[tool], info)
+
+    console.print("\n[cyan]オプションツール:[/cyan]")
+    git_ok = report_tool("git")
+
+    console.print("\n[cyan]AIツール（任意）:[/cyan]")
+    claude_ok = report_tool("claude")
+    gemini_ok = report_tool("gemini")
+
+    console.print("\n[green]✓ Specify CLIは利用可能です！[/green]")
+    if not git_ok:
+        console.print("[yellow]リポジトリ管理にはgitのインストールを推奨[/yellow]")
+    if not (claude_ok or gemini_ok):
+        console.print("[yellow]AIアシスタント導入で体験向上[/yellow]")
+
+
+@app.command()
+def upgrade(
+    project: Path = typer.Argument(None, help="Project directory containing .specify/lock.json (default: current directory)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Show which files would be added, updated or deleted, without writing anything"),
+    force: bool = typer.Option(False, "--force", help="Resolve conflicts by taking the new template version (overwrites local changes)"),
+    keep_local: bool = typer.Option(False, "--keep-local", help="Resolve conflicts by keeping the local files as they are"),
+    json_output: bool = typer.Option(False, "--json", help="Print the upgrade plan as JSON"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Always download the template and do not keep it in the user cache"),
+    refresh: bool = typer.Option(False, "--refresh", help="Ignore stored release information and query GitHub again"),
+    offline: bool = typer.Option(False, "--offline", help="Do not access the network; use the cached template (or --template-zip, or a mirror directory given as --source)"),
+    template_zip: Path = typer.Option(None, "--template-zip", help="Upgrade to a local template zip file or directory (implies --offline)"),
+    source: str = typer.Option(None, "--source", envvar="SPECIFY_TEMPLATE_SOURCE", help="Template mirror URL to use instead of GitHub (default: the one recorded at init)"),
+):
+    """
+    プロジェクトのテンプレートを最新リリースへ差分アップグレードします。
+
+    init時に作成した .specify/lock.json（リリースとファイルごとのサイズ・CRC32）を基準に、
+    旧テンプレート・新テンプレート・作業ツリーを比較して、上流で変わり
+    ローカルでは変更されていないファイルだけを書き換えます。
+    両方で変更されたファイルは競合として報告し、そのまま残します（終了コード1）。
+
+    【例】
+        specify upgrade
+        specify upgrade --dry-run
+        specify upgrade path/to/project --json
+        specify upgrade --force
+        specify upgrade --keep-local
+        specify upgrade --template-zip ./spec-kit-template-claude.zip
+    """
+    import zipfile
+
+    if force and keep_local:
+        console.print("[red]エラー:[/red] --force と --keep-local は同時に指定できません")
+        raise typer.Exit(1)
+    project_path = (project or Path.cwd()).resolve()
+    lock = load_template_lock(project_path)
+    if lock is None:
+        console.print(f"[red]エラー:[/red] {project_path / TEMPLATE_LOCK_FILE} が見つからないか読み込めません")
+        console.print("[yellow]specify init で作成したプロジェクトで実行してください[/yellow]")
+        raise typer.Exit(1)
+    ai_assistant = lock["ai"]
+    source = source or lock.get("source")
+    offline = offline or template_zip is not None
+
+    # リリースが同じで未解決の競合もなければテンプレートは取得しない
+    release_data = None
+    if not offline:
+        release_data = fetch_release_metadata(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=refresh, verbose=not json_output, source=source)
+        if release_data["tag_name"] == lock["release"] and not lock.get("conflicts"):
+            if json_output:
+                typer.echo(json.dumps({"release": lock["release"], "up_to_date": True}, ensure_ascii=False))
+            else:
+                console.print(f"[green]既に最新です[/green] ({lock['release']})")
+            return
+
+    if offline:
+        template_source, meta = resolve_offline_template(ai_assistant, template_zip, verbose=not json_output, source=source)
+    else:
+        template_source, meta = download_template_from_github(
+            ai_assistant, Path.cwd(), verbose=not json_output, show_progress=not json_output,
+            use_cache=not no_cache, refresh=False, release_data=release_data,
+        )
+    try:
+        validate_template_archive(template_source)
+        plan = plan_template_upgrade(template_source, project_path, lock)
+        conflicts = [c["path"] for c in plan["conflicts"]]
+        if force:
+            # 新テンプレートの内容で上書き（ローカルで削除したファイルも復元）
+            plan["update"] += conflicts
+        if not dry_run:
+            apply_template_merge(
+                template_source, project_path,
+                {"new": plan["add"], "changed": plan["update"], "identical": [], "entries": 0, "flattened": False},
+            )
+            for rel in plan["delete"]:
+                _member_target(project_path, rel).unlink(missing_ok=True)
+    except (zipfile.BadZipFile, ValueError, OSError) as e:
+        console.print(f"[red]テンプレートのアップグレードに失敗しました:[/red] {e}")
+        raise typer.Exit(1)
+    finally:
+        _discard_template_source(template_source, meta)
+
+    # --keep-localではローカルの内容を新テンプレートへの変更として扱う
+    # 未解決の競合は旧テンプレートの値のまま残し、次回も競合として検出する
+    unresolved = [] if force or keep_local else conflicts
+    files = dict(plan.pop("template"))
+    for rel in unresolved:
+        if rel in lock["files"]:
+            files[rel] = lock["files"][rel]
+        else:
+            del files[rel]
+    if not dry_run:
+        write_template_lock(project_path, ai_assistant, meta, files, source=source, conflicts=unresolved)
+
+    if json_output:
+        report = {"from": lock["release"], "to": meta["release"], "dry_run": dry_run, "resolved": force or keep_local}
+        report.update({key: plan[key] for key in ("add", "update", "delete", "kept", "conflicts")})
+        report["unchanged"] = len(plan["unchanged"]) + len(plan["current"])
+        typer.echo(json.dumps(report, ensure_ascii=False))
+    else:
+        console.print(f"[cyan]テンプレートのアップグレード:[/cyan] {lock['release']} → {meta['release']} ({project_path})")
+        print_upgrade_plan(plan)
+        if dry_run:
+            console.print("[dim]--dry-run: ファイルは書き込まれていません[/dim]")
+        elif unresolved:
+            console.print(f"[yellow]{len(unresolved)}件の競合はそのまま残しました。[/yellow]手動でマージした後 --keep-local、または --force で新テンプレートを採用してください")
+        else:
+            console.print(f"[green]アップグレードしました[/green] ({TEMPLATE_LOCK_FILE} を更新)")
+    if unresolved:
+        raise typer.Exit(1)
+
+
+# `specify mirror` : テンプレートのローカルミラー（リリース情報とアセットを1回だけ取得して配信）
+mirror_app = typer.Typer(
+    name="mirror",
+    help="Sync spec-kit templates once and serve them to 'specify init --source' over HTTP",
+    add_completion=False,
+)
+app.add_typer(mirror_app, name="mirror")
+
+MIRROR_ASSET_PREFIX = "spec-kit-template-"
+DEFAULT_MIRROR_PORT = 8765
+
+
+def _mirror_dir(path: Path | None) -> Path:
+    return path.expanduser().resolve() if path else get_cache_dir() / "mirror"
+
+
+def _load_mirror_release(mirror_dir: Path) -> dict | None:
+    try:
+        with open(mirror_dir / "release.json", encoding="utf-8") as f:
+            release = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return release if isinstance(release, dict) and "tag_name" in release else None
+
+
+def sync_mirror_asset(asset: dict, release: dict, mirror_dir: Path, previous: dict) -> tuple[dict, str]:
+    """
+    1アセットをミラーへ取得（同じ内容が既にあれば何もしない、テンプレートキャッシュにあればコピー）
+    戻り値: (ミラーのアセット情報, "unchanged" / "cached" / "downloaded")
+    """
+    tag = release["tag_name"]
+    target = mirror_dir / "assets" / tag / asset["name"]
+    expected = _expected_sha256(asset, release)
+    known = previous.get(asset["name"])
+    if known and target.is_file() and target.stat().st_size == asset["size"] and known["sha256"] == (expected or known["sha256"]):
+        return known, "unchanged"
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part_path = target.with_name(f".{target.name}.part")
+    hit = cache_lookup(tag, asset["name"])
+    if hit:
+        shutil.copyfile(hit[0], part_path)
+        sha256, how = hit[1], "cached"
+    else:
+        sha256, how = download_asset(asset["browser_download_url"], part_path, asset["size"]), "downloaded"
+    size = part_path.stat().st_size
+    if size != asset["size"] or (expected and expected != sha256):
+        part_path.unlink(missing_ok=True)
+        raise ValueError(f"{asset['name']}: size or SHA-256 does not match the release")
+    part_path.replace(target)
+    return {"name": asset["name"], "size": size, "sha256": sha256, "digest": f"sha256:{sha256}"}, how
+
+
+@mirror_app.command("sync")
+def mirror_sync(
+    directory: Path = typer.Option(None, "--dir", help="Mirror directory (default: <cache dir>/mirror)"),
+    upstream: str = typer.Option(None, "--upstream", help="Fetch from another mirror instead of GitHub"),
+    jobs: int = typer.Option(4, "--jobs", min=1, help="Number of assets to download in parallel"),
+):
+    """
+    最新リリースの全テンプレート（spec-kit-template-*）をミラーディレクトリへ取得
+    変更のないアセットは再取得せず、古いリリースのアセットは削除する
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    mirror_dir = _mirror_dir(directory)
+    release = fetch_release_metadata(TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, refresh=True, source=upstream)
+    assets = [asset for asset in release.get("assets", []) if asset["name"].startswith(MIRROR_ASSET_PREFIX)]
+    if not assets:
+        console.print(f"[red]エラー:[/red] リリース {release['tag_name']} にテンプレートがありません")
+        raise typer.Exit(1)
+
+    current = _load_mirror_release(mirror_dir)
+    previous = {a["name"]: a for a in current["assets"]} if current and current["tag_name"] == release["tag_name"] else {}
+    console.print(f"[cyan]リリース {release['tag_name']}[/cyan]: {len(assets)}個のテンプレートを同期します → {mirror_dir}")
+
+    def sync(asset):
+        try:
+            return asset, *sync_mirror_asset(asset, release, mirror_dir, previous)
+        except Exception as e:
+            return asset, None, str(e) or type(e).__name__
+
+    synced = []
+    failed = False
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for asset, info, how in pool.map(sync, assets):
+            if info is None:
+                console.print(f"[red]✗[/red] {asset['name']}: {how}")
+                failed = True
+                continue
+            synced.append(info)
+            console.print(f"[green]✓[/green] {asset['name']} [dim]({how}, {info['size']:,} bytes)[/dim]")
+    if failed:
+        raise typer.Exit(1)
+
+    _write_json_atomic(mirror_dir / "release.json", {
+        "owner": TEMPLATE_REPO_OWNER,
+        "repo": TEMPLATE_REPO_NAME,
+        "tag_name": release["tag_name"],
+        "synced_at": time.time(),
+        "assets": synced,
+    })
+    # 古いリリースのアセットを削除
+    assets_dir = mirror_dir / "assets"
+    for old in assets_dir.iterdir():
+        if old.name != release["tag_name"] and old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+    console.print("[bold green]同期が完了しました[/bold green]")
+
+
+@mirror_app.command("serve")
+def mirror_serve(
+    directory: Path = typer.Option(None, "--dir", help="Mirror directory (default: <cache dir>/mirror)"),
+    host: str = typer.Option("127.0.0.1", "--host", help="Address to listen on (use 0.0.0.0 to serve the LAN)"),
+    port: int = typer.Option(DEFAULT_MIRROR_PORT, "--port", help="Port to listen on"),
+    quiet: bool = typer.Option(False, "--quiet", help="Do not log requests"),
+):
+    """
+    同期済みのテンプレートをGitHub APIと同じ形式で配信
+    （/repos/{owner}/{repo}/releases/latest と /download/{tag}/{asset}。Range・ETagに対応）
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    mirror_dir = _mirror_dir(directory)
+    if _load_mirror_release(mirror_dir) is None:
+        console.print(f"[red]エラー:[/red] {mirror_dir} に同期済みのテンプレートがありません")
+        console.print("最初に specify mirror sync を実行してください。")
+        raise typer.Exit(1)
+
+    # sync中にserveしていても新しいrelease.jsonを拾えるよう、mtimeが変わったら読み直す
+    state = {"mtime": None, "release": None}
+    state_lock = threading.Lock()
+
+    def current_release() -> dict | None:
+        try:
+            mtime = (mirror_dir / "release.json").stat().st_mtime_ns
+        except OSError:
+            return None
+        with state_lock:
+            if state["mtime"] != mtime:
+                state["release"], state["mtime"] = _load_mirror_release(mirror_dir), mtime
+            return state["release"]
+
+    class MirrorHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            if not quiet:
+                console.print(f"[dim]{self.address_string()} {format % args}[/dim]", highlight=False)
+
+        def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_GET(self):
+            release = current_release()
+            path = self.path.split("?", 1)[0]
+            if release is None:
+                return self._send(503)
+            if path == f"/repos/{release['owner']}/{release['repo']}/releases/latest":
+                etag = f'"{release["tag_name"]}-{release["synced_at"]}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers={"ETag": etag})
+                base = f"http://{self.headers.get('Host') or f'{host}:{port}'}"
+                body = json.dumps({
+                    "tag_name": release["tag_name"],
+                    "assets": [
+                        {
+                            "name": asset["name"],
+                            "size": asset["size"],
+                            "digest": asset["digest"],
+                            "browser_download_url": f"{base}/download/{release['tag_name']}/{asset['name']}",
+                        }
+                        for asset in release["assets"]
+                    ],
+                }).encode()
+                return self._send(200, body, {"ETag": etag, "Content-Type": "application/json"})
+
+            tag, _, name = path.removeprefix("/download/").partition("/")
+            asset = next((a for a in release["assets"] if a["name"] == name), None) if path.startswith("/download/") else None
+            if asset is None or tag != release["tag_name"]:
+                return self._send(404)
+            file_path = mirror_dir / "assets" / tag / name
+            size = asset["size"]
+            start, end = 0, size - 1
+            status = 200
+            headers = {"Accept-Ranges": "bytes", "Content-Type": "application/zip", "ETag": f'"{asset["sha256"]}"'}
+            byte_range = self.headers.get("Range", "")
+            if byte_range.startswith("bytes=") and "," not in byte_range:
+                first, _, last = byte_range[6:].partition("-")
+                try:
+                    start, end = (int(first), int(last) if last else size - 1) if first else (size - int(last), size - 1)
+                except ValueError:
+                    start, end = 0, size - 1
+                else:
+                    if start > end or start >= size:
+                        return self._send(416, headers={"Content-Range": f"bytes */{size}"})
+                    end = min(end, size - 1)
+                    status = 206
+                    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(end - start + 1))
+            self.end_headers()
+            if self.command == "HEAD":
+                return
+            with open(file_path, "rb") as f:
+                # 可能ならsendfileでカーネル内コピー
+                self.wfile.flush()
+                self.connection.sendfile(f, start, end - start + 1)
+
+        do_HEAD = do_GET
+
+    try:
+        server = ThreadingHTTPServer((host, port), MirrorHandler)
+    except OSError as e:
+        console.print(f"[red]エラー:[/red] {host}:{port} で待ち受けできません: {e}")
+        raise typer.Exit(1)
+    release = current_release()
+    url = f"http://{host}:{server.server_address[1]}"
+    console.print(f"[green]✓[/green] リリース {release['tag_name']} のテンプレート{len(release['assets'])}個を配信中: [cyan]{url}[/cyan]")
+    console.print(f"[dim]specify init <PROJECT> --source {url}  または  SPECIFY_TEMPLATE_SOURCE={url}[/dim]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# `specify feature` : scripts/ の機能パス解決（common.sh等）をプロセス内で行うサブコマンド群
+feature_app = typer.Typer(
+    name="feature",
+    help="Resolve and create Spec-Driven Development feature paths (in-process replacement for scripts/*.sh)",
+    add_completion=False,
+)
+app.add_typer(feature_app, name="feature")
+
+FEATURE_BRANCH_PREFIX_DIGITS = 3
+FEATURE_INDEX_VERSION = 1
+
+
+def current_git_branch(git_dir: Path) -> str:
+    """
+    .git/HEAD を直接読んで現在のブランチ名を返す（detached HEADなら "HEAD"）
+    """
+    head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/"):]
+    return "HEAD"
+
+
+def feature_paths(repo_root: Path, branch: str) -> dict:
+    """
+    common.shのget_feature_pathsと同じパス一覧
+    """
+    feature_dir = repo_root / "specs" / branch
+    return {
+        "REPO_ROOT": str(repo_root),
+        "CURRENT_BRANCH": branch,
+        "FEATURE_DIR": str(feature_dir),
+        "FEATURE_SPEC": str(feature_dir / "spec.md"),
+        "IMPL_PLAN": str(feature_dir / "plan.md"),
+        "TASKS": str(feature_dir / "tasks.md"),
+        "RESEARCH": str(feature_dir / "research.md"),
+        "DATA_MODEL": str(feature_dir / "data-model.md"),
+        "QUICKSTART": str(feature_dir / "quickstart.md"),
+        "CONTRACTS_DIR": str(feature_dir / "contracts"),
+    }
+
+
+def _feature_number(name: str) -> int | None:
+    digits = len(name) - len(name.lstrip("0123456789"))
+    return int(name[:digits]) if digits else None
+
+
+def load_feature_index(repo_root: Path, git_dir: Path) -> dict:
+    """
+    specs/ 以下の機能番号とパスの索引を返す（.git/specify/features.json に保存）
+    specs/ のmtimeが保存時と同じなら索引をそのまま使い、変わっていれば1回の走査で作り直す
+    戻り値: {"highest": int, "features": {name: number}}
+    """
+    specs_dir = repo_root / "specs"
+    index_path = git_dir / "specify" / "features.json"
+    try:
+        specs_mtime = specs_dir.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {"highest": 0, "features": {}}
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("version") == FEATURE_INDEX_VERSION and index.get("specs_mtime_ns") == specs_mtime:
+            return index
+    except (OSError, ValueError):
+        pass
+
+    features = {}
+    with os.scandir(specs_dir) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                features[entry.name] = _feature_number(entry.name) or 0
+    index = {
+        "version": FEATURE_INDEX_VERSION,
+        "specs_mtime_ns": specs_mtime,
+        "highest": max(features.values(), default=0),
+        "features": features,
+    }
+    try:
+        _write_json_atomic(index_path, index)
+    except OSError:
+        pass  # 書き込めなくても走査結果はそのまま使う
+    return index
+
+
+def feature_branch_name(number: int, description: str) -> str:
+    """
+    create-new-feature.shと同じ規則でブランチ名を作る（英数字以外は区切り、先頭3語）
+    """
+    slug = "".join(c if c.isascii() and c.isalnum() else "-" for c in description.lower())
+    words = [w for w in slug.split("-") if w][:3]
+    return f"{number:0{FEATURE_BRANCH_PREFIX_DIGITS}d}-{'-'.join(words) or 'feature'}"
+
+
+def _require_git_root() -> tuple[Path, Path]:
+    found = find_git_root()
+    if found is None:
+        console.print("[red]エラー:[/red] gitリポジトリ内で実行してください")
+        raise typer.Exit(1)
+    return found
+
+
+def _require_feature_branch(branch: str) -> None:
+    prefix = branch[:FEATURE_BRANCH_PREFIX_DIGITS]
+    if not (prefix.isdigit() and branch[FEATURE_BRANCH_PREFIX_DIGITS:FEATURE_BRANCH_PREFIX_DIGITS + 1] == "-"):
+        typer.echo(f"エラー: 現在のブランチは機能ブランチではありません。現在のブランチ: {branch}")
+        typer.echo("機能ブランチは次のように命名してください: 001-feature-name")
+        raise typer.Exit(1)
+
+
+@feature_app.command("paths")
+def feature_paths_command(
+    json_output: bool = typer.Option(False, "--json", help="Print the paths as JSON"),
+):
+    """
+    現在の機能ブランチのパスを表示（get-feature-paths.sh相当）
+    """
+    repo_root, git_dir = _require_git_root()
+    branch = current_git_branch(git_dir)
+    _require_feature_branch(branch)
+    paths = feature_paths(repo_root, branch)
+    if json_output:
+        typer.echo(json.dumps(paths, ensure_ascii=False))
+        return
+    typer.echo(f"REPO_ROOT: {paths['REPO_ROOT']}")
+    typer.echo(f"BRANCH: {branch}")
+    for key in ("FEATURE_DIR", "FEATURE_SPEC", "IMPL_PLAN", "TASKS"):
+        typer.echo(f"{key}: {paths[key]}")
+
+
+@feature_app.command("create")
+def feature_create(
+    description: list[str] = typer.Argument(..., help="Feature description"),
+    json_output: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+):
+    """
+    次の番号の機能ブランチとspecディレクトリを作成（create-new-feature.sh相当）
+    """
+    repo_root, git_dir = _require_git_root()
+    specs_dir = repo_root / "specs"
+    specs_dir.mkdir(exist_ok=True)
+    index = load_feature_index(repo_root, git_dir)
+
+    number = index["highest"] + 1
+    branch = feature_branch_name(number, " ".join(description))
+    result = subprocess.run(["git", "checkout", "-b", branch], cwd=repo_root, capture_output=True, text=True)
+    if result.returncode != 0:
+        console.print(f"[red]エラー:[/red] ブランチ {branch} を作成できません: {result.stderr.strip()}")
+        raise typer.Exit(1)
+
+    feature_dir = specs_dir / branch
+    feature_dir.mkdir(parents=True, exist_ok=True)
+    spec_file = feature_dir / "spec.md"
+    template = repo_root / "templates" / "spec-template.md"
+    if template.is_file():
+        shutil.copyfile(template, spec_file)
     else:
-        project_path = Path(project_name).resolve()
-        # 既存ディレクトリがある場合はエラー
-        if project_path.exists():
-            console.print(f"[red]エラー:[/red] ディレクトリ '{project_name}' は既に存在します")
-            raise typer.Exit(1)
+        typer.echo(f"Warning: Template not found at {template}", err=True)
+        spec_file.touch()
+    # 索引を作り直す（作成したディレクトリでspecs/のmtimeが変わっている）
+    load_feature_index(repo_root, git_dir)
+
+    feature_num = f"{number:0{FEATURE_BRANCH_PREFIX_DIGITS}d}"
+    if json_output:
+        typer.echo(json.dumps({"BRANCH_NAME": branch, "SPEC_FILE": str(spec_file), "FEATURE_NUM": feature_num}, ensure_ascii=False))
+    else:
+        typer.echo(f"BRANCH_NAME: {branch}")
+        typer.echo(f"SPEC_FILE: {spec_file}")
+        typer.echo(f"FEATURE_NUM: {feature_num}")
 
-    console.print(Panel.fit(
-        "[bold cyan]Specifyプロジェクトセットアップ[/bold cyan]\n"
-        f"{'カレントディレクトリで初期化:' if here else '新規プロジェクト作成:'} [green]{project_path.name}[/green]"
-        + (f"\n[dim]パス: {project_path}[/dim]" if here else ""),
-        border_style="cyan"
-    ))
 
+@feature_app.command("setup-plan")
+def feature_setup_plan(
+    json_output: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+):
+    """
+    現在の機能ブランチに実装計画テンプレートを配置（setup-plan.sh相当）
+    """
+    repo_root, git_dir = _require_git_root()
+    branch = current_git_branch(git_dir)
+    _require_feature_branch(branch)
+    paths = feature_paths(repo_root, branch)
+    Path(paths["FEATURE_DIR"]).mkdir(parents=True, exist_ok=True)
+    template = repo_root / "templates" / "plan-template.md"
+    if template.is_file():
+        shutil.copyfile(template, paths["IMPL_PLAN"])
+    if json_output:
+        typer.echo(json.dumps({
+            "FEATURE_SPEC": paths["FEATURE_SPEC"],
+            "IMPL_PLAN": paths["IMPL_PLAN"],
+            "SPECS_DIR": paths["FEATURE_DIR"],
+            "BRANCH": branch,
+        }, ensure_ascii=False))
+    else:
+        typer.echo(f"FEATURE_SPEC: {paths['FEATURE_SPEC']}")
+        typer.echo(f"IMPL_PLAN: {paths['IMPL_PLAN']}")
+        typer.echo(f"SPECS_DIR: {paths['FEATURE_DIR']}")
+        typer.echo(f"BRANCH: {branch}")
 
-    # gitが必要な場合のみチェック
-    git_available = True
-    if not no_git:
-        git_available = check_tool("git", "https://git-scm.com/downloads")
-        if not git_available:
-            console.print("[yellow]gitが見つかりません - リポジトリ初期化をスキップします[/yellow]")
 
+@feature_app.command("check-prerequisites")
+def feature_check_prerequisites(
+    json_output: bool = typer.Option(False, "--json", help="Print the result as JSON"),
+):
+    """
+    実装計画の存在を確認し、利用可能な設計ドキュメントを表示（check-task-prerequisites.sh相当）
+    """
+    repo_root, git_dir = _require_git_root()
+    branch = current_git_branch(git_dir)
+    _require_feature_branch(branch)
+    paths = feature_paths(repo_root, branch)
+    feature_dir = Path(paths["FEATURE_DIR"])
+    if not feature_dir.is_dir():
+        typer.echo(f"エラー: 機能ディレクトリが見つかりません: {feature_dir}")
+        typer.echo("最初に /specify を実行して、機能構造を作成してください。")
+        raise typer.Exit(1)
+    if not Path(paths["IMPL_PLAN"]).is_file():
+        typer.echo(f"エラー: {feature_dir} に plan.md が見つかりません")
+        typer.echo("最初に /plan を実行して計画を作成してください。")
+        raise typer.Exit(1)
 
-    # AIアシスタント選択
-    if ai_assistant:
-        if ai_assistant not in AI_CHOICES:
-            console.print(f"[red]エラー:[/red] 無効なAIアシスタント '{ai_assistant}'。選択肢: {', '.join(AI_CHOICES.keys())}")
-            raise typer.Exit(1)
-        selected_ai = ai_assistant
+    contracts = Path(paths["CONTRACTS_DIR"])
+    docs = {
+        "research.md": Path(paths["RESEARCH"]).is_file(),
+        "data-model.md": Path(paths["DATA_MODEL"]).is_file(),
+        "contracts/": contracts.is_dir() and any(contracts.iterdir()),
+        "quickstart.md": Path(paths["QUICKSTART"]).is_file(),
+    }
+    if json_output:
+        typer.echo(json.dumps({"FEATURE_DIR": str(feature_dir), "AVAILABLE_DOCS": [d for d, ok in docs.items() if ok]}, ensure_ascii=False))
     else:
-        # 矢印キー選択UI
-        selected_ai = select_with_arrows(
-            AI_CHOICES,
-            "AIアシスタントを選択:",
-            "copilot"
+        typer.echo(f"FEATURE_DIR:{feature_dir}")
+        typer.echo("AVAILABLE_DOCS:")
+        for doc, ok in docs.items():
+            typer.echo(f"  {'✓' if ok else '✗'} {doc}")
+
+
+@feature_app.command("list")
+def feature_list(
+    json_output: bool = typer.Option(False, "--json", help="Print the features as JSON"),
+):
+    """
+    specs/ 以下の機能を番号順に表示
+    """
+    repo_root, git_dir = _require_git_root()
+    index = load_feature_index(repo_root, git_dir)
+    features = sorted(index["features"].items(), key=lambda item: (item[1], item[0]))
+    if json_output:
+        typer.echo(json.dumps({
+            "highest": index["highest"],
+            "features": [{"name": name, "number": number, "path": str(repo_root / "specs" / name)} for name, number in features],
+        }, ensure_ascii=False))
+        return
+    for name, number in features:
+        typer.echo(name)
+
+
+# specs/ 以下のドキュメント索引（.git/specify/docs.json）と `specify status`
+DOC_INDEX_VERSION = 2
+FEATURE_DOCS = ["spec.md", "plan.md", "research.md", "data-model.md", "quickstart.md", "tasks.md"]
+TASK_CHECKBOX = re.compile(r"^\s*- \[([ xX])\]", re.MULTILINE)
+
+
+def _scan_markdown(text: str) -> tuple[list[tuple[int, str]], list[int]]:
+    """
+    Markdownの見出しと、残っているNEEDS CLARIFICATIONの位置を抽出
+    コードブロック内（実行フロー等の説明文）とチェックリスト項目は数えない
+    戻り値: ([(行番号, 見出し行)], [NEEDS CLARIFICATIONのある行番号（出現回数分）])
+    """
+    in_code = False
+    headings = []
+    clarifications = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if line.startswith("```"):
+            in_code = not in_code
+        elif in_code:
+            continue
+        elif line.startswith("#"):
+            headings.append((lineno, line.strip()))
+        elif not TASK_CHECKBOX.match(line):
+            clarifications += [lineno] * line.count("NEEDS CLARIFICATION")
+    return headings, clarifications
+
+
+def _index_document(path: str, st: os.stat_result) -> dict:
+    """
+    1ファイル分の索引エントリを作る
+    Markdownは見出し・残っているNEEDS CLARIFICATIONの数・タスク数も抽出する
+    タスクは `specify tasks plan` と同じくT番号付きの行だけを数える（検証チェックリスト等のチェックボックスは除く）
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": hashlib.sha256(data).hexdigest()}
+    if path.endswith(".md"):
+        text = data.decode("utf-8", errors="replace")
+        headings, clarifications = _scan_markdown(text)
+        tasks = parse_tasks(text)[0]
+        entry.update(
+            headings=[heading for _, heading in headings],
+            clarifications=len(clarifications),
+            tasks_total=len(tasks),
+            tasks_done=sum(1 for task in tasks.values() if task["done"]),
         )
+    return entry
 
 
-    # AIエージェントツールの有無を確認（--ignore-agent-toolsでスキップ可）
-    if not ignore_agent_tools:
-        agent_tool_missing = False
-        if selected_ai == "claude":
-            if not check_tool("claude", "https://docs.anthropic.com/en/docs/claude-code/setup からインストール"):
-                console.print("[red]エラー:[/red] Claude CLIが必要です")
-                agent_tool_missing = True
-        elif selected_ai == "gemini":
-            if not check_tool("gemini", "https://github.com/google-gemini/gemini-cli からインストール"):
-                console.print("[red]エラー:[/red] Gemini CLIが必要です")
-                agent_tool_missing = True
-        # Copilotは通常IDEに同梱のためチェック不要
-
-        if agent_tool_missing:
-            console.print("\n[red]必要なAIツールが見つかりません！[/red]")
-            console.print("[yellow]ヒント:[/yellow] --ignore-agent-tools でこのチェックをスキップできます")
-            raise typer.Exit(1)
+def load_document_index(repo_root: Path, git_dir: Path) -> dict:
+    """
+    specs/ 以下の全ファイルの索引を返す（.git/specify/docs.json に保存）
+    stat結果（mtime・サイズ）が保存時と同じファイルは読み直さず、変わったファイルだけ再解析する
+    戻り値: {"specs/からの相対パス": {mtime_ns, size, sha256, headings, clarifications, ...}}
+    """
+    index_path = git_dir / "specify" / "docs.json"
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        cached = index["files"] if index.get("version") == DOC_INDEX_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        cached = {}
+
+    files = {}
+    changed = False
+    stack = [(str(repo_root / "specs"), "")]
+    while stack:
+        directory, prefix = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((entry.path, rel + "/"))
+                    continue
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+                previous = cached.get(rel)
+                if previous and previous["mtime_ns"] == st.st_mtime_ns and previous["size"] == st.st_size:
+                    files[rel] = previous
+                else:
+                    files[rel] = _index_document(entry.path, st)
+                    changed = True
+    if changed or files.keys() != cached.keys():
+        try:
+            _write_json_atomic(index_path, {"version": DOC_INDEX_VERSION, "files": files})
+        except OSError:
+            pass  # 書き込めなくても走査結果はそのまま使う
+    return files
 
-    # Download and set up project
-    # New tree-based progress (no emojis); include earlier substeps
-    tracker = StepTracker("Initialize Specify Project")
-    # Flag to allow suppressing legacy headings
-    sys._specify_tracker_active = True
-    # Pre steps recorded as completed before live rendering
-    tracker.add("precheck", "Check required tools")
-    tracker.complete("precheck", "ok")
-    tracker.add("ai-select", "AIアシスタント選択")
-    tracker.complete("ai-select", f"{selected_ai}")
-    for key, label in [
-        ("fetch", "リリース情報取得"),
-        ("download", "テンプレートDL"),
-        ("extract", "テンプレート展開"),
-        ("zip-list", "アーカイブ内容"),
-        ("extracted-summary", "展開サマリ"),
-        ("cleanup", "一時ファイル削除"),
-        ("git", "git初期化"),
-        ("final", "完了")
-    ]:
-        tracker.add(key, label)
 
+def feature_status(files: dict) -> list[dict]:
+    """
+    ドキュメント索引を機能ごとに集計（機能番号順）
+    """
+    features = {}
+    for rel, entry in files.items():
+        name, sep, doc = rel.partition("/")
+        if not sep:
+            continue
+        feature = features.setdefault(name, {
+            "name": name,
+            "number": _feature_number(name),
+            "docs": {d: False for d in FEATURE_DOCS},
+            "contracts": 0,
+            "clarifications": 0,
+            "tasks_total": 0,
+            "tasks_done": 0,
+        })
+        if doc in feature["docs"]:
+            feature["docs"][doc] = True
+        elif doc.startswith("contracts/"):
+            feature["contracts"] += 1
+        feature["clarifications"] += entry.get("clarifications", 0)
+        if doc == "tasks.md":
+            feature["tasks_total"] = entry["tasks_total"]
+            feature["tasks_done"] = entry["tasks_done"]
+    for feature in features.values():
+        docs = feature["docs"]
+        if docs["tasks.md"]:
+            stage = "done" if feature["tasks_total"] and feature["tasks_done"] == feature["tasks_total"] else "tasks"
+        elif docs["plan.md"]:
+            stage = "plan"
+        elif docs["spec.md"]:
+            stage = "spec"
+        else:
+            stage = "empty"
+        feature["stage"] = stage
+    return sorted(features.values(), key=lambda f: (f["number"] or 0, f["name"]))
 
-    # Liveツリーはtransientで最後に静的ツリーへ置換
-    with Live(tracker.render(), console=console, refresh_per_second=8, transient=True) as live:
-        tracker.attach_refresh(lambda: live.update(tracker.render()))
-        try:
-            download_and_extract_template(project_path, selected_ai, here, verbose=False, tracker=tracker)
 
-            # gitステップ
-            if not no_git:
-                tracker.start("git")
-                if is_git_repo(project_path):
-                    tracker.complete("git", "既存リポジトリ検出")
-                elif git_available:
-                    if init_git_repo(project_path, quiet=True):
-                        tracker.complete("git", "初期化完了")
-                    else:
-                        tracker.error("git", "初期化失敗")
-                else:
-                    tracker.skip("git", "git未インストール")
-            else:
-                tracker.skip("git", "--no-git指定")
+@app.command()
+def status(
+    features: list[str] = typer.Argument(None, help="Only show these features (default: all)"),
+    json_output: bool = typer.Option(False, "--json", help="Print the status as JSON"),
+):
+    """
+    specs/ 以下の全機能のドキュメントの揃い具合を一覧表示
+    """
+    repo_root, git_dir = _require_git_root()
+    rows = feature_status(load_document_index(repo_root, git_dir))
+    if features:
+        rows = [row for row in rows if row["name"] in features]
+    if json_output:
+        typer.echo(json.dumps({"features": rows}, ensure_ascii=False))
+        return
+    if not rows:
+        console.print("[yellow]specs/ に機能がありません[/yellow]")
+        return
+
+    # 数百機能でも速く表示できるよう、rich.Tableを使わず固定幅の行を組み立てる
+    stage_styles = {"done": "green", "tasks": "cyan", "plan": "blue", "spec": "yellow", "empty": "bright_black"}
+    doc_labels = ("spec", "plan", "res", "model", "quick", "tasks")
+    width = max(len(row["name"]) for row in rows)
+    lines = [
+        f"[bold]{'機能'.ljust(width - 2)}  {'段階':<4}  " + " ".join(f"{label:^5}" for label in doc_labels)
+        + f" {'api':>4} {'タスク':>5} {'要確認':>3}[/bold]"
+    ]
+    for row in rows:
+        style = stage_styles[row["stage"]]
+        docs = " ".join(("[green]  ✓  [/green]" if row["docs"][doc] else "[bright_black]  -  [/bright_black]") for doc in FEATURE_DOCS)
+        contracts = f"{row['contracts']:>4}" if row["contracts"] else f"[bright_black]{'-':>4}[/bright_black]"
+        tasks = f"{row['tasks_done']}/{row['tasks_total']}" if row["docs"]["tasks.md"] else "-"
+        clarifications = f"[red]{row['clarifications']:>6}[/red]" if row["clarifications"] else f"[bright_black]{0:>6}[/bright_black]"
+        lines.append(f"{row['name']:<{width}}  [{style}]{row['stage']:<5}[/{style}] {docs} {contracts} {tasks:>8} {clarifications}")
+    console.print("\n".join(lines), highlight=False, soft_wrap=True)
+
+
+# `specify tasks` : tasks.md の依存関係グラフと並行実行ウェーブ
+tasks_app = typer.Typer(
+    name="tasks",
+    help="Analyse tasks.md: dependency graph, [P] conflicts and parallel execution waves",
+    add_completion=False,
+)
+app.add_typer(tasks_app, name="tasks")
 
-            tracker.complete("final", "プロジェクト準備完了")
-        except Exception as e:
-            tracker.error("final", str(e))
-            if not here and project_path.exists():
-                shutil.rmtree(project_path)
-            raise typer.Exit(1)
-        finally:
-            pass
+TASK_LINE = re.compile(r"^\s*- \[([ xX])\]\s+(T\d+)\s*(\[P\])?\s*(.*)$")
+TASK_ID = re.compile(r"T\d+")
+TASK_RANGE = re.compile(r"(T\d+)\s*-\s*(T\d+)")
+FILE_TOKEN = re.compile(r"^(?:[\w.-]+/)*[\w-][\w.-]*\.[A-Za-z][\w]*$")
 
-    # 静的ツリー表示
-    console.print(tracker.render())
-    console.print("\n[bold green]プロジェクトの準備ができました[/bold green]")
 
-    # 次のステップ案内
-    steps_lines = []
-    if not here:
-        steps_lines.append(f"1. [bold green]cd {project_name}[/bold green]")
-        step_num = 2
+def _task_files(description: str) -> list[str]:
+    """
+    タスク説明からファイルパスらしいトークンを抜き出す（/api/users のようなエンドポイントは除く）
+    """
+    files = []
+    for token in description.split():
+        token = token.strip("`'\"()[]{},:;")
+        if token and not token.startswith("/") and FILE_TOKEN.match(token) and token not in files:
+            files.append(token)
+    return files
+
+
+def _expand_task_ids(text: str, known: dict) -> list[str]:
+    """
+    "T004-T007" のような範囲を含むテキストからタスクIDを列挙（範囲のうち存在しないIDは除く）
+    """
+    ids = []
+    for start, end in TASK_RANGE.findall(text):
+        ids += [task_id for n in range(int(start[1:]), int(end[1:]) + 1) if (task_id := f"T{n:0{len(start) - 1}d}") in known]
+    ids += TASK_ID.findall(TASK_RANGE.sub("", text))
+    return list(dict.fromkeys(ids))
+
+
+def parse_tasks(text: str) -> tuple[dict, list[tuple[str, str, str]], list[str]]:
+    """
+    tasks.md を解析
+    戻り値: (タスクID→タスク, 依存関係セクションの辺 (前, 後, 元の行), 警告)
+    """
+    tasks = {}
+    rules = []
+    warnings = []
+    phase = ""
+    in_code = False
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if line.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        if line.startswith("## "):
+            phase = line[3:].strip()
+            continue
+        match = TASK_LINE.match(line)
+        if match:
+            done, task_id, parallel, description = match.groups()
+            if task_id in tasks:
+                warnings.append(f"{task_id} が重複しています")
+                continue
+            tasks[task_id] = {
+                "id": task_id,
+                "done": done != " ",
+                "parallel": bool(parallel),
+                "description": description.strip(),
+                "phase": phase,
+                "files": _task_files(description),
+                "deps": [],
+                "line": lineno,
+            }
+        elif line.lstrip().startswith("- ") and ("依存関係" in phase or "Dependencies" in phase):
+            rules.append(line.strip()[2:])
+
+    edges = []
+    for rule in rules:
+        # "T008 が T009, T015 をブロック" / "T008 blocks T009, T015"
+        # "実装 (T008-T014) 前にテスト (T004-T007)" / "Tests (T004-T007) before implementation (T008-T014)"
+        if "をブロック" in rule:
+            head, _, tail = rule.replace("をブロック", "").partition("が")
+            befores, afters = head, tail
+        elif " blocks " in rule:
+            befores, _, afters = rule.partition(" blocks ")
+        elif "前に" in rule:
+            afters, _, befores = rule.partition("前に")
+        elif " before " in rule:
+            befores, _, afters = rule.partition(" before ")
+        else:
+            continue
+        befores, afters = _expand_task_ids(befores, tasks), _expand_task_ids(afters, tasks)
+        for before in befores:
+            for after in afters:
+                if before not in tasks or after not in tasks:
+                    warnings.append(f"依存関係に未定義のタスク {before if before not in tasks else after} があります: {rule}")
+                    continue
+                edges.append((before, after, rule))
+    return tasks, edges, warnings
+
+
+def plan_tasks(tasks: dict, edges: list[tuple[str, str, str]], workers: int | None = None) -> dict:
+    """
+    タスクの依存関係グラフを作り、ウェーブ（同時に実行できるタスクの組）とクリティカルパスを求める
+
+    暗黙の依存関係（テンプレートの規則）:
+    - フェーズは順番に実行する（前のフェーズの全タスクが終わってから次へ）
+    - フェーズ内で [P] のないタスクは順次実行、連続する [P] タスクは直前の順次タスクの後に並行実行
+    - 同じファイルを扱うタスクは記載順に実行
+    """
+    order = list(tasks)
+    deps = {task_id: set() for task_id in order}
+    warnings = []
+
+    previous_phase = []
+    current_phase = []
+    last_serial = None
+    since_serial = []
+    phase = None
+    for task_id in order:
+        task = tasks[task_id]
+        if task["phase"] != phase:
+            phase = task["phase"]
+            previous_phase, current_phase = current_phase or previous_phase, []
+            last_serial, since_serial = None, []
+        if task["parallel"]:
+            deps[task_id].update([last_serial] if last_serial else previous_phase)
+        else:
+            deps[task_id].update(since_serial or ([last_serial] if last_serial else previous_phase))
+            last_serial, since_serial = task_id, []
+        since_serial.append(task_id)
+        current_phase.append(task_id)
+
+    # [P] タスク同士のファイル競合を検出し、記載順に直列化する
+    owners = {}
+    for task_id in order:
+        task = tasks[task_id]
+        if task["parallel"] and not task["files"]:
+            warnings.append(f"{task_id} [P] にファイルパスがありません")
+        for path in task["files"]:
+            for other in owners.get(path, []):
+                if task["parallel"] and tasks[other]["parallel"] and tasks[other]["phase"] == task["phase"]:
+                    warnings.append(f"{other} と {task_id} は [P] ですが同じファイル {path} を変更します")
+                deps[task_id].add(other)
+            owners.setdefault(path, []).append(task_id)
+
+    for before, after, _ in edges:
+        deps[after].add(before)
+
+    # トポロジカル順にレベル（最長パス長）を計算
+    remaining = {task_id: len(deps[task_id]) for task_id in order}
+    dependents = {task_id: [] for task_id in order}
+    for task_id, parents in deps.items():
+        for parent in parents:
+            dependents[parent].append(task_id)
+    ready = [task_id for task_id in order if not remaining[task_id]]
+    level = {task_id: 0 for task_id in ready}
+    longest = {task_id: None for task_id in ready}
+    visited = []
+    while ready:
+        task_id = ready.pop()
+        visited.append(task_id)
+        for child in dependents[task_id]:
+            if level.get(child, -1) < level[task_id] + 1:
+                level[child] = level[task_id] + 1
+                longest[child] = task_id
+            remaining[child] -= 1
+            if not remaining[child]:
+                ready.append(child)
+    cycle = [task_id for task_id in order if remaining[task_id]]
+    if cycle:
+        return {"tasks": tasks, "deps": deps, "cycle": cycle, "waves": [], "critical_path": [], "max_width": 0, "warnings": warnings}
+
+    # 完了済みタスクを除いてウェーブを作る（残りのタスクの中での最長パス）
+    pending_level = {}
+    for task_id in sorted(visited, key=lambda t: level[t]):
+        if tasks[task_id]["done"]:
+            continue
+        pending_level[task_id] = max((pending_level[p] + 1 for p in deps[task_id] if p in pending_level), default=0)
+    waves = []
+    for task_id in order:
+        if task_id in pending_level:
+            while len(waves) <= pending_level[task_id]:
+                waves.append([])
+            waves[pending_level[task_id]].append(task_id)
+    if workers:
+        waves = [wave[i:i + workers] for wave in waves for i in range(0, len(wave), workers)]
+
+    end = max(order, key=lambda t: level[t], default=None)
+    critical_path = []
+    while end is not None:
+        critical_path.append(end)
+        end = longest[end]
+    return {
+        "tasks": tasks,
+        "deps": deps,
+        "cycle": [],
+        "waves": waves,
+        "critical_path": critical_path[::-1],
+        "max_width": max((len(wave) for wave in waves), default=0),
+        "warnings": warnings,
+    }
+
+
+@tasks_app.command("plan")
+def tasks_plan(
+    tasks_file: Path = typer.Argument(None, help="tasks.md to analyse (default: the current feature's tasks.md)"),
+    workers: int = typer.Option(None, "--workers", "-w", min=1, help="Split waves so that no wave has more than N tasks"),
+    json_output: bool = typer.Option(False, "--json", help="Print the graph and waves as JSON"),
+    strict: bool = typer.Option(False, "--strict", help="Exit with an error when [P] conflicts or other warnings are found"),
+):
+    """
+    tasks.md を依存関係グラフに変換し、並行実行できるウェーブとクリティカルパスを表示
+    """
+    if tasks_file is None:
+        repo_root, git_dir = _require_git_root()
+        branch = current_git_branch(git_dir)
+        _require_feature_branch(branch)
+        tasks_file = Path(feature_paths(repo_root, branch)["TASKS"])
+    if not tasks_file.is_file():
+        console.print(f"[red]エラー:[/red] tasks.md が見つかりません: {tasks_file}")
+        console.print("最初に /tasks を実行してタスクを作成してください。")
+        raise typer.Exit(1)
+
+    tasks, edges, warnings = parse_tasks(tasks_file.read_text(encoding="utf-8"))
+    result = plan_tasks(tasks, edges, workers)
+    warnings += result["warnings"]
+    if json_output:
+        typer.echo(json.dumps({
+            "tasks": [{**task, "deps": sorted(result["deps"][task_id])} for task_id, task in tasks.items()],
+            "waves": result["waves"],
+            "critical_path": result["critical_path"],
+            "max_width": result["max_width"],
+            "cycle": result["cycle"],
+            "warnings": warnings,
+        }, ensure_ascii=False))
     else:
-        steps_lines.append("1. 既にプロジェクトディレクトリ内です！")
-        step_num = 2
+        for warning in warnings:
+            console.print(f"[yellow]警告:[/yellow] {warning}")
+        if result["cycle"]:
+            console.print(f"[red]エラー:[/red] 依存関係が循環しています: {', '.join(result['cycle'])}")
+        else:
+            done = sum(1 for task in tasks.values() if task["done"])
+            console.print(
+                f"[cyan]タスク[/cyan] {len(tasks)}件（完了 {done}） / [cyan]ウェーブ[/cyan] {len(result['waves'])} / "
+                f"[cyan]最大並列幅[/cyan] {result['max_width']} / [cyan]クリティカルパス[/cyan] {len(result['critical_path'])}"
+            )
+            console.print(f"[dim]{' → '.join(result['critical_path'])}[/dim]", highlight=False)
+            for number, wave in enumerate(result["waves"], 1):
+                console.print(f"\n[bold]ウェーブ {number}[/bold]")
+                for task_id in wave:
+                    marker = " [P]" if tasks[task_id]["parallel"] else ""
+                    console.print(f"  {task_id}{marker} {tasks[task_id]['description']}", markup=False, highlight=False)
+    if result["cycle"] or (strict and warnings):
+        raise typer.Exit(1)
 
-    if selected_ai == "claude":
-        steps_lines.append(f"{step_num}. Open in Visual Studio Code and start using / commands with Claude Code")
-        steps_lines.append("   - Type / in any file to see available commands")
-        steps_lines.append("   - Use /specify to create specifications")
-        steps_lines.append("   - Use /plan to create implementation plans")
-        steps_lines.append("   - Use /tasks to generate tasks")
-    elif selected_ai == "gemini":
-        steps_lines.append(f"{step_num}. Gemini CLIで / コマンドを使う")
-        steps_lines.append("   - gemini /specify で仕様作成")
-        steps_lines.append("   - gemini /plan で計画作成")
-        steps_lines.append("   - 詳細は GEMINI.md を参照")
-    elif selected_ai == "copilot":
-        steps_lines.append(f"{step_num}. VS Codeで [bold cyan]/specify[/], [bold cyan]/plan[/], [bold cyan]/tasks[/] コマンドをGitHub Copilotで使う")
 
-    step_num += 1
-    steps_lines.append(f"{step_num}. [bold magenta]CONSTITUTION.md[/bold magenta] にプロジェクトの原則を記載")
+# `specify lint` : spec/plan/tasks のテンプレートのゲートを決定的にチェック
+LINT_CACHE_VERSION = 1
+LINT_RULES = {
+    "needs-clarification": ("error", "NEEDS CLARIFICATION marker left in the document"),
+    "missing-section": ("error", "Mandatory spec section is missing"),
+    "unfilled-context": ("warning", "Technical context field in plan.md is not filled in"),
+    "contract-without-test": ("error", "Contract has no test task in tasks.md"),
+    "entity-without-model": ("error", "Data model entity has no task in tasks.md"),
+    "task-conflict": ("warning", "Problem with [P] tasks or task dependencies"),
+    "dependency-cycle": ("error", "Task dependencies contain a cycle"),
+}
+# spec-template.md の *(必須)* セクション（日本語・英語の見出し）
+SPEC_MANDATORY_SECTIONS = [
+    ("ユーザーシナリオ & テスト", "User Scenarios & Testing"),
+    ("要件", "Requirements"),
+]
+LINTED_DOCS = ("spec.md", "plan.md", "tasks.md", "data-model.md")
 
-    steps_panel = Panel("\n".join(steps_lines), title="次のステップ", border_style="cyan", padding=(1,2))
-    console.print()
-    console.print(steps_panel)
 
-    # Removed farewell line per user request
+def build_lint_model(path: str) -> dict:
+    """
+    1ファイル分の構造モデルを作る（プロセスプールから呼ばれるためモジュールレベルに置く）
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    headings, clarifications = _scan_markdown(text)
+    model = {"headings": headings, "clarifications": clarifications}
+    name = os.path.basename(path)
+    if name == "plan.md":
+        model["context"] = parse_plan(text)
+    elif name == "tasks.md":
+        tasks, edges, warnings = parse_tasks(text)
+        model.update(tasks=tasks, edges=edges, warnings=warnings)
+    return model
+
+
+def load_lint_models(repo_root: Path, git_dir: Path, files: dict, jobs: int) -> dict:
+    """
+    lint対象ファイルの構造モデルを返す（specs/からの相対パス→モデル）
+    モデルは .git/specify/lint.json にファイルのsha256をキーとして保存し、内容が変わったファイルだけ解析する
+    解析するファイルが多い場合はプロセスプールで並列に処理する
+    """
+    cache_path = git_dir / "specify" / "lint.json"
+    try:
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        cached = cache["models"] if cache.get("version") == LINT_CACHE_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        cached = {}
+
+    targets = {rel: entry["sha256"] for rel, entry in files.items() if rel.rpartition("/")[2] in LINTED_DOCS}
+    missing = sorted({sha: rel for rel, sha in targets.items() if sha not in cached}.items())
+    parsed = {}
+    if missing:
+        paths = [str(repo_root / "specs" / rel) for _, rel in missing]
+        if jobs > 1 and len(paths) >= 64:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                models = list(pool.map(build_lint_model, paths, chunksize=max(1, len(paths) // (jobs * 4))))
+        else:
+            models = [build_lint_model(path) for path in paths]
+        # JSONへの往復と同じ形（タプル→リスト）にそろえる
+        parsed = json.loads(json.dumps({sha: model for (sha, _), model in zip(missing, models)}))
+
+    models = {sha: cached.get(sha) or parsed[sha] for sha in set(targets.values())}
+    if parsed or models.keys() != cached.keys():
+        try:
+            _write_json_atomic(cache_path, {"version": LINT_CACHE_VERSION, "models": models})
+        except OSError:
+            pass
+    return {rel: models[sha] for rel, sha in targets.items()}
+
+
+def lint_feature(name: str, contracts: list[str], models: dict) -> list[dict]:
+    """
+    1機能分のゲートを評価して指摘の一覧を返す
+    contracts: contracts/ 以下のファイル（機能ディレクトリからの相対パス）
+    """
+    findings = []
+
+    def report(rule: str, doc: str, line: int, message: str) -> None:
+        findings.append({"rule": rule, "level": LINT_RULES[rule][0], "path": f"specs/{name}/{doc}", "line": line, "message": message})
+
+    def model(doc: str) -> dict | None:
+        return models.get(f"{name}/{doc}")
+
+    for doc in LINTED_DOCS:
+        if model(doc):
+            for line in model(doc)["clarifications"]:
+                report("needs-clarification", doc, line, "NEEDS CLARIFICATION が残っています")
+
+    spec = model("spec.md")
+    if spec:
+        titles = [heading.lstrip("#").strip() for _, heading in spec["headings"]]
+        for names in SPEC_MANDATORY_SECTIONS:
+            if not any(title.startswith(names) for title in titles):
+                report("missing-section", "spec.md", 1, f"必須セクション「{names[0]}」がありません")
+
+    plan = model("plan.md")
+    if plan:
+        line = next((lineno for lineno, heading in plan["headings"] if "技術的コンテキスト" in heading or "Technical Context" in heading), 1)
+        for field in ("language", "framework", "testing"):
+            if not plan["context"][field]:
+                report("unfilled-context", "plan.md", line, f"{PLAN_FIELDS[field][0]} が未記入です")
+
+    tasks = model("tasks.md")
+    if not tasks:
+        return findings
+    descriptions = [task["description"].lower() for task in tasks["tasks"].values()]
+
+    test_descriptions = [text for text in descriptions if "test" in text or "テスト" in text]
+    for contract in contracts:
+        filename = contract.rpartition("/")[2].lower()
+        stem = filename.rpartition(".")[0] or filename
+        variants = {stem, stem.replace("-", "_"), stem.replace("_", "-")}
+        if not any(v in text for text in test_descriptions for v in variants):
+            report("contract-without-test", "tasks.md", 1, f"コントラクト {contract} のテストタスクがありません")
+
+    data_model = model("data-model.md")
+    if data_model:
+        headings = [(lineno, heading) for lineno, heading in data_model["headings"] if heading.startswith("### ")]
+        if not headings:
+            headings = [(lineno, heading) for lineno, heading in data_model["headings"] if heading.startswith("## ")]
+        for _, heading in headings:
+            entity = re.split(r"[(:（：]", heading.lstrip("#").strip())[0].strip().strip("`*")
+            variants = {entity.lower(), entity.lower().replace(" ", "_"), entity.lower().replace(" ", "")}
+            if entity and not any(any(v in text for v in variants) for text in descriptions):
+                report("entity-without-model", "tasks.md", 1, f"エンティティ {entity} のモデルタスクがありません")
+
+    result = plan_tasks(tasks["tasks"], [tuple(edge) for edge in tasks["edges"]])
+    for warning in tasks["warnings"] + result["warnings"]:
+        task_id = next(iter(TASK_ID.findall(warning)), None)
+        report("task-conflict", "tasks.md", tasks["tasks"][task_id]["line"] if task_id in tasks["tasks"] else 1, warning)
+    if result["cycle"]:
+        first = result["cycle"][0]
+        report("dependency-cycle", "tasks.md", tasks["tasks"][first]["line"], f"依存関係が循環しています: {', '.join(result['cycle'])}")
+    return findings
+
+
+def lint_sarif(findings: list[dict]) -> dict:
+    """
+    指摘をSARIF 2.1.0形式に変換
+    """
+    return {
+        "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {
+                "name": "specify lint",
+                "version": get_version(),
+                "rules": [
+                    {"id": rule, "shortDescription": {"text": text}, "defaultConfiguration": {"level": level}}
+                    for rule, (level, text) in LINT_RULES.items()
+                ],
+            }},
+            "results": [
+                {
+                    "ruleId": finding["rule"],
+                    "level": finding["level"],
+                    "message": {"text": finding["message"]},
+                    "locations": [{"physicalLocation": {
+                        "artifactLocation": {"uri": finding["path"]},
+                        "region": {"startLine": finding["line"]},
+                    }}],
+                }
+                for finding in findings
+            ],
+        }],
+    }
 
 
 @app.command()
-def check():
+def lint(
+    features: list[str] = typer.Argument(None, help="Only lint these features (default: all features under specs/)"),
+    output_format: str = typer.Option("text", "--format", "-f", help="Output format: text, json or sarif"),
+    jobs: int = typer.Option(os.cpu_count() or 1, "--jobs", min=1, help="Number of processes used to parse changed files"),
+    strict: bool = typer.Option(False, "--strict", help="Also exit with an error when there are warnings"),
+):
     """
-    必要なツールが全て揃っているかチェック
+    spec.md / plan.md / tasks.md のテンプレートのゲートをチェック（NEEDS CLARIFICATION、必須セクション、コントラクトとエンティティのタスク等）
     """
-    show_banner()
-    console.print("[bold]Specify要件をチェック中...[/bold]\n")
+    if output_format not in ("text", "json", "sarif"):
+        console.print(f"[red]エラー:[/red] 不明な出力形式 '{output_format}'。選択肢: text, json, sarif")
+        raise typer.Exit(1)
+    repo_root, git_dir = _require_git_root()
+    files = load_document_index(repo_root, git_dir)
+    models = load_lint_models(repo_root, git_dir, files, jobs)
+    contracts = {}
+    for rel in files:
+        name, sep, doc = rel.partition("/")
+        if sep:
+            contracts.setdefault(name, [])
+            if doc.startswith("contracts/"):
+                contracts[name].append(doc)
+    names = sorted(contracts, key=lambda n: (_feature_number(n) or 0, n))
+    if features:
+        names = [name for name in names if name in features]
+
+    findings = [finding for name in names for finding in lint_feature(name, contracts[name], models)]
+    errors = sum(1 for finding in findings if finding["level"] == "error")
+    if output_format == "json":
+        typer.echo(json.dumps({"features": len(names), "findings": findings}, ensure_ascii=False))
+    elif output_format == "sarif":
+        typer.echo(json.dumps(lint_sarif(findings), ensure_ascii=False))
+    else:
+        from rich.markup import escape
+
+        lines = []
+        for finding in findings:
+            color = "red" if finding["level"] == "error" else "yellow"
+            lines.append(
+                f"{finding['path']}:{finding['line']}: [{color}]{finding['level']}[/{color}] "
+                f"[dim]{finding['rule']}[/dim] {escape(finding['message'])}"
+            )
+        if lines:
+            console.print("\n".join(lines), highlight=False, soft_wrap=True)
+        summary = f"{len(names)}機能 / エラー {errors}件 / 警告 {len(findings) - errors}件"
+        console.print(f"[green]✓[/green] {summary}" if not findings else summary)
+    if errors or (strict and findings):
+        raise typer.Exit(1)
 
-    # インターネット接続確認（GitHub API到達）
-    console.print("[cyan]インターネット接続を確認中...[/cyan]")
+
+# `specify context` : エージェント用コンテキストファイル（CLAUDE.md等）の更新（update-agent-context.sh相当）
+context_app = typer.Typer(
+    name="context",
+    help="Maintain agent context files (CLAUDE.md, GEMINI.md, .github/copilot-instructions.md) from all feature plans",
+    add_completion=False,
+)
+app.add_typer(context_app, name="context")
+
+AGENT_CONTEXT_FILES = {
+    "claude": ("CLAUDE.md", "Claude Code"),
+    "gemini": ("GEMINI.md", "Gemini CLI"),
+    "copilot": (".github/copilot-instructions.md", "GitHub Copilot"),
+}
+
+# plan.md の技術的コンテキスト欄（日本語・英語の見出しの両方に対応）
+PLAN_FIELDS = {
+    "language": ("言語/バージョン", "Language/Version"),
+    "framework": ("主要依存関係", "Primary Dependencies"),
+    "testing": ("テスト", "Testing"),
+    "storage": ("ストレージ", "Storage"),
+    "project_type": ("プロジェクトタイプ", "Project Type"),
+}
+PLAN_CACHE_VERSION = 1
+MANUAL_ADDITIONS_START = "<!-- MANUAL ADDITIONS START -->"
+MANUAL_ADDITIONS_END = "<!-- MANUAL ADDITIONS END -->"
+
+AGENT_FILE_SKELETON = """# [PROJECT NAME] Development Guidelines
+
+Auto-generated from all feature plans. Last updated: [DATE]
+
+## Active Technologies
+[EXTRACTED FROM ALL PLAN.MD FILES]
+
+## Project Structure
+```
+[ACTUAL STRUCTURE FROM PLANS]
+```
+
+## Commands
+[ONLY COMMANDS FOR ACTIVE TECHNOLOGIES]
+
+## Code Style
+[LANGUAGE-SPECIFIC, ONLY FOR LANGUAGES IN USE]
+
+## Recent Changes
+[LAST 3 FEATURES AND WHAT THEY ADDED]
+
+<!-- MANUAL ADDITIONS START -->
+<!-- MANUAL ADDITIONS END -->
+"""
+
+
+def parse_plan(text: str) -> dict:
+    """
+    plan.md から技術的コンテキストを抽出
+    未記入（[...]のプレースホルダー）・NEEDS CLARIFICATION・N/A の値は空文字にする
+    """
+    labels = {f"**{label}**:": field for field, names in PLAN_FIELDS.items() for label in names}
+    result = {field: "" for field in PLAN_FIELDS}
+    for line in text.splitlines():
+        if not line.startswith("**"):
+            continue
+        for label, field in labels.items():
+            if line.startswith(label) and not result[field]:
+                value = line[len(label):].strip()
+                if value and not value.startswith("[") and "NEEDS CLARIFICATION" not in value and value != "N/A":
+                    result[field] = value
+    return result
+
+
+def load_plans(repo_root: Path, git_dir: Path) -> list[dict]:
+    """
+    specs/*/plan.md をすべて解析して機能番号順に返す
+    解析結果は .git/specify/plans.json にmtimeとサイズ付きで保存し、変更されたplan.mdだけ読み直す
+    """
+    cache_path = git_dir / "specify" / "plans.json"
     try:
-        response = httpx.get("https://api.github.com", timeout=5, follow_redirects=True)
-        console.print("[green]✓[/green] インターネット接続OK")
-    except httpx.RequestError:
-        console.print("[red]✗[/red] インターネット未接続 - テンプレートDLに必須")
-        console.print("[yellow]ネットワーク設定を確認してください[/yellow]")
+        cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        if cache.get("version") != PLAN_CACHE_VERSION:
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    cached_plans = cache.get("plans", {})
+
+    plans = {}
+    changed = False
+    specs_dir = repo_root / "specs"
+    if specs_dir.is_dir():
+        with os.scandir(specs_dir) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                plan_path = os.path.join(entry.path, "plan.md")
+                try:
+                    st = os.stat(plan_path)
+                except FileNotFoundError:
+                    continue
+                cached = cached_plans.get(entry.name)
+                if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+                    plans[entry.name] = cached
+                    continue
+                with open(plan_path, encoding="utf-8", errors="replace") as f:
+                    plans[entry.name] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, **parse_plan(f.read())}
+                changed = True
+    if changed or plans.keys() != cached_plans.keys():
+        try:
+            _write_json_atomic(cache_path, {"version": PLAN_CACHE_VERSION, "plans": plans})
+        except OSError:
+            pass
+    return [
+        {"feature": name, **plan}
+        for name, plan in sorted(plans.items(), key=lambda item: (_feature_number(item[0]) or 0, item[0]))
+    ]
 
-    console.print("\n[cyan]オプションツール:[/cyan]")
-    git_ok = check_tool("git", "https://git-scm.com/downloads")
 
-    console.print("\n[cyan]AIツール（任意）:[/cyan]")
-    claude_ok = check_tool("claude", "https://docs.anthropic.com/en/docs/claude-code/setup からインストール")
-    gemini_ok = check_tool("gemini", "https://github.com/google-gemini/gemini-cli からインストール")
+def _language_commands(language: str) -> str:
+    if "Python" in language:
+        return "cd src && pytest && ruff check ."
+    if "Rust" in language:
+        return "cargo test && cargo clippy"
+    if "JavaScript" in language or "TypeScript" in language:
+        return "npm test && npm run lint"
+    return f"# Add commands for {language}"
 
-    console.print("\n[green]✓ Specify CLIは利用可能です！[/green]")
-    if not git_ok:
-        console.print("[yellow]リポジトリ管理にはgitのインストールを推奨[/yellow]")
-    if not (claude_ok or gemini_ok):
-        console.print("[yellow]AIアシスタント導入で体験向上[/yellow]")
+
+def build_agent_context(plans: list[dict]) -> dict:
+    """
+    全plan.mdの情報からコンテキストファイルの各セクションの行を組み立てる
+    """
+    technologies, commands, styles = [], [], []
+    for plan in plans:
+        language, framework = plan["language"], plan["framework"]
+        if language:
+            stack = f"{language} + {framework}" if framework else language
+            if not any(line.startswith(f"- {stack} (") for line in technologies):
+                technologies.append(f"- {stack} ({plan['feature']})")
+            if _language_commands(language) not in commands:
+                commands.append(_language_commands(language))
+            if f"{language}: Follow standard conventions" not in styles:
+                styles.append(f"{language}: Follow standard conventions")
+        if plan["storage"] and not any(line.startswith(f"- {plan['storage']} (") for line in technologies):
+            technologies.append(f"- {plan['storage']} ({plan['feature']})")
+
+    recent = [
+        f"- {plan['feature']}: Added {plan['language']}" + (f" + {plan['framework']}" if plan["framework"] else "")
+        for plan in reversed(plans) if plan["language"]
+    ][:3]
+    web = any("web" in plan["project_type"].lower() for plan in plans)
+    return {
+        "Active Technologies": technologies,
+        "Project Structure": ["backend/", "frontend/", "tests/"] if web else ["src/", "tests/"],
+        "Commands": commands,
+        "Code Style": styles,
+        "Recent Changes": recent,
+    }
+
+
+def _split_sections(text: str) -> list[list[str]]:
+    """
+    Markdownを "## " 見出しごとに分割（先頭要素は最初の見出しより前の部分）
+    """
+    sections = [[]]
+    in_code = False
+    for line in text.split("\n"):
+        if line.startswith("```"):
+            in_code = not in_code
+        if line.startswith("## ") and not in_code:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def render_agent_context(existing: str | None, context: dict, project_name: str, today: str) -> str:
+    """
+    コンテキストファイルの内容を生成
+    既存ファイルは一覧系セクションに不足行だけを追加し、Recent Changesは作り直す
+    （手動で追記した行やMANUAL ADDITIONSブロックは保持する）
+    """
+    text = existing if existing is not None else AGENT_FILE_SKELETON.replace("[PROJECT NAME]", project_name)
+    text = re.sub(r"Last updated: (\d{4}-\d{2}-\d{2}|\[DATE\])", f"Last updated: {today}", text)
+
+    sections = _split_sections(text)
+    for section in sections[1:]:
+        title = section[0][3:].strip()
+        if title not in context:
+            continue
+        # 見出し直後から、末尾の空行やHTMLコメント（MANUAL ADDITIONS等）の手前までが本文
+        end = next((i for i, line in enumerate(section) if line.startswith("<!--")), len(section))
+        while end > 1 and not section[end - 1].strip():
+            end -= 1
+        body = section[1:end]
+        generated = context[title]
+        if title == "Project Structure":
+            code = [line for line in body if not line.startswith("```")]
+            if any("[ACTUAL STRUCTURE FROM PLANS]" in line for line in code) or not code:
+                body = ["```", *generated, "```"]
+            elif "frontend/" in generated and not any(line.startswith("frontend/") for line in code):
+                body = body[:-1] + ["frontend/src/      # Web UI"] + body[-1:] if body and body[-1].startswith("```") else body
+        elif title == "Recent Changes":
+            body = generated or [line for line in body if not line.startswith("[")]
+        else:
+            kept = [line for line in body if line.strip() and not (line.startswith("[") and line.endswith("]"))]
+            if title == "Commands" and kept and kept[0].startswith("```"):
+                # ```bash ブロックの中に追加
+                inner = kept[1:-1] if kept[-1].startswith("```") and len(kept) > 1 else kept[1:]
+                inner += [line for line in generated if line not in inner]
+                body = [kept[0], *inner, "```"]
+            else:
+                body = kept + [line for line in generated if line not in kept]
+        section[1:end] = body
+    return "\n".join(line for section in sections for line in section)
+
+
+def _preserve_manual_additions(old: str, new: str) -> str:
+    """
+    MANUAL ADDITIONSブロックの内容を旧ファイルから引き継ぐ
+    """
+    block = re.compile(re.escape(MANUAL_ADDITIONS_START) + r".*?" + re.escape(MANUAL_ADDITIONS_END), re.DOTALL)
+    manual = block.search(old)
+    if manual and block.search(new):
+        return block.sub(lambda _: manual.group(0), new, count=1)
+    return new
+
+
+@context_app.command("update")
+def context_update(
+    agent: str = typer.Argument(None, help="Agent context file to update: claude, gemini or copilot (default: all existing files)"),
+):
+    """
+    全機能のplan.mdからエージェント用コンテキストファイルを更新（update-agent-context.sh相当）
+    """
+    from datetime import date
+
+    if agent and agent not in AGENT_CONTEXT_FILES:
+        console.print(f"[red]エラー:[/red] 不明なエージェント '{agent}'。選択肢: {', '.join(AGENT_CONTEXT_FILES.keys())}")
+        raise typer.Exit(1)
+    repo_root, git_dir = _require_git_root()
+    plans = load_plans(repo_root, git_dir)
+    context = build_agent_context(plans)
+
+    if agent:
+        targets = [agent]
+    else:
+        targets = [name for name, (rel, _) in AGENT_CONTEXT_FILES.items() if (repo_root / rel).exists()] or ["claude"]
+
+    template_path = repo_root / "templates" / "agent-file-template.md"
+    today = date.today().isoformat()
+    for name in targets:
+        rel, label = AGENT_CONTEXT_FILES[name]
+        path = repo_root / rel
+        existing = path.read_text(encoding="utf-8") if path.exists() else None
+        base = existing
+        if base is None and template_path.is_file():
+            base = template_path.read_text(encoding="utf-8").replace("[PROJECT NAME]", repo_root.name)
+        content = render_agent_context(base, context, repo_root.name, today)
+        if existing is not None:
+            content = _preserve_manual_additions(existing, content)
+        if content == existing:
+            console.print(f"[dim]{label}: {rel} は最新です[/dim]")
+            continue
+        _write_text_atomic(path, content)
+        console.print(f"[green]✓[/green] {label}: {rel} を{'更新' if existing is not None else '作成'}しました")
+    console.print(f"[dim]{len(plans)}件のplan.mdを参照[/dim]")
 
 
 def main():
+    # `specify --version` はtyper/clickのコマンド解析を通さずに即答する
+    if sys.argv[1:] == ["--version"]:
+        print(f"specify {get_version()}")
+        return
     app()
 
 
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent.parent / "benchmarks"
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+import specify_cli as sc  # noqa: E402
+from fake_github import FakeGitHub  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """
+    テストごとに空のユーザーキャッシュを使う
+    """
+    path = tmp_path / "cache"
+    monkeypatch.setenv("SPECIFY_CACHE_DIR", str(path))
+    monkeypatch.delenv("SPECIFY_TEMPLATE_SOURCE", raising=False)
+    monkeypatch.delenv("SPECIFY_MATERIALIZE", raising=False)
+    sc._reflink_support.clear()
+    return path
+
+
+@pytest.fixture
+def fake_github(monkeypatch):
+    """
+    ローカルのフェイクGitHub（テンプレートはテスト側で server.templates に設定する）
+    """
+    with FakeGitHub({}) as server:
+        monkeypatch.setattr(sc, "GITHUB_API_URL", server.url)
+        yield server
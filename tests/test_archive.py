@@ -0,0 +1,50 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import specify_cli as sc
+
+
+def _zip(path: Path, names) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        for name in names:
+            zf.writestr(name, "x")
+    return path
+
+
+@pytest.mark.parametrize("name", ["..\\..\\evil.txt", "a/..\\..\\x", "C:\\evil", "\\abs", "/abs", "a/../../x"])
+def test_member_target_rejects_traversal(tmp_path, name):
+    with pytest.raises(ValueError):
+        sc._member_target(tmp_path, name)
+
+
+def test_member_target_maps_backslash_to_directory(tmp_path):
+    assert sc._member_target(tmp_path, "a\\b.md") == tmp_path / "a" / "b.md"
+
+
+def test_member_target_rejects_symlink_out_of_dest(tmp_path):
+    dest = tmp_path / "dest"
+    outside = tmp_path / "outside"
+    dest.mkdir()
+    outside.mkdir()
+    (dest / "link").symlink_to(outside, target_is_directory=True)
+    (dest / "file").symlink_to(outside / "file")
+
+    with pytest.raises(ValueError):
+        sc._member_target(dest, "link/evil.txt")
+    with pytest.raises(ValueError):
+        sc._member_target(dest, "file")
+
+
+@pytest.mark.parametrize("name", ["root/..\\..\\evil.txt", "root/a/..\\..\\..\\x"])
+def test_archive_with_backslash_traversal_is_rejected(tmp_path, name):
+    archive = _zip(tmp_path / "t.zip", ["root/README.md", name])
+    dest = tmp_path / "dest"
+
+    with pytest.raises(ValueError):
+        sc.validate_template_archive(archive)
+    with pytest.raises(ValueError):
+        sc.extract_template_archive(archive, dest)
+    assert not (tmp_path / "evil.txt").exists()
+    assert not (tmp_path / "x").exists()
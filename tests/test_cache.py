@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import specify_cli as sc
+
+SRC_DIR = Path(sc.__file__).resolve().parent.parent
+
+STORE_SCRIPT = """
+import hashlib, os, sys
+from pathlib import Path
+import specify_cli as sc
+
+worker, count, work = sys.argv[1], int(sys.argv[2]), Path(sys.argv[3])
+for i in range(count):
+    data = os.urandom(256)
+    src = work / f"{worker}-{i}.part"
+    src.write_bytes(data)
+    sc.cache_store(src, "v1", f"asset-{worker}-{i}.zip", hashlib.sha256(data).hexdigest())
+"""
+
+
+def _store(tmp_path: Path, data: bytes, asset: str) -> str:
+    src = tmp_path / f"{asset}.part"
+    src.write_bytes(data)
+    sha256 = hashlib.sha256(data).hexdigest()
+    sc.cache_store(src, "v1", asset, sha256)
+    return sha256
+
+
+def test_concurrent_processes_keep_every_index_entry(tmp_path, cache_dir):
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR))
+    procs = [
+        subprocess.Popen([sys.executable, "-c", STORE_SCRIPT, str(worker), "10", str(tmp_path)], env=env)
+        for worker in range(6)
+    ]
+    assert all(proc.wait() == 0 for proc in procs)
+
+    index = json.loads((cache_dir / "templates" / "index.json").read_text())
+    assert len(index["entries"]) == 60
+    assert len(list((cache_dir / "templates" / "blobs").glob("*.zip"))) == 60
+
+
+def test_eviction_removes_blobs_without_index_entry(tmp_path, cache_dir):
+    orphan = _store(tmp_path, b"orphan", "orphan.zip")
+    index_path = cache_dir / "templates" / "index.json"
+    index = json.loads(index_path.read_text())
+    del index["entries"]["v1/orphan.zip"]
+    index_path.write_text(json.dumps(index))
+
+    kept = _store(tmp_path, b"kept", "kept.zip")
+
+    blobs = {path.stem for path in (cache_dir / "templates" / "blobs").glob("*.zip")}
+    assert blobs == {kept}
+    assert orphan not in blobs
+
+
+def test_eviction_cleans_up_interrupted_downloads(tmp_path, cache_dir, monkeypatch):
+    blobs = cache_dir / "templates" / "blobs"
+    blobs.mkdir(parents=True)
+    old_release = [blobs / f".v0-a.zip.part{suffix}" for suffix in ("", ".json", ".lock")]
+    expired = blobs / ".v1-b.zip.part"
+    resumable = blobs / ".v1-c.zip.part"
+    in_use = blobs / ".v0-d.zip.part"
+    for path in [*old_release, expired, in_use]:
+        path.write_bytes(b"x")
+    resumable.write_bytes(b"x" * 1000)
+    stale = os.stat(expired).st_mtime - sc.DEFAULT_PARTIAL_TTL - 60
+    os.utime(expired, (stale, stale))
+
+    # 中断ダウンロードの残骸も上限の計算に入り、古いblobが追い出される
+    monkeypatch.setenv("SPECIFY_CACHE_MAX_BYTES", "1050")
+    with sc._file_lock(blobs / f"{in_use.name}.lock"):
+        older = _store(tmp_path, b"o" * 100, "older.zip")
+        newer = _store(tmp_path, b"n" * 10, "newer.zip")
+
+    assert not any(path.exists() for path in [*old_release, expired])
+    assert resumable.exists() and in_use.exists()
+    assert {path.stem for path in blobs.glob("*.zip")} == {newer}
+    assert older not in json.dumps(json.loads((cache_dir / "templates" / "index.json").read_text()))
+
+
+def test_lookup_drops_corrupt_blob(tmp_path, cache_dir):
+    sha256 = _store(tmp_path, b"payload", "a.zip")
+    (cache_dir / "templates" / "blobs" / f"{sha256}.zip").write_bytes(b"tampered")
+    assert sc.cache_lookup("v1", "a.zip") is None
+    assert sc.cache_lookup("v1", "a.zip") is None
+
+
+def test_lookup_hashes_only_changed_blobs_outside_the_lock(tmp_path, cache_dir, monkeypatch):
+    sha256 = _store(tmp_path, b"payload", "a.zip")
+    blob = cache_dir / "templates" / "blobs" / f"{sha256}.zip"
+    hashed = []
+
+    def file_sha256(path):
+        assert not sc._cache_lock.locked()
+        hashed.append(path)
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    monkeypatch.setattr(sc, "_file_sha256", file_sha256)
+
+    # 登録時とサイズ・mtimeが同じblobはハッシュを計算しない
+    assert sc.cache_lookup("v1", "a.zip") == (blob, sha256)
+    assert hashed == []
+
+    # mtimeが変わったら1回だけ照合し、結果を記録する
+    st = blob.stat()
+    os.utime(blob, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert sc.cache_lookup("v1", "a.zip") == (blob, sha256)
+    assert sc.cache_lookup("v1", "a.zip") == (blob, sha256)
+    assert hashed == [blob]
+
+    # 同じサイズで書き換えられたblobは照合で検出して破棄する
+    blob.write_bytes(b"tamperd")
+    assert sc.cache_lookup("v1", "a.zip") is None
+    assert not blob.exists()
+    assert "v1/a.zip" not in json.loads((cache_dir / "templates" / "index.json").read_text())["entries"]
+
+
+DOWNLOAD_SCRIPT = """
+import json
+from pathlib import Path
+import specify_cli as sc
+
+path, meta = sc.download_template_from_github("claude", Path.cwd(), verbose=False, show_progress=False)
+print(json.dumps({"path": str(path), "sha256": meta["sha256"]}))
+"""
+
+
+def test_concurrent_downloads_share_one_part_file(tmp_path, cache_dir, fake_github):
+    from fake_github import make_template_zip
+
+    # 分割ダウンロード（.part.json）を使うサイズ
+    archive = make_template_zip("claude", 20, payload_bytes=sc.PARALLEL_DOWNLOAD_MIN_BYTES + 1024)
+    fake_github.templates = {"claude": archive}
+    fake_github.latency = 0.02
+    env = dict(os.environ, PYTHONPATH=str(SRC_DIR), SPECIFY_GITHUB_API_URL=fake_github.url)
+    procs = [
+        subprocess.Popen([sys.executable, "-c", DOWNLOAD_SCRIPT], env=env, cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(6)
+    ]
+    results = [(proc.wait(), *proc.communicate()) for proc in procs]
+    assert [code for code, _, _ in results] == [0] * 6, [err for _, _, err in results]
+
+    expected = hashlib.sha256(archive).hexdigest()
+    for _, out, _ in results:
+        assert json.loads(out)["sha256"] == expected
+    blobs = cache_dir / "templates" / "blobs"
+    assert [path.name for path in blobs.glob("*.zip")] == [f"{expected}.zip"]
+    assert not list(blobs.glob("*.part"))
@@ -0,0 +1,95 @@
+import json
+import os
+from datetime import date
+
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    (tmp_path / ".git").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _plan(repo, feature: str, language: str, framework: str = "N/A", storage: str = "N/A"):
+    path = repo / "specs" / feature / "plan.md"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(
+        "## 技術的コンテキスト\n"
+        f"**言語/バージョン**: {language}\n"
+        f"**主要依存関係**: {framework}\n"
+        f"**ストレージ**: {storage}\n"
+        "**プロジェクトタイプ**: single\n"
+    )
+    return path
+
+
+def _update(*args):
+    result = runner.invoke(sc.app, ["context", "update", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def test_creates_agent_file_from_plans(repo):
+    _plan(repo, "001-api", "Python 3.11", "FastAPI", "PostgreSQL")
+    _plan(repo, "002-cli", "Rust 1.75")
+
+    _update("claude")
+
+    text = (repo / "CLAUDE.md").read_text()
+    assert f"Last updated: {date.today().isoformat()}" in text
+    assert "- Python 3.11 + FastAPI (001-api)" in text
+    assert "- PostgreSQL (001-api)" in text
+    assert "- Rust 1.75 (002-cli)" in text
+    assert "cargo test && cargo clippy" in text
+    assert "- 002-cli: Added Rust 1.75" in text
+    assert "[EXTRACTED FROM ALL PLAN.MD FILES]" not in text
+
+
+def test_rewrite_keeps_manual_lines_and_marker_block(repo):
+    _plan(repo, "001-api", "Python 3.11", "FastAPI")
+    _update("claude")
+    path = repo / "CLAUDE.md"
+    text = path.read_text()
+    text = text.replace("- Python 3.11 + FastAPI (001-api)", "- Python 3.11 + FastAPI (001-api)\n- Redis (added by hand)")
+    text = text.replace(sc.MANUAL_ADDITIONS_END, "Always run ruff before committing.\n" + sc.MANUAL_ADDITIONS_END)
+    path.write_text(text)
+
+    _plan(repo, "002-web", "TypeScript 5", "React")
+    _update("claude")
+
+    updated = path.read_text()
+    assert "- Redis (added by hand)" in updated
+    assert "- TypeScript 5 + React (002-web)" in updated
+    manual = updated.split(sc.MANUAL_ADDITIONS_START, 1)[1].split(sc.MANUAL_ADDITIONS_END, 1)[0]
+    assert manual.strip() == "Always run ruff before committing."
+    assert updated.count(sc.MANUAL_ADDITIONS_START) == 1
+
+    # 変化がなければ書き換えない
+    assert "は最新です" in _update("claude")
+    assert path.read_text() == updated
+
+
+def test_plan_cache_is_invalidated_by_mtime_and_size(repo):
+    plan = _plan(repo, "001-api", "Python 3.11")
+    _update("claude")
+    cache_path = repo / ".git" / "specify" / "plans.json"
+    cache = json.loads(cache_path.read_text())
+    assert cache["plans"]["001-api"]["language"] == "Python 3.11"
+
+    # mtimeとサイズが同じなら保存済みの解析結果を使う（plan.mdは読み直さない）
+    cache["plans"]["001-api"]["language"] = "Cached 1.0"
+    cache_path.write_text(json.dumps(cache))
+    assert [p["language"] for p in sc.load_plans(repo, repo / ".git")] == ["Cached 1.0"]
+
+    st = plan.stat()
+    plan.write_text(plan.read_text().replace("Python 3.11", "Python 3.12"))
+    os.utime(plan, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert [p["language"] for p in sc.load_plans(repo, repo / ".git")] == ["Python 3.12"]
+    assert json.loads(cache_path.read_text())["plans"]["001-api"]["language"] == "Python 3.12"
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import threading
+
+import pytest
+
+import specify_cli as sc
+
+
+@pytest.mark.parametrize("segmented", [False, True])
+def test_cancel_stops_download_and_keeps_part_resumable(tmp_path, fake_github, monkeypatch, segmented):
+    if segmented:
+        monkeypatch.setattr(sc, "PARALLEL_DOWNLOAD_MIN_BYTES", 1024 * 1024)
+        monkeypatch.setattr(sc, "DOWNLOAD_SEGMENT_MIN_BYTES", 1024 * 1024)
+    data = os.urandom(4 * 1024 * 1024)
+    fake_github.templates = {"claude": data}
+    url = fake_github.release_json()["assets"][0]["browser_download_url"]
+    part_path = tmp_path / "asset.part"
+    cancel = threading.Event()
+    received = []
+
+    def advance(n):
+        received.append(n)
+        cancel.set()
+
+    with pytest.raises(sc.DownloadCancelled):
+        sc.download_asset(url, part_path, len(data), advance=advance, cancel=cancel)
+    assert 0 < sum(received) < len(data)
+
+    assert sc.download_asset(url, part_path, len(data)) == hashlib.sha256(data).hexdigest()
+
+
+def test_finish_cancels_unselected_prefetch(fake_github):
+    from fake_github import make_template_zip
+
+    fake_github.templates = {
+        "claude": make_template_zip("claude", 10),
+        "gemini": make_template_zip("gemini", 10, payload_bytes=4 * 1024 * 1024),
+    }
+    fake_github.latency = 0.1
+
+    prefetch = sc.TemplatePrefetcher(["claude", "gemini"])
+    assert prefetch.finish("claude")
+    assert prefetch._cancel["gemini"].is_set()
+    try:
+        assert prefetch._downloads["gemini"].result(timeout=10) is None
+    except sc.DownloadCancelled:
+        pass
+
+    release = fake_github.tag
+    assert sc.cache_lookup(release, fake_github.asset_name("claude"))
+    assert sc.cache_lookup(release, fake_github.asset_name("gemini")) is None
@@ -0,0 +1,71 @@
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import specify_cli as sc
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch, tmp_path):
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(tmp_path / "gitconfig"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "Specify Test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "test@example.com")
+
+
+def _git(path, *args) -> str:
+    return subprocess.run(["git", *args], cwd=path, check=True, capture_output=True, text=True).stdout
+
+
+def _make_project(path):
+    (path / "scripts" / "nested" / "deep").mkdir(parents=True)
+    (path / "scripts" / "run.sh").write_text("#!/bin/sh\necho hi\n")
+    os.chmod(path / "scripts" / "run.sh", 0o755)
+    (path / "scripts" / "nested" / "deep" / "仕様.md").write_text("# 仕様\n", encoding="utf-8")
+    (path / "README.md").write_text("readme\n")
+    (path / ".gitignore").write_text("*.log\n")
+    (path / "debug.log").write_text("ignored\n")
+
+
+def test_initial_commit_matches_working_tree(tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    _make_project(project)
+
+    assert sc.init_git_repo(project, quiet=True)
+
+    _git(project, "fsck", "--strict")
+    assert _git(project, "status", "--porcelain", "--ignored=no") == ""
+    files = _git(project, "-c", "core.quotepath=false", "ls-files", "-s").splitlines()
+    modes = {line.split("\t")[1]: line.split()[0] for line in files}
+    assert modes == {
+        ".gitignore": "100644",
+        "README.md": "100644",
+        "scripts/nested/deep/仕様.md": "100644",
+        "scripts/run.sh": "100755" if os.name != "nt" else "100644",
+    }
+    assert _git(project, "log", "--format=%s").strip() == sc.INITIAL_COMMIT_MESSAGE
+
+
+def test_parallel_init_does_not_change_cwd(tmp_path):
+    projects = []
+    for i in range(4):
+        project = tmp_path / f"p{i}"
+        project.mkdir()
+        _make_project(project)
+        projects.append(project)
+    cwd = os.getcwd()
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        assert all(pool.map(lambda p: sc.init_git_repo(p, quiet=True), projects))
+
+    assert os.getcwd() == cwd
+    for project in projects:
+        assert sc.find_git_root(project) == (project.resolve(), project.resolve() / ".git")
+        assert _git(project, "status", "--porcelain") == ""
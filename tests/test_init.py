@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def templates(fake_github, tmp_path, monkeypatch):
+    from fake_github import make_template_zip
+
+    fake_github.templates = {ai: make_template_zip(ai, 5) for ai in ("claude", "gemini")}
+    monkeypatch.chdir(tmp_path)
+    return fake_github
+
+
+def _downloads(server) -> list[str]:
+    return [path for path in server.requests if path.startswith("/download/")]
+
+
+def test_batch_dry_run_prints_plans_without_creating_projects(tmp_path, templates):
+    manifest = tmp_path / "projects.json"
+    manifest.write_text(json.dumps([{"name": "svc-a", "ai": "claude"}, {"name": "svc-b", "ai": "gemini"}, "svc-c"]))
+
+    result = runner.invoke(sc.app, ["init", "--batch", str(manifest), "--ai", "claude", "--dry-run", "--ignore-agent-tools"])
+
+    assert result.exit_code == 0, result.output
+    for name in ("svc-a", "svc-b", "svc-c"):
+        assert name in result.output
+        assert not (tmp_path / name).exists()
+    assert "--dry-run" in result.output
+    assert len(_downloads(templates)) == 2
+
+
+def test_here_shows_merge_plan_before_confirm(tmp_path, templates):
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "constitution.md").write_text("local\n")
+
+    result = runner.invoke(sc.app, ["init", "--here", "--ai", "claude", "--no-git", "--ignore-agent-tools"], input="n\n")
+
+    assert result.exit_code == 0, result.output
+    plan, prompt = result.output.split("続行しますか？", 1)
+    assert "~ memory/constitution.md" in plan
+    assert "+ scripts/common.sh" in plan
+    assert (tmp_path / "memory" / "constitution.md").read_text() == "local\n"
+    assert not (tmp_path / "scripts").exists()
+
+
+def test_here_confirm_reuses_fetched_template(tmp_path, templates):
+    (tmp_path / "notes.txt").write_text("keep\n")
+
+    result = runner.invoke(sc.app, ["init", "--here", "--ai", "claude", "--no-git", "--ignore-agent-tools", "--no-cache"], input="y\n")
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "scripts" / "common.sh").exists()
+    assert (tmp_path / "notes.txt").read_text() == "keep\n"
+    assert len(_downloads(templates)) == 1
+
+
+def test_here_stops_on_file_directory_clash(tmp_path, templates):
+    (tmp_path / "memory" / "constitution.md").mkdir(parents=True)
+    (tmp_path / "scripts").write_text("not a directory\n")
+
+    result = runner.invoke(sc.app, ["init", "--here", "--ai", "claude", "--no-git", "--ignore-agent-tools"], input="y\n")
+
+    assert result.exit_code == 1, result.output
+    assert "続行しますか？" not in result.output
+    assert "! memory/constitution.md" in result.output
+    assert "! scripts/common.sh" in result.output
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["cache", "memory", "scripts"]
+
+
+def test_apply_merge_with_conflicts_writes_nothing(tmp_path):
+    from fake_github import make_template_zip
+
+    archive = tmp_path / "template.zip"
+    archive.write_bytes(make_template_zip("claude", 5))
+    dest = tmp_path / "dest"
+    (dest / "scripts" / "common.sh").mkdir(parents=True)
+
+    plan = sc.plan_template_merge(archive, dest)
+
+    assert plan["conflicts"] == ["scripts/common.sh"]
+    assert "scripts/common.sh" not in plan["changed"] + plan["new"]
+    with pytest.raises(ValueError, match="scripts/common.sh"):
+        sc.apply_template_merge(archive, dest, plan)
+    assert [path.name for path in dest.iterdir()] == ["scripts"]
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+SPEC = """# 機能仕様: ログイン
+
+## ユーザーシナリオ & テスト *(必須)*
+ユーザーはメールアドレスでログインできる
+
+## 要件 *(必須)*
+- **FR-001**: システムは [NEEDS CLARIFICATION: 認証方式が未指定] で認証しなければならない
+"""
+PLAN = """# 実装計画
+
+## 技術的コンテキスト
+**言語/バージョン**: Python 3.11
+**主要依存関係**: FastAPI
+**テスト**: pytest
+"""
+DATA_MODEL = """# データモデル
+
+### User
+- email
+
+### Session
+- token
+"""
+TASKS = """## フェーズ 3.2: テスト
+- [ ] T001 [P] コントラクトテスト tests/contract/test_login.py
+- [ ] T002 [P] 統合テスト tests/contract/test_login.py に追加
+
+## フェーズ 3.3: 実装
+- [ ] T003 User モデル src/models/user.py
+"""
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    (tmp_path / ".git").mkdir()
+    feature = tmp_path / "specs" / "001-login"
+    (feature / "contracts").mkdir(parents=True)
+    (feature / "spec.md").write_text(SPEC)
+    (feature / "plan.md").write_text(PLAN)
+    (feature / "data-model.md").write_text(DATA_MODEL)
+    (feature / "tasks.md").write_text(TASKS)
+    (feature / "contracts" / "login.yaml").write_text("openapi: 3.0.0\n")
+    (feature / "contracts" / "logout.yaml").write_text("openapi: 3.0.0\n")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _lint(*args):
+    result = runner.invoke(sc.app, ["lint", "--jobs", "1", *args])
+    return result.exit_code, result.output
+
+
+def test_findings_cover_each_gate(repo):
+    code, output = _lint("--format", "json")
+
+    assert code == 1
+    report = json.loads(output)
+    assert report["features"] == 1
+    found = {(f["rule"], f["path"], f["line"]) for f in report["findings"]}
+    assert found == {
+        ("needs-clarification", "specs/001-login/spec.md", 7),
+        ("contract-without-test", "specs/001-login/tasks.md", 1),
+        ("entity-without-model", "specs/001-login/tasks.md", 1),
+        ("task-conflict", "specs/001-login/tasks.md", 2),
+    }
+    messages = " ".join(f["message"] for f in report["findings"])
+    assert "contracts/logout.yaml" in messages and "Session" in messages
+
+
+def test_sarif_shape(repo):
+    code, output = _lint("--format", "sarif")
+
+    assert code == 1
+    sarif = json.loads(output)
+    assert sarif["version"] == "2.1.0"
+    assert sarif["$schema"].endswith("sarif-2.1.0.json")
+    (run,) = sarif["runs"]
+    rules = run["tool"]["driver"]["rules"]
+    assert [rule["id"] for rule in rules] == list(sc.LINT_RULES)
+    assert all(rule["defaultConfiguration"]["level"] in ("error", "warning") for rule in rules)
+    assert len(run["results"]) == 4
+    for result in run["results"]:
+        assert result["ruleId"] in sc.LINT_RULES
+        assert result["level"] == sc.LINT_RULES[result["ruleId"]][0]
+        assert result["message"]["text"]
+        (location,) = result["locations"]
+        physical = location["physicalLocation"]
+        assert physical["artifactLocation"]["uri"].startswith("specs/001-login/")
+        assert isinstance(physical["region"]["startLine"], int) and physical["region"]["startLine"] >= 1
+
+
+def test_clean_feature_passes_and_cache_follows_content(repo):
+    feature = repo / "specs" / "001-login"
+    (feature / "spec.md").write_text(SPEC.replace("[NEEDS CLARIFICATION: 認証方式が未指定]", "パスワード"))
+    (feature / "contracts" / "logout.yaml").unlink()
+    (feature / "data-model.md").write_text("# データモデル\n\n### User\n- email\n")
+    (feature / "tasks.md").write_text(TASKS.replace("tests/contract/test_login.py に追加", "tests/integration/test_flow.py"))
+
+    code, output = _lint("--format", "json")
+    assert code == 0, output
+    assert json.loads(output)["findings"] == []
+    cache = json.loads((repo / ".git" / "specify" / "lint.json").read_text())
+    assert len(cache["models"]) == 4
+
+    # 内容が変わったファイルだけ解析し直され、古いモデルはキャッシュから消える
+    (feature / "plan.md").write_text(PLAN.replace("pytest", "[e.g., pytest]"))
+    code, output = _lint("--format", "json", "--strict")
+    assert code == 1
+    assert [f["rule"] for f in json.loads(output)["findings"]] == ["unfilled-context"]
+    assert len(json.loads((repo / ".git" / "specify" / "lint.json").read_text())["models"]) == 4
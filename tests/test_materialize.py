@@ -0,0 +1,154 @@
+import hashlib
+import os
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import specify_cli as sc
+
+V1 = {"README.md": "# v1\n", "memory/constitution.md": "v1 constitution\n"}
+V2 = {"README.md": "# v2\n", "memory/constitution.md": "v2 constitution\n"}
+
+
+def _zip(path: Path, files: dict) -> Path:
+    with zipfile.ZipFile(path, "w") as zf:
+        for rel, text in files.items():
+            zf.writestr(f"spec-kit-template-claude/{rel}", text)
+    return path
+
+
+def _cached_zip(tmp_path: Path, files: dict, release: str) -> tuple[Path, str]:
+    src = _zip(tmp_path / f"{release}.zip", files)
+    sha256 = hashlib.sha256(src.read_bytes()).hexdigest()
+    return sc.cache_store(src, release, "spec-kit-template-claude.zip", sha256), sha256
+
+
+def _snapshot(root: Path) -> dict:
+    return {p.relative_to(root).as_posix(): p.read_text() for p in sorted(root.rglob("*")) if p.is_file()}
+
+
+@pytest.fixture
+def linked_projects(tmp_path, monkeypatch):
+    """
+    同じストアからハードリンクで配置したプロジェクトa, b
+    """
+    monkeypatch.setenv("SPECIFY_MATERIALIZE", "hardlink")
+    monkeypatch.setattr(os, "geteuid", lambda: 1000, raising=False)
+    archive, sha256 = _cached_zip(tmp_path, V1, "v1")
+    projects = []
+    for name in ("a", "b"):
+        stats = sc.install_template(archive, tmp_path / name, sha256=sha256)
+        # memory/ はユーザーが編集するのでハードリンクしない
+        assert stats["methods"] == {"hardlink": 1, "copy": 1}
+        projects.append(tmp_path / name)
+    store = sc._unpacked_root() / sha256
+    assert (projects[0] / "README.md").stat().st_ino == (store / "README.md").stat().st_ino
+    assert (projects[0] / "memory" / "constitution.md").stat().st_nlink == 1
+    return store, projects[0], projects[1]
+
+
+def test_in_place_edit_of_editable_file_stays_in_project(tmp_path, linked_projects):
+    store, project, sibling = linked_projects
+
+    with open(project / "memory" / "constitution.md", "w") as f:
+        f.write("edited in place\n")
+
+    assert _snapshot(store) == V1
+    assert _snapshot(sibling) == V1
+
+
+def test_hardlink_mode_is_not_used_as_root(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPECIFY_MATERIALIZE", "hardlink")
+    monkeypatch.setattr(os, "geteuid", lambda: 0, raising=False)
+    archive, sha256 = _cached_zip(tmp_path, V1, "v1")
+
+    stats = sc.install_template(archive, tmp_path / "a", sha256=sha256)
+
+    assert "hardlink" not in stats["methods"]
+    assert all(path.stat().st_nlink == 1 for path in (tmp_path / "a").rglob("*") if path.is_file())
+
+
+def _merge(source, dest):
+    sc.apply_template_merge(source, dest, sc.plan_template_merge(source, dest))
+
+
+def _write_dir(tmp_path: Path, files: dict) -> Path:
+    root = tmp_path / "template-dir"
+    for rel, text in files.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(text)
+    return root
+
+
+def _materialize(tmp_path: Path, dest: Path):
+    archive, sha256 = _cached_zip(tmp_path, V2, "v2")
+    sc.install_template(archive, dest, sha256=sha256)
+
+
+WRITERS = {
+    "merge-zip": lambda tmp_path, dest: _merge(_zip(tmp_path / "v2.zip", V2), dest),
+    "merge-dir": lambda tmp_path, dest: _merge(_write_dir(tmp_path, V2), dest),
+    "extract": lambda tmp_path, dest: sc.extract_template_archive(_zip(tmp_path / "v2.zip", V2), dest),
+    "copy-dir": lambda tmp_path, dest: sc._copy_template_dir(_write_dir(tmp_path, V2), dest),
+    "materialize": _materialize,
+}
+
+
+@pytest.mark.parametrize("writer", list(WRITERS))
+def test_writing_linked_project_leaves_store_and_siblings_untouched(tmp_path, linked_projects, writer):
+    store, project, sibling = linked_projects
+    before_store, before_sibling = _snapshot(store), _snapshot(sibling)
+
+    WRITERS[writer](tmp_path, project)
+
+    assert _snapshot(project) == V2
+    assert _snapshot(store) == before_store == V1
+    assert _snapshot(sibling) == before_sibling == V1
+
+
+MATERIALIZE_SCRIPT = """
+import sys
+from pathlib import Path
+import specify_cli as sc
+
+worker, work = sys.argv[1], Path(sys.argv[2])
+for archive in sorted(work.glob("*.zip")):
+    dest = work / f"{archive.stem}-{worker}"
+    stats = sc.install_template(archive, dest, sha256=archive.stem)
+    assert stats["files"] == len(list(dest.rglob("*.md"))), stats
+"""
+
+
+def test_concurrent_processes_share_one_store(tmp_path, cache_dir):
+    files = {f"docs/{i:04d}.md": f"doc {i}\n" for i in range(800)}
+    work = tmp_path / "work"
+    work.mkdir()
+    for n in range(4):
+        archive, sha256 = _cached_zip(tmp_path, {**files, "README.md": f"round {n}\n"}, f"v{n}")
+        (work / f"{sha256}.zip").write_bytes(archive.read_bytes())
+
+    env = dict(os.environ, PYTHONPATH=str(Path(sc.__file__).resolve().parent.parent), SPECIFY_MATERIALIZE="hardlink")
+    procs = [subprocess.Popen([sys.executable, "-c", MATERIALIZE_SCRIPT, str(worker), str(work)], env=env) for worker in range(6)]
+    assert all(proc.wait() == 0 for proc in procs)
+
+    for dest in work.iterdir():
+        if dest.is_dir():
+            assert len(list(dest.rglob("*.md"))) == len(files) + 1
+    assert len(list(sc._unpacked_root().glob("*.json"))) == 4
+
+
+def test_store_in_use_is_not_removed(tmp_path):
+    archive, sha256 = _cached_zip(tmp_path, V1, "v1")
+
+    with sc.unpacked_template(archive, sha256) as (store, _, existed):
+        assert not existed
+        assert not sc._remove_unpacked_template(sha256)
+        assert _snapshot(store) == V1
+
+    with sc.unpacked_template(archive, sha256) as (store, _, existed):
+        assert existed
+    assert sc._remove_unpacked_template(sha256)
+    assert not store.exists()
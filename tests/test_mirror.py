@@ -0,0 +1,139 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+from fake_github import make_template_zip
+
+runner = CliRunner()
+
+
+@pytest.fixture
+def mirror(tmp_path, fake_github):
+    """
+    フェイクGitHubから同期したミラーディレクトリ
+    """
+    fake_github.tag = "v1"
+    fake_github.templates = {"claude": make_template_zip("claude", 20, payload_bytes=4096)}
+    mirror_dir = tmp_path / "mirror"
+    result = runner.invoke(sc.app, ["mirror", "sync", "--dir", str(mirror_dir)])
+    assert result.exit_code == 0, result.output
+    return mirror_dir
+
+
+@pytest.fixture
+def served(mirror):
+    """
+    別プロセスで specify mirror serve を起動し、(URL, ミラーディレクトリ) を返す
+    """
+    env = dict(os.environ, PYTHONPATH=str(Path(sc.__file__).resolve().parent.parent), PYTHONUNBUFFERED="1", COLUMNS="200")
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import specify_cli; specify_cli.main()", "mirror", "serve", "--dir", str(mirror), "--port", "0", "--quiet"],
+        env=env, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        url = None
+        for line in proc.stdout:
+            match = re.search(r"http://127\.0\.0\.1:\d+", line)
+            if match:
+                url = match.group(0)
+                break
+        assert url, "mirror serve did not start"
+        yield url, mirror
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def _asset(mirror: Path) -> tuple[str, bytes]:
+    release = sc._load_mirror_release(mirror)
+    (asset,) = release["assets"]
+    return f"/download/{release['tag_name']}/{asset['name']}", (mirror / "assets" / release["tag_name"] / asset["name"]).read_bytes()
+
+
+def test_latest_release_answers_304_for_matching_etag(served):
+    url, _ = served
+    api = f"{url}/repos/{sc.TEMPLATE_REPO_OWNER}/{sc.TEMPLATE_REPO_NAME}/releases/latest"
+
+    response = httpx.get(api)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    (asset,) = response.json()["assets"]
+    assert asset["browser_download_url"].startswith(f"{url}/download/v1/")
+
+    response = httpx.get(api, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    assert httpx.get(api, headers={"If-None-Match": '"v0-0"'}).status_code == 200
+
+
+def test_download_answers_206_for_ranges(served):
+    url, mirror = served
+    path, data = _asset(mirror)
+    size = len(data)
+
+    response = httpx.get(url + path)
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.content == data
+
+    response = httpx.get(url + path, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 10-19/{size}"
+    assert response.content == data[10:20]
+
+    # 末尾からの範囲と、サイズを超える終端
+    response = httpx.get(url + path, headers={"Range": "bytes=-5"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {size - 5}-{size - 1}/{size}"
+    assert response.content == data[-5:]
+    response = httpx.get(url + path, headers={"Range": f"bytes={size - 3}-{size + 100}"})
+    assert response.status_code == 206
+    assert response.content == data[-3:]
+
+    response = httpx.get(url + path, headers={"Range": f"bytes={size}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{size}"
+
+
+def test_init_from_served_mirror(served, tmp_path, monkeypatch):
+    url, mirror = served
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(sc.app, ["init", "proj", "--ai", "claude", "--no-git", "--ignore-agent-tools", "--source", url])
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "proj" / "memory" / "constitution.md").read_text() == "# Constitution\n"
+
+
+def test_offline_init_uses_mirror_directory(mirror, fake_github, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    requests = len(fake_github.requests)
+
+    result = runner.invoke(sc.app, ["init", "proj", "--ai", "claude", "--no-git", "--ignore-agent-tools", "--offline", "--source", str(mirror)])
+
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "proj" / "memory" / "constitution.md").read_text() == "# Constitution\n"
+    lock = json.loads((tmp_path / "proj" / ".specify" / "lock.json").read_text())
+    assert lock["release"] == "v1"
+    assert len(fake_github.requests) == requests
+    # ミラーのアセットはそのまま残る
+    assert sc._load_mirror_release(mirror)["assets"][0]["name"] in {p.name for p in (mirror / "assets" / "v1").iterdir()}
+
+
+def test_offline_init_without_mirror_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    result = runner.invoke(sc.app, ["init", "proj", "--ai", "claude", "--no-git", "--ignore-agent-tools", "--offline", "--source", str(tmp_path / "missing")])
+
+    assert result.exit_code == 1
+    assert not (tmp_path / "proj").exists()
@@ -0,0 +1,100 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """
+    specs/ を持つ作業ツリー（find_git_rootが見つけられるよう .git だけ作る）
+    """
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "specs").mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def _status(*args) -> dict:
+    result = runner.invoke(sc.app, ["status", "--json", *args])
+    assert result.exit_code == 0, result.output
+    return {row["name"]: row for row in json.loads(result.output)["features"]}
+
+
+def test_status_counts_only_numbered_tasks_of_real_template(repo):
+    feature = repo / "specs" / "001-login"
+    feature.mkdir()
+    shutil.copy(TEMPLATES_DIR / "tasks-template.md", feature / "tasks.md")
+
+    row = _status()["001-login"]
+
+    plan = runner.invoke(sc.app, ["tasks", "plan", str(feature / "tasks.md"), "--json"])
+    tasks = json.loads(plan.output)["tasks"]
+    assert (row["tasks_done"], row["tasks_total"]) == (0, len(tasks)) == (0, 23)
+    assert row["stage"] == "tasks"
+
+
+def test_status_ignores_checklist_when_all_tasks_are_done(repo):
+    feature = repo / "specs" / "002-search"
+    feature.mkdir()
+    (feature / "tasks.md").write_text(
+        "## フェーズ 3.1\n- [x] T001 準備\n- [X] T002 [P] 実装 src/a.py\n\n"
+        "## 検証チェックリスト\n- [ ] すべてのテストが実装より前にある\n"
+    )
+
+    row = _status()["002-search"]
+
+    assert (row["tasks_done"], row["tasks_total"]) == (2, 2)
+    assert row["stage"] == "done"
+
+
+def test_stages_follow_documents(repo):
+    for name, docs in {"001-a": ["spec.md"], "002-b": ["spec.md", "plan.md"], "003-c": ["notes.txt"]}.items():
+        (repo / "specs" / name).mkdir()
+        for doc in docs:
+            (repo / "specs" / name / doc).write_text("# doc\n")
+    (repo / "specs" / "001-a" / "spec.md").write_text("# spec\n- 認証方式 [NEEDS CLARIFICATION: 未定]\n")
+
+    rows = _status()
+
+    assert {name: row["stage"] for name, row in rows.items()} == {"001-a": "spec", "002-b": "plan", "003-c": "empty"}
+    assert rows["001-a"]["clarifications"] == 1
+    assert list(_status("002-b")) == ["002-b"]
+
+
+def test_document_index_is_invalidated_by_mtime_and_size(repo):
+    feature = repo / "specs" / "001-login"
+    feature.mkdir()
+    (feature / "spec.md").write_text("# spec\n")
+    tasks = feature / "tasks.md"
+    tasks.write_text("- [ ] T001 準備\n- [ ] T002 実装\n")
+    assert _status()["001-login"]["tasks_done"] == 0
+    index_path = repo / ".git" / "specify" / "docs.json"
+    index = json.loads(index_path.read_text())
+
+    # mtimeとサイズが同じファイルは読み直さない
+    index["files"]["001-login/tasks.md"]["tasks_done"] = 2
+    index_path.write_text(json.dumps(index))
+    assert _status()["001-login"]["tasks_done"] == 2
+
+    st = tasks.stat()
+    tasks.write_text("- [x] T001 準備\n- [ ] T002 実装\n")
+    os.utime(tasks, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    row = _status()["001-login"]
+    assert (row["tasks_done"], row["tasks_total"]) == (1, 2)
+
+    # 削除されたファイルは索引から消える
+    tasks.unlink()
+    row = _status()["001-login"]
+    assert row["docs"]["tasks.md"] is False
+    assert row["stage"] == "spec"
+    assert "001-login/tasks.md" not in json.loads(index_path.read_text())["files"]
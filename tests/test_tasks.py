@@ -0,0 +1,87 @@
+import json
+import shutil
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+TASKS = """# タスク
+
+## フェーズ 3.1: セットアップ
+- [x] T001 プロジェクト構造を作成
+- [ ] T002 [P] リンター設定 ruff.toml
+
+## フェーズ 3.2: テスト
+- [ ] T003 [P] コントラクトテスト tests/contract/test_users.py
+- [ ] T004 [P] 統合テスト tests/integration/test_login.py
+- [ ] T005 [P] 統合テスト tests/integration/test_login.py に異常系を追加
+
+## フェーズ 3.3: 実装
+- [ ] T006 User モデル src/models/user.py
+- [ ] T007 UserService src/services/user.py
+
+## 依存関係
+- T006 が T007 をブロック
+"""
+
+
+def _plan(path: Path, *args):
+    result = runner.invoke(sc.app, ["tasks", "plan", str(path), "--json", *args])
+    return result.exit_code, json.loads(result.output)
+
+
+def test_parallel_tasks_on_same_file_are_reported_and_serialized(tmp_path):
+    path = tmp_path / "tasks.md"
+    path.write_text(TASKS)
+
+    code, report = _plan(path)
+
+    assert code == 0
+    assert report["warnings"] == ["T004 と T005 は [P] ですが同じファイル tests/integration/test_login.py を変更します"]
+    deps = {task["id"]: task["deps"] for task in report["tasks"]}
+    assert "T004" in deps["T005"]
+    # 完了済みのT001はウェーブに含めない。T005はT004の後、実装フェーズはテストの後
+    assert report["waves"] == [["T002"], ["T003", "T004"], ["T005"], ["T006"], ["T007"]]
+    assert report["critical_path"] == ["T001", "T002", "T004", "T005", "T006", "T007"]
+    assert report["max_width"] == 2
+
+    code, _ = _plan(path, "--strict")
+    assert code == 1
+
+
+def test_workers_split_waves(tmp_path):
+    path = tmp_path / "tasks.md"
+    path.write_text(TASKS.replace("tests/integration/test_login.py に異常系を追加", "tests/integration/test_signup.py"))
+
+    code, report = _plan(path, "--workers", "1")
+
+    assert code == 0 and report["warnings"] == []
+    assert report["max_width"] == 1
+    assert [task_id for wave in report["waves"] for task_id in wave] == ["T002", "T003", "T004", "T005", "T006", "T007"]
+
+
+def test_dependency_cycle_fails(tmp_path):
+    path = tmp_path / "tasks.md"
+    path.write_text(TASKS + "- T007 が T006 をブロック\n")
+
+    code, report = _plan(path)
+
+    assert code == 1
+    assert report["cycle"] == ["T006", "T007"]
+
+
+def test_real_template_has_no_file_conflicts(tmp_path):
+    path = tmp_path / "tasks.md"
+    shutil.copy(TEMPLATES_DIR / "tasks-template.md", path)
+
+    code, report = _plan(path)
+
+    assert code == 0
+    assert not [warning for warning in report["warnings"] if "同じファイル" in warning]
+    assert len(report["tasks"]) == 23
+    assert report["cycle"] == []
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+import specify_cli as sc
+
+
+@pytest.fixture
+def tool(tmp_path, monkeypatch):
+    """
+    PATH上の偽ツール（--versionを実行するたびに calls に1行追記する）
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    path = bin_dir / "fooctl"
+
+    def install(version: str):
+        path.write_text(f"#!/bin/sh\necho x >> '{calls}'\necho 'fooctl {version}'\n")
+        path.chmod(0o755)
+
+    install("1.0")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return path, install, lambda: len(calls.read_text().splitlines()) if calls.exists() else 0
+
+
+def test_version_is_cached_until_binary_changes(tool):
+    path, install, calls = tool
+
+    assert sc.detect_tools(["fooctl"], with_version=True)["fooctl"]["version"] == "fooctl 1.0"
+    assert sc.detect_tools(["fooctl"], with_version=True)["fooctl"]["version"] == "fooctl 1.0"
+    assert calls() == 1
+
+    # 実行ファイルが差し替えられたら（mtimeが変われば）TTL内でも取得し直す
+    st = path.stat()
+    install("2.0")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    info = sc.detect_tools(["fooctl"], with_version=True)["fooctl"]
+
+    assert info["version"] == "fooctl 2.0"
+    assert calls() == 2
+    cache = json.loads((sc.get_cache_dir() / "tools.json").read_text())
+    assert cache["fooctl"]["version"] == "fooctl 2.0"
+    assert cache["fooctl"]["mtime"] == info["mtime"]
+
+
+def test_expired_cache_is_refreshed(tool, monkeypatch):
+    _, _, calls = tool
+    sc.detect_tools(["fooctl"], with_version=True)
+
+    monkeypatch.setenv("SPECIFY_TOOL_CACHE_TTL", "0")
+    sc.detect_tools(["fooctl"], with_version=True)
+
+    assert calls() == 2
+
+
+def test_missing_tool_is_not_found(tool):
+    info = sc.detect_tools(["fooctl", "no-such-tool-xyz"])
+
+    assert info["fooctl"]["found"] and info["fooctl"]["version"] is None
+    assert info["no-such-tool-xyz"] == {"found": False, "path": None, "mtime": None, "version": None}
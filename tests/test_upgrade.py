@@ -0,0 +1,221 @@
+import io
+import json
+import os
+import zipfile
+import zlib
+
+import pytest
+from typer.testing import CliRunner
+
+import specify_cli as sc
+
+runner = CliRunner()
+
+V1 = {
+    "README.md": "# v1\n",
+    "memory/constitution.md": "v1 constitution\n",
+    "templates/plan.md": "v1 plan\n",
+    "templates/old.md": "removed in v2\n",
+}
+V2 = {
+    "README.md": "# v2\n",
+    "memory/constitution.md": "v2 constitution\n",
+    "templates/plan.md": "v1 plan\n",
+    "templates/new.md": "added in v2\n",
+}
+
+
+def _zip(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for rel, text in files.items():
+            zf.writestr(f"spec-kit-template-claude/{rel}", text)
+    return buf.getvalue()
+
+
+def _entry(text: str) -> dict:
+    data = text.encode()
+    return {"crc32": zlib.crc32(data), "size": len(data)}
+
+
+def _lock(project) -> dict:
+    return json.loads((project / ".specify" / "lock.json").read_text())
+
+
+def _upgrade(project, *args):
+    # リリース情報のTTLキャッシュを使わず、差し替えたサーバーのリリースを見る
+    result = runner.invoke(sc.app, ["upgrade", str(project), "--json", "--refresh", *args])
+    report = json.loads(result.output.strip().splitlines()[-1])
+    return result.exit_code, report
+
+
+@pytest.fixture
+def project(tmp_path, fake_github, monkeypatch):
+    """
+    V1で初期化したプロジェクト（サーバーはV2を配信する状態で返す）
+    """
+    monkeypatch.chdir(tmp_path)
+    fake_github.tag = "v1"
+    fake_github.templates = {"claude": _zip(V1)}
+    result = runner.invoke(sc.app, ["init", "proj", "--ai", "claude", "--no-git", "--ignore-agent-tools"])
+    assert result.exit_code == 0, result.output
+    fake_github.tag = "v2"
+    fake_github.templates = {"claude": _zip(V2)}
+    return tmp_path / "proj"
+
+
+def test_untouched_files_follow_upstream(project):
+    code, report = _upgrade(project)
+
+    assert code == 0
+    assert report["from"] == "v1" and report["to"] == "v2"
+    assert (project / "README.md").read_text() == "# v2\n"
+    assert (project / "templates" / "new.md").read_text() == "added in v2\n"
+    assert not (project / "templates" / "old.md").exists()
+    lock = _lock(project)
+    assert lock["release"] == "v2"
+    assert lock["conflicts"] == []
+    assert lock["files"] == {rel: _entry(text) for rel, text in V2.items()}
+
+    code, report = _upgrade(project)
+    assert code == 0 and report == {"release": "v2", "up_to_date": True}
+
+
+def test_local_and_upstream_change_is_a_conflict(project):
+    (project / "README.md").write_text("mine\n")
+
+    code, report = _upgrade(project)
+
+    assert code == 1
+    assert report["conflicts"] == [{"path": "README.md", "reason": "modified locally and upstream"}]
+    assert (project / "README.md").read_text() == "mine\n"
+    assert (project / "memory" / "constitution.md").read_text() == "v2 constitution\n"
+    lock = _lock(project)
+    assert lock["conflicts"] == ["README.md"]
+    assert lock["files"]["README.md"] == _entry(V1["README.md"])
+
+    # 未解決の競合はリリースが同じでも次回また報告される
+    code, report = _upgrade(project)
+    assert code == 1
+    assert [c["path"] for c in report["conflicts"]] == ["README.md"]
+
+
+def test_dry_run_writes_nothing(project):
+    before = _lock(project)
+
+    code, report = _upgrade(project, "--dry-run")
+
+    assert code == 0 and report["dry_run"]
+    assert report["update"] == ["README.md", "memory/constitution.md"]
+    assert report["add"] == ["templates/new.md"]
+    assert report["delete"] == ["templates/old.md"]
+    assert (project / "README.md").read_text() == "# v1\n"
+    assert _lock(project) == before
+
+
+def test_file_deleted_locally(project):
+    (project / "README.md").unlink()
+    (project / "templates" / "plan.md").unlink()
+
+    code, report = _upgrade(project)
+
+    # 上流で変わったファイルは競合、変わっていないファイルは削除されたまま
+    assert code == 1
+    assert report["conflicts"] == [{"path": "README.md", "reason": "deleted locally, changed upstream"}]
+    assert not (project / "README.md").exists()
+    assert not (project / "templates" / "plan.md").exists()
+
+    code, report = _upgrade(project, "--force")
+    assert code == 0
+    assert (project / "README.md").read_text() == "# v2\n"
+    assert not (project / "templates" / "plan.md").exists()
+
+
+def test_file_removed_upstream(project):
+    (project / "templates" / "old.md").write_text("edited\n")
+
+    code, report = _upgrade(project)
+    assert code == 0
+    assert report["delete"] == []
+    assert report["kept"] == ["templates/old.md"]
+    assert (project / "templates" / "old.md").read_text() == "edited\n"
+    assert "templates/old.md" not in _lock(project)["files"]
+
+
+def test_file_removed_upstream_and_untouched_is_deleted(project):
+    code, report = _upgrade(project)
+    assert code == 0
+    assert report["delete"] == ["templates/old.md"]
+    assert not (project / "templates" / "old.md").exists()
+
+
+def test_file_added_upstream_and_locally_is_a_conflict(project):
+    (project / "templates" / "new.md").write_text("local new\n")
+
+    code, report = _upgrade(project)
+
+    assert code == 1
+    assert report["conflicts"] == [{"path": "templates/new.md", "reason": "added upstream, exists locally"}]
+    assert "templates/new.md" not in _lock(project)["files"]
+
+
+def test_force_takes_upstream_and_rewrites_lock(project):
+    (project / "README.md").write_text("mine\n")
+
+    code, report = _upgrade(project, "--force")
+
+    assert code == 0 and report["resolved"]
+    assert (project / "README.md").read_text() == "# v2\n"
+    lock = _lock(project)
+    assert lock["conflicts"] == []
+    assert lock["files"]["README.md"] == _entry(V2["README.md"])
+
+
+def test_keep_local_keeps_file_and_rewrites_lock(project):
+    (project / "README.md").write_text("mine\n")
+
+    code, report = _upgrade(project, "--keep-local")
+
+    assert code == 0 and report["resolved"]
+    assert (project / "README.md").read_text() == "mine\n"
+    lock = _lock(project)
+    assert lock["conflicts"] == []
+    assert lock["files"]["README.md"] == _entry(V2["README.md"])
+
+    code, report = _upgrade(project)
+    assert code == 0 and report == {"release": "v2", "up_to_date": True}
+
+
+def test_keep_local_after_conflict_clears_it(project):
+    (project / "README.md").write_text("mine\n")
+    assert _upgrade(project)[0] == 1
+
+    code, report = _upgrade(project, "--keep-local")
+
+    assert code == 0
+    assert (project / "README.md").read_text() == "mine\n"
+    assert _lock(project)["conflicts"] == []
+
+
+def test_upgrade_of_hardlinked_project_leaves_store_untouched(tmp_path, fake_github, monkeypatch):
+    monkeypatch.setenv("SPECIFY_MATERIALIZE", "hardlink")
+    monkeypatch.setattr(os, "geteuid", lambda: 1000, raising=False)
+    monkeypatch.chdir(tmp_path)
+    fake_github.tag = "v1"
+    fake_github.templates = {"claude": _zip(V1)}
+    for name in ("proj", "sibling"):
+        result = runner.invoke(sc.app, ["init", name, "--ai", "claude", "--no-git", "--ignore-agent-tools"])
+        assert result.exit_code == 0, result.output
+    project, sibling = tmp_path / "proj", tmp_path / "sibling"
+    sha256 = _lock(project)["sha256"]
+    store = sc._unpacked_root() / sha256
+    assert (project / "README.md").stat().st_ino == (store / "README.md").stat().st_ino
+
+    fake_github.tag = "v2"
+    fake_github.templates = {"claude": _zip(V2)}
+    code, _ = _upgrade(project)
+
+    assert code == 0
+    assert (project / "README.md").read_text() == "# v2\n"
+    for root in (store, sibling):
+        assert {rel: (root / rel).read_text() for rel in V1} == V1